@@ -0,0 +1,558 @@
+"""End-to-end benchmark of the `ETLWorkflow` stages on synthetic data.
+
+The benchmark writes a container of monthly `.csv`/`.xlsx` files to a local directory,
+runs `build`, `curate`, `load` and `upload` against the local storage backend and a
+SQLite database, and reports the throughput of each stage. Reports can be saved as a
+baseline, and later runs compared against it:
+
+    python -m PyOrchDB.benchmark --rows 20000 --months 12 --output baseline.json
+    python -m PyOrchDB.benchmark --rows 20000 --months 12 --baseline baseline.json
+
+`--compare-excel-engines` times the `.xlsx` readers of `EXCEL_ENGINES` on one workbook instead,
+and `--compare-table-names` times `set_table_names` on `--tables` names and `--rules` keys.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Dict, List, Optional
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import yaml
+from tabulate import tabulate
+
+from PyOrchDB.main import ETLWorkflow
+from PyOrchDB.utilities import (
+    EXCEL_ENGINES,
+    PARQUET_CODECS,
+    SQLITE_PREFIX,
+    RunProfiler,
+    load_table_names,
+    read_excel_sheets,
+    resolve_excel_engine,
+    set_table_names,
+)
+
+CLIENTS = np.array(["norte", "sur", "centro", "occidente", "oriente", "bajío", "sureste"])
+
+
+def synthetic_frame(
+    rng: np.random.Generator, rows: int, month: int, drift: bool = True
+) -> pd.DataFrame:
+    """Create the data of one month.
+
+    Args:
+        rng (np.random.Generator): Random generator, seeded for reproducibility.
+        rows (int): Number of rows.
+        month (int): Index of the month, which drives the schema drift.
+        drift (bool): Change the schema between months: an extra column every third
+            month, a column renamed every other month and the columns reversed every
+            fourth month.
+
+    Returns:
+        pd.DataFrame: Synthetic sales records with a few missing values.
+    """
+    start = pd.Timestamp(2023, 1, 1) + pd.DateOffset(months=month)
+    df = pd.DataFrame(
+        {
+            "id": np.arange(rows),
+            "cliente": rng.choice(CLIENTS, rows),
+            "cantidad": rng.integers(1, 100, rows).astype(float),
+            "valor": (rng.random(rows) * 1000).round(2),
+            "fecha": start + pd.to_timedelta(rng.integers(0, 28, rows), unit="D"),
+        }
+    )
+    df.loc[rng.random(rows) < 0.01, "cantidad"] = np.nan
+    if drift:
+        if month % 3 == 2:
+            df["descuento"] = rng.random(rows).round(2)
+        if month % 2 == 1:
+            df = df.rename(columns={"valor": "Valor"})
+        if month % 4 == 3:
+            df = df[df.columns[::-1]]
+    return df
+
+
+def generate_container(
+    root_path: str,
+    container_name: str = "raw",
+    project_name: str = "benchmark",
+    directories: int = 2,
+    months: int = 6,
+    rows: int = 1000,
+    file_format: str = "csv",
+    sheets: int = 1,
+    drift: bool = True,
+    seed: int = 0,
+) -> List[str]:
+    """Write a container of synthetic monthly files for the benchmark.
+
+    Files are laid out as `project/sourceN/sourceN_YYYY-MM-DD.ext`, so that the directories
+    are found by `get_directories` and the period by `insert_period`.
+
+    Args:
+        root_path (str): Root directory of the local storage backend.
+        container_name (str): Name of the container.
+        project_name (str): First directory inside the container.
+        directories (int): Number of source directories.
+        months (int): Number of monthly files per directory.
+        rows (int): Rows per file (per sheet for `.xlsx`).
+        file_format (str): `"csv"`, `"xlsx"` or `"mixed"` (alternating by month).
+        sheets (int): Sheets of each `.xlsx` workbook.
+        drift (bool): Change the schema between months (see `synthetic_frame`).
+        seed (int): Seed of the random generator.
+
+    Returns:
+        List[str]: Blob names of the files written.
+    """
+    if file_format not in ("csv", "xlsx", "mixed"):
+        raise ValueError(f"Unsupported format: {file_format}. Choose from csv, xlsx, mixed.")
+    rng = np.random.default_rng(seed)
+    blob_names = []
+    for d in range(directories):
+        directory = f"source{d}"
+        directory_path = os.path.join(root_path, container_name, project_name, directory)
+        os.makedirs(directory_path, exist_ok=True)
+        for month in range(months):
+            period = date(2023 + month // 12, month % 12 + 1, 1).isoformat()
+            extension = file_format if file_format != "mixed" else ("csv", "xlsx")[month % 2]
+            file_name = f"{directory}_{period}.{extension}"
+            file_path = os.path.join(directory_path, file_name)
+            if extension == "csv":
+                synthetic_frame(rng, rows, month, drift).to_csv(file_path, index=False)
+            else:
+                with pd.ExcelWriter(file_path) as writer:
+                    for sheet in range(sheets):
+                        df = synthetic_frame(rng, rows, month, drift)
+                        df.to_excel(writer, sheet_name=f"hoja{sheet}", index=False)
+            blob_names.append(f"{project_name}/{directory}/{file_name}")
+    return blob_names
+
+
+def stage_throughput(profiler: RunProfiler) -> Dict[str, dict]:
+    """Get the time, rows, bytes and throughput of each stage recorded by `profiler`, with
+    the bytes of the copies avoided by the operations of the stage."""
+    stages, saved = {}, {}
+    for record in profiler.records:
+        if record["operation"] != "stage" and record.get("bytes_saved"):
+            saved[record["stage"]] = saved.get(record["stage"], 0) + record["bytes_saved"]
+    for record in profiler.records:
+        if record["operation"] != "stage":
+            continue
+        seconds, rows, nbytes = record["wall_seconds"], record["rows"] or 0, record["bytes"] or 0
+        stages[record["stage"]] = {
+            "seconds": seconds,
+            "cpu_seconds": record["cpu_seconds"],
+            "rows": rows,
+            "bytes": nbytes,
+            "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+            "mb_per_second": nbytes / 1024**2 / seconds if seconds > 0 else 0.0,
+            "peak_rss_bytes": record["peak_rss_bytes"],
+            "bytes_saved": saved.get(record["stage"], 0),
+        }
+    return stages
+
+
+def run_benchmark(
+    work_dir: Optional[str] = None,
+    repeat: int = 1,
+    workers: int = 1,
+    bulk: bool = True,
+    cleaning: bool = False,
+    build_kwargs: Optional[dict] = None,
+    curate_kwargs: Optional[dict] = None,
+    load_kwargs: Optional[dict] = None,
+    upload_kwargs: Optional[dict] = None,
+    **data_kwargs,
+) -> dict:
+    """Run the workflow on synthetic data and measure each stage.
+
+    Args:
+        work_dir (Optional[str]): Directory holding the data, the SQLite database and the
+            logs of each run. A temporary directory, removed afterwards, by default.
+        repeat (int): Number of runs, the fastest run of each stage is reported.
+        workers (int): Worker processes of `build` and connections of `upload`.
+        bulk (bool): Upload with the bulk loader.
+        cleaning (bool): Run `clean_db` in `curate`.
+        build_kwargs (Optional[dict]): Extra keyword arguments of `build`, such as `prefetch`
+            or `stream`.
+        curate_kwargs (Optional[dict]): Extra keyword arguments of `curate`, such as
+            `arrow_native`.
+        load_kwargs (Optional[dict]): Extra keyword arguments of `load`, such as
+            `partition_by` or `compression`.
+        upload_kwargs (Optional[dict]): Extra keyword arguments of `upload`, such as
+            `incremental`.
+        **data_kwargs: Arguments of `generate_container`.
+
+    Returns:
+        dict: The configuration of the benchmark and the throughput of each stage.
+    """
+    temporary = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="pyorchdb-benchmark-")
+    project_name = data_kwargs.setdefault("project_name", "benchmark")
+    best: Dict[str, dict] = {}
+    try:
+        for run in range(repeat):
+            run_dir = os.path.join(work_dir, f"run{run}")
+            shutil.rmtree(run_dir, ignore_errors=True)
+            root_path = os.path.join(run_dir, "storage")
+            logs_path = os.path.join(run_dir, "logs") + "/"
+            os.makedirs(logs_path)
+            generate_container(root_path, "raw", **data_kwargs)
+
+            profiler = RunProfiler()
+            workflow = ETLWorkflow(
+                root_path,
+                "raw",
+                project_name,
+                db_conn_string=SQLITE_PREFIX + os.path.join(run_dir, "benchmark.db"),
+                verbose=False,
+                backend="local",
+                profiler=profiler,
+            )
+            # Answer "n" when `curate` asks whether to rename the tables
+            with mock.patch("builtins.input", return_value="n"):
+                workflow.build(workers=workers, logs_path=logs_path, **(build_kwargs or {}))
+                workflow.curate(cleaning=cleaning, **(curate_kwargs or {}))
+                workflow.load(**(load_kwargs or {}))
+                workflow.upload(bulk=bulk, workers=workers, **(upload_kwargs or {}))
+
+            for stage, result in stage_throughput(profiler).items():
+                if stage not in best or result["seconds"] < best[stage]["seconds"]:
+                    best[stage] = result
+    finally:
+        if temporary:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    config = dict(data_kwargs, repeat=repeat, workers=workers, bulk=bulk, cleaning=cleaning)
+    config.update(build_kwargs or {})
+    config.update(curate_kwargs or {})
+    config.update(load_kwargs or {})
+    config.update(upload_kwargs or {})
+    return {"config": config, "stages": best}
+
+
+def compare_excel_engines(
+    rows: int = 10_000,
+    sheets: int = 4,
+    engines: Optional[List[str]] = None,
+    sheet_workers: int = 1,
+    repeat: int = 1,
+    seed: int = 0,
+) -> Dict[str, dict]:
+    """Time the `.xlsx` readers on one synthetic workbook, read from memory as in `build`.
+
+    Args:
+        rows (int): Rows per sheet.
+        sheets (int): Sheets of the workbook.
+        engines (Optional[List[str]]): Engines to compare, the installed ones by default.
+        sheet_workers (int): Processes parsing the sheets in parallel.
+        repeat (int): Number of reads per engine, the fastest one is reported.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        Dict[str, dict]: Seconds, rows per second and speedup over `pandas` of each engine.
+    """
+    if engines is None:
+        engines = ["pandas", "openpyxl"] + (
+            ["calamine"] if resolve_excel_engine("auto") == "calamine" else []
+        )
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory(prefix="pyorchdb-benchmark-") as work_dir:
+        file_path = os.path.join(work_dir, "benchmark.xlsx")
+        with pd.ExcelWriter(file_path) as writer:
+            for sheet in range(sheets):
+                df = synthetic_frame(rng, rows, sheet)
+                df.to_excel(writer, sheet_name=f"hoja{sheet}", index=False)
+        with open(file_path, "rb") as file:
+            data = file.read()
+
+    results = {}
+    for engine in engines:
+        seconds = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            all_sheets = read_excel_sheets(data, engine, sheet_workers)
+            seconds = min(seconds, time.perf_counter() - start)
+        total_rows = sum(len(df) for df in all_sheets.values())
+        results[engine] = {
+            "seconds": seconds,
+            "rows": total_rows,
+            "rows_per_second": total_rows / seconds,
+        }
+    for result in results.values():
+        result["speedup"] = (
+            results["pandas"]["seconds"] / result["seconds"] if "pandas" in results else None
+        )
+    return results
+
+
+def compare_table_names(
+    tables: int = 10_000, rules: int = 5_000, repeat: int = 1, seed: int = 0
+) -> Dict[str, dict]:
+    """Time `set_table_names` against the substring scan of every key and sub-key.
+
+    One key out of three maps to sub-keys, and most table names contain several keys,
+    so the first one in the file has to be found. Both resolutions are checked to agree.
+
+    Args:
+        tables (int): Number of table names.
+        rules (int): Number of keys of `table_names.yml`.
+        repeat (int): Number of resolutions per method, the fastest one is reported.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        Dict[str, dict]: Seconds, names per second and speedup over the scan of each method.
+    """
+    rng = np.random.default_rng(seed)
+    yaml_table = {
+        f"k{i}x": (
+            {**{f"s{j}y": f"TB_{i}_{j}" for j in range(5)}, "None": f"TB_{i}"}
+            if i % 3 == 0
+            else f"TB_{i}"
+        )
+        for i in range(rules)
+    }
+    names = [
+        f"TB_BI_source_k{rng.integers(rules * 2)}x_s{rng.integers(10)}y_k{rng.integers(rules * 2)}x"
+        for _ in range(tables)
+    ]
+    with tempfile.TemporaryDirectory(prefix="pyorchdb-benchmark-") as work_dir:
+        file_path = os.path.join(work_dir, "table_names.yml")
+        with open(file_path, "w") as file:
+            yaml.safe_dump(yaml_table, file)
+
+        results, resolved = {}, {}
+        for method, resolve in [("scan", _scan_table_names), ("automaton", set_table_names)]:
+            seconds = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                resolved[method] = resolve(names, True, file_path)
+                seconds = min(seconds, time.perf_counter() - start)
+            results[method] = {"seconds": seconds, "names_per_second": tables / seconds}
+    if resolved["scan"] != resolved["automaton"]:
+        raise AssertionError("set_table_names does not agree with the scan of the keys.")
+    for result in results.values():
+        result["speedup"] = results["scan"]["seconds"] / result["seconds"]
+    return results
+
+
+def _scan_table_names(
+    table_names: List[str], default_name: bool = False, file_path: str = ""
+) -> List[str]:
+    """Reference resolution, with one substring search per key and sub-key of the file."""
+    yaml_table = load_table_names(file_path)
+    keys_tables = [k.split()[0] for k in yaml_table.keys()]
+
+    updated_names = []
+    for name in table_names:
+        new_name = name
+        for key_name in keys_tables:
+            if key_name in name:
+                value = yaml_table[key_name]
+                if isinstance(value, str):
+                    new_name = value
+                    break
+                else:
+                    sub_keys_tables = [k.split()[0] for k in value.keys() if k != "None"]
+                    for sub_key_name in sub_keys_tables:
+                        if sub_key_name in name:
+                            new_name = value[sub_key_name]
+                            break
+                    else:
+                        if default_name:
+                            new_name = value.get("None", name)
+                break
+        updated_names.append(new_name)
+    return updated_names
+
+
+def check_regressions(
+    report: dict,
+    baseline: Optional[dict] = None,
+    tolerance: float = 0.2,
+    thresholds: Optional[Dict[str, float]] = None,
+) -> List[str]:
+    """Compare the throughput of each stage with a baseline report and with fixed thresholds.
+
+    Args:
+        report (dict): Report of `run_benchmark`.
+        baseline (Optional[dict]): Report of a previous run with the same configuration.
+        tolerance (float): Fraction of the baseline throughput that a stage may lose.
+        thresholds (Optional[Dict[str, float]]): Minimum rows per second of each stage.
+
+    Returns:
+        List[str]: Description of each regression, empty if there is none.
+    """
+    regressions = []
+    for stage, result in report["stages"].items():
+        throughput = result["rows_per_second"]
+        minimum = (thresholds or {}).get(stage)
+        if minimum is not None and throughput < minimum:
+            regressions.append(
+                f"{stage}: {throughput:.0f} rows/s is below the threshold of {minimum:.0f} rows/s"
+            )
+        if baseline is not None and stage in baseline["stages"]:
+            reference = baseline["stages"][stage]["rows_per_second"]
+            if throughput < reference * (1 - tolerance):
+                regressions.append(
+                    f"{stage}: {throughput:.0f} rows/s is more than {tolerance:.0%} below "
+                    f"the baseline of {reference:.0f} rows/s"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--directories", type=int, default=2)
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument(
+        "--format", dest="file_format", default="csv", choices=["csv", "xlsx", "mixed"]
+    )
+    parser.add_argument("--sheets", type=int, default=1)
+    parser.add_argument("--no-drift", dest="drift", action="store_false")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-bulk", dest="bulk", action="store_false")
+    parser.add_argument("--cleaning", action="store_true")
+    parser.add_argument("--arrow-native", action="store_true")
+    parser.add_argument("--prefetch", type=int, default=0)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--excel-engine", default="pandas", choices=EXCEL_ENGINES)
+    parser.add_argument("--sheet-workers", type=int, default=1)
+    parser.add_argument("--partition-by", default=None, help="Partition column of load.")
+    parser.add_argument("--row-group-size", type=int, default=None)
+    parser.add_argument("--compression", default="snappy", choices=PARQUET_CODECS)
+    parser.add_argument(
+        "--incremental", action="store_true", help="Upload only the new or changed periods."
+    )
+    parser.add_argument(
+        "--compare-excel-engines",
+        action="store_true",
+        help="Time the .xlsx readers on one workbook of --sheets sheets of --rows rows.",
+    )
+    parser.add_argument(
+        "--compare-table-names",
+        action="store_true",
+        help="Time set_table_names on --tables table names and --rules keys.",
+    )
+    parser.add_argument("--tables", type=int, default=10_000)
+    parser.add_argument("--rules", type=int, default=5_000)
+    parser.add_argument("--work-dir", default=None, help="Keep the data of the runs here.")
+    parser.add_argument("--output", default=None, help="Write the report as JSON.")
+    parser.add_argument("--baseline", default=None, help="Report to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument(
+        "--min-rows-per-second",
+        nargs="*",
+        default=[],
+        metavar="STAGE=ROWS",
+        help="Minimum throughput of a stage, such as build=5000.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare_excel_engines:
+        results = compare_excel_engines(
+            rows=args.rows,
+            sheets=args.sheets,
+            sheet_workers=args.sheet_workers,
+            repeat=args.repeat,
+            seed=args.seed,
+        )
+        rows = [
+            [
+                engine,
+                f"{r['seconds']:.3f}",
+                r["rows"],
+                f"{r['rows_per_second']:.0f}",
+                f"{r['speedup']:.2f}",
+            ]
+            for engine, r in results.items()
+        ]
+        print(
+            tabulate(
+                rows, headers=["engine", "seconds", "rows", "rows/s", "speedup"], tablefmt="grid"
+            )
+        )
+        return 0
+
+    if args.compare_table_names:
+        results = compare_table_names(
+            tables=args.tables, rules=args.rules, repeat=args.repeat, seed=args.seed
+        )
+        rows = [
+            [method, f"{r['seconds']:.3f}", f"{r['names_per_second']:.0f}", f"{r['speedup']:.2f}"]
+            for method, r in results.items()
+        ]
+        print(tabulate(rows, headers=["method", "seconds", "names/s", "speedup"], tablefmt="grid"))
+        return 0
+
+    report = run_benchmark(
+        work_dir=args.work_dir,
+        repeat=args.repeat,
+        workers=args.workers,
+        bulk=args.bulk,
+        cleaning=args.cleaning,
+        curate_kwargs=dict(arrow_native=args.arrow_native),
+        load_kwargs=dict(
+            partition_by=args.partition_by,
+            row_group_size=args.row_group_size,
+            compression=args.compression,
+        ),
+        upload_kwargs=dict(incremental=args.incremental),
+        build_kwargs=dict(
+            prefetch=args.prefetch,
+            stream=args.stream,
+            excel_engine=args.excel_engine,
+            sheet_workers=args.sheet_workers,
+        ),
+        directories=args.directories,
+        months=args.months,
+        rows=args.rows,
+        file_format=args.file_format,
+        sheets=args.sheets,
+        drift=args.drift,
+        seed=args.seed,
+    )
+    rows = [
+        [
+            stage,
+            f"{result['seconds']:.3f}",
+            result["rows"],
+            f"{result['rows_per_second']:.0f}",
+            f"{result['mb_per_second']:.2f}",
+            f"{(result['peak_rss_bytes'] or 0) / 1024**2:.0f}",
+        ]
+        for stage, result in report["stages"].items()
+    ]
+    headers = ["stage", "seconds", "rows", "rows/s", "MB/s", "peak RSS (MB)"]
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+    thresholds = {
+        stage: float(value)
+        for stage, value in (item.split("=", 1) for item in args.min_rows_per_second)
+    }
+    regressions = check_regressions(report, baseline, args.tolerance, thresholds)
+    for regression in regressions:
+        print(f"Regression in {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
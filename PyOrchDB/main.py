@@ -3,7 +3,10 @@ import os
 import re
 import warnings
 from abc import abstractmethod
-from typing import List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import yaml
 from merge_by_lev.main import clear_console, merge_by_similarity
@@ -13,20 +16,44 @@ from pandas.core.frame import DataFrame
 from pyarrow import Table
 from pydbsmgr import drop_empty_columns
 from pydbsmgr.lightest import LightCleaner
-from pydbsmgr.utils.azure_sdk import StorageController
-from pydbsmgr.utils.tools import ColumnsCheck, ColumnsDtypes
+from pydbsmgr.utils.tools import ColumnsDtypes
 from tabulate import tabulate
 
 from PyOrchDB.utilities import (
+    MEMO_NAME,
+    SQLITE_PREFIX,
+    BlobIndex,
+    BlobPrefetcher,
     BlobPrefix,
+    CheckpointManager,
+    ColumnMatchMemo,
+    ColumnRules,
     DatabaseManager,
     EventController,
-    get_directories,
-    insert_period,
-    list_filter,
+    ParsedFileCache,
+    RunProfiler,
+    SchemaBuckets,
+    TransformPlan,
+    attach_statistics,
+    clean_table,
+    coerce_types,
+    find_directories,
+    get_period,
+    get_storage_controller,
+    learn_merge,
     list_remove,
-    remove_by_dict,
+    listing_fingerprint,
+    parquet_options,
+    partition_blobs,
+    read_excel_csv_blob,
+    replay_merge,
+    resolve_excel_engine,
+    schema_fingerprint,
     set_table_names,
+    standardize_columns,
+    table_size,
+    to_arrow,
+    write_partitioned,
 )
 
 logging.basicConfig(level=logging.INFO)
@@ -46,10 +73,18 @@ class ETLWorkflow:
         client_name: str = "",
         ODBC_DRIVER: str = "18",
         verbose: bool = True,
+        backend: str = "azure",
+        checkpoint_dir: Optional[str] = None,
+        checkpoint_format: str = "parquet",
+        checkpoint_final_stage: str = "upload",
+        profiler: Optional[RunProfiler] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = 2 * 1024**3,
     ):
         self.conn_string = conn_string
         self.container_name = container_name
-        self.storage_name = self._extract_storage_name(conn_string)
+        self.backend = backend
+        self.storage_name = self._extract_storage_name(conn_string, backend)
         self.exclude_files = exclude_files
         self.directory = directory
         self.verbose = verbose
@@ -68,23 +103,47 @@ class ETLWorkflow:
         )
 
         self.project = project_name
-        self.controller = StorageController(self.conn_string, self.container_name)
-        self.manager = EventController(self.conn_string, self.container_name, self.project)
+        self.controller = get_storage_controller(self.conn_string, self.container_name, backend)
+        self.manager = EventController(
+            self.conn_string, self.container_name, self.project, backend=backend
+        )
         self.tables: List[DataFrame] = []
         self.table_data: List[List[int, str]] = []
         self.table_names: List[str] = []
+        self.table_sources: List[List[str]] = []
         self.client_name = client_name
+        self.checkpoint = (
+            CheckpointManager(checkpoint_dir, checkpoint_format) if checkpoint_dir else None
+        )
+        if checkpoint_final_stage not in CheckpointManager.STAGES:
+            raise ValueError(
+                f"Unknown stage: {checkpoint_final_stage}. "
+                f"Choose from {list(CheckpointManager.STAGES)}."
+            )
+        self.checkpoint_final_stage = checkpoint_final_stage
+        self.profiler = profiler if profiler is not None else RunProfiler()
+        self.cache = ParsedFileCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.column_memo: Optional[ColumnMatchMemo] = None
+        self.column_rules: Optional[ColumnRules] = None
+        self.blob_index: Optional[BlobIndex] = None
+        self.directory_level = 1
+        self._config_key: Optional[Tuple[str, float]] = None
 
     @staticmethod
-    def _extract_storage_name(conn_string: str) -> str:
+    def _extract_storage_name(conn_string: str, backend: str = "azure") -> str:
+        if backend == "local":
+            return os.path.basename(os.path.normpath(conn_string))
         return conn_string.split(";")[1].split("=")[1]
 
     def validate_input_parameters(self, pattern_db: re.Pattern, db_conn_string: str) -> None:
-        if not self.conn_string.startswith("DefaultEndpointsProtocol=https;AccountName="):
+        if self.backend == "local":
+            if not os.path.isdir(self.conn_string):
+                raise ValueError("Invalid local storage directory.")
+        elif not self.conn_string.startswith("DefaultEndpointsProtocol=https;AccountName="):
             raise ValueError("Invalid storage account connection string.")
         if len(db_conn_string) == 0:
             warnings.warn("Database connection string was not provided.", UserWarning)
-        elif not pattern_db.search(db_conn_string):
+        elif not (pattern_db.search(db_conn_string) or db_conn_string.startswith(SQLITE_PREFIX)):
             raise ValueError("Invalid database connection string.")
 
         if self.verbose:
@@ -111,131 +170,690 @@ class ETLWorkflow:
         add_config: bool = False,
         delete_catalog: bool = False,
         update_catalog: bool = True,
+        workers: int = 1,
         **kwargs,
     ) -> None:
-        print("Start building process...\n")
-        files = self._get_file_list(**kwargs)
-        if update_catalog:
-            files = self._update_catalog(files, delete_catalog)
-        else:
-            if delete_catalog:
-                warnings.warn(
-                    "delete_catalog=True ignored because update_catalog=False", UserWarning
-                )
-            files = self.manager.diff(files)
-
-        self.set_directories(files)
-        self.add_config = add_config
-        if self.add_config:
-            self._load_config()
-
-        logs_path = kwargs.get("logs_path", "./logs/")
-        for dir in self.directories:
-            print(f"Processing {dir}")
-            filter_files = list_filter(files, dir)
-            self.controller.file_list = [BlobPrefix(name) for name in filter_files]
-            df_list, name_list = self.controller.get_excel_csv(
-                directory_name=self.directory, regex=r"\w+\.(xlsx|csv)", manual_mode=True
-            )
+        """Reads, corrects and merges the new files of each directory into tables.
 
-            df_list, name_list = check_empty_df(dfs=df_list, names=name_list)
-            self._update_logs(dir, name_list, logs_path)
-
-            errors, processed_dfs = [], []
-            for j, df in enumerate(df_list):
-                print(f"Applying DataFrame corrections to {name_list[j]}")
-                corrected_df = self.fix(df)
-                if corrected_df is None:
-                    errors.append(j)
-                    continue
+        The time, rows and bytes of the stage and of each of its operations are recorded
+        by `self.profiler`.
 
-                corrected_df = insert_period(corrected_df, name_list[j])
-                corrected_df = self._ops_cols(corrected_df)
+        Args:
+            dist_min (int): Maximum distance between the column names `merge_by_similarity`
+                matches.
+            match_cols (int): Minimum number of matching columns to merge two schemas.
+            drop_empty (bool): Drop the empty frames before merging them.
+            add_config (bool): Delete and rename the columns of the YAML file at
+                `config_path` (`./utilities/config_data.yml` by default), see `_load_config`.
+            delete_catalog (bool): Start a new catalog, so every file is processed.
+            update_catalog (bool): Record the files processed in the catalog.
+            workers (int): Processes building the directories in parallel, see
+                `_build_parallel`.
+            **kwargs: `filter_criteria` and `exclude_files` of the listing (see
+                `_get_file_list`), `logs_path`, `prefetch`, `prefetch_bytes`, `stream`,
+                `excel_engine` and `sheet_workers` of the reads (see `_read_directory`),
+                `column_memo` (see `_merge_directory`) and `resume` of the checkpointed
+                run (see `_start_run`).
+        """
+        with self.profiler.profile("build") as stage:
+            print("Start building process...\n")
+            files = self._get_file_list(**kwargs)
+            build_state, carried = self._start_run(files, kwargs.get("resume", True))
+            if self.checkpoint is not None and self.checkpoint.is_completed("build"):
+                logger.info("Restoring the output of the build stage from the checkpoint...")
+                self._restore_checkpoint("build")
+                stage["rows"], stage["bytes"] = table_size(self.tables)
+                return
 
-                processed_dfs.append(corrected_df)
-                print(f"{j} | Progress: {100 * j / len(df_list):.2f}%")
-                clear_console()
+            if "files" in build_state:
+                files = build_state["files"]
+            else:
+                if update_catalog:
+                    files = self._update_catalog(files, delete_catalog)
+                else:
+                    if delete_catalog:
+                        warnings.warn(
+                            "delete_catalog=True ignored because update_catalog=False",
+                            UserWarning,
+                        )
+                    files = self.manager.diff(files, self.blob_properties)
+                files = carried + [file for file in files if file not in carried]
+            if not files:
+                print("There is nothing new to upload")
+                self.directories = []
+                return
+            if self.checkpoint is not None:
+                self.checkpoint.save_state("build", files=files)
 
-            df_list, name_list = self._remove_errors(errors, processed_dfs, name_list)
+            self.set_directories(files)
+            self.add_config = add_config
+            if self.add_config:
+                self._load_config(kwargs.get("config_path", "./utilities/config_data.yml"))
 
-            try:
-                dfs, names, _ = merge_by_similarity(
-                    df_list,
-                    name_list,
+            self.column_memo = None
+            if kwargs.get("column_memo", False):
+                self.column_memo = ColumnMatchMemo(
+                    self.conn_string,
+                    self.container_name,
+                    self.project,
+                    backend=self.backend,
                     dist_min=dist_min,
                     match_cols=match_cols,
                     drop_empty=drop_empty,
                 )
-            except ZeroDivisionError:
-                print("\nThere is only one DataFrame. No merge necessary.\n")
+                self.column_memo.load()
+
+            directory_files = {
+                dir: self.blob_index.files(dir, self.directory_level) for dir in self.directories
+            }
+            directory_params = dict(
+                dist_min=dist_min,
+                match_cols=match_cols,
+                drop_empty=drop_empty,
+                logs_path=kwargs.get("logs_path", "./logs/"),
+                prefetch=kwargs.get("prefetch", 0),
+                prefetch_bytes=kwargs.get("prefetch_bytes", 256 * 1024**2),
+                stream=kwargs.get("stream", False),
+                excel_engine=resolve_excel_engine(kwargs.get("excel_engine", "pandas")),
+                sheet_workers=kwargs.get("sheet_workers", 1),
+            )
+            if workers > 1 and len(self.directories) > 1:
+                results = self._build_parallel(directory_files, workers, **directory_params)
+            else:
+                results = {
+                    dir: self._process_directory(dir, directory_files[dir], **directory_params)
+                    for dir in self.directories
+                }
+
+            for dir in self.directories:
+                dfs, names = results.pop(dir)
+                self._name_settings(names, dir)
+                self.table_sources.extend([directory_files[dir]] * len(names))
+                self.tables.extend(dfs)
+            if self.column_memo is not None:
+                self.column_memo.save()
+            self._checkpoint_stage("build")
+            stage["rows"], stage["bytes"] = table_size(self.tables)
+
+    def _build_parallel(
+        self, directory_files: Dict[str, List[str]], workers: int, **kwargs
+    ) -> Dict[str, Tuple[List[DataFrame], List[str]]]:
+        """Processes the directories in a process pool, the largest directories (by total blob
+        size) being submitted first. The results are keyed by directory and collected by
+        `build` in the sorted order of `self.directories`, so the output is the same as that
+        of the serial run."""
+        directories = sorted(
+            directory_files,
+            key=lambda dir: sum(self._blob_size(name) for name in directory_files[dir]),
+            reverse=True,
+        )
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                dir: executor.submit(
+                    self._process_directory_remote, dir, directory_files[dir], **kwargs
+                )
+                for dir in directories
+            }
+            results = {}
+            for dir, future in futures.items():
+                results[dir], records, entry = future.result()
+                self.profiler.add_records(records)
+                if entry is not None:
+                    self.column_memo.put_entry(dir, entry)
+            return results
+
+    def _process_directory_remote(
+        self, dir: str, *args, **kwargs
+    ) -> Tuple[Tuple[List[DataFrame], List[str]], List[dict], Optional[dict]]:
+        """Runs `_process_directory` in a worker process, returning its profiling records
+        and the entry it added to the column memo."""
+        self.profiler.records = []
+        result = self._process_directory(dir, *args, **kwargs)
+        entry = None
+        if self.column_memo is not None and dir in self.column_memo.updated:
+            entry = self.column_memo.entries[dir]
+        return result, self.profiler.records, entry
+
+    def _process_directory(
+        self,
+        dir: str,
+        filter_files: List[str],
+        dist_min: int = 9,
+        match_cols: int = 4,
+        drop_empty: bool = False,
+        logs_path: str = "./logs/",
+        prefetch: int = 0,
+        prefetch_bytes: int = 256 * 1024**2,
+        stream: bool = False,
+        excel_engine: str = "pandas",
+        sheet_workers: int = 1,
+    ) -> Tuple[List[DataFrame], List[str]]:
+        """Reads, corrects and merges the files of a single directory.
+
+        The corrected frames are grouped by the fingerprint of their set of columns (see
+        `SchemaBuckets`), the frames of each group are concatenated, and only one frame per
+        schema is passed to `merge_by_similarity`. Its pairwise matching of column names is
+        then quadratic in the number of schemas instead of files.
+
+        With `stream=True` only the raw frames of one blob are held at a time. The peak
+        memory still grows with the corrected frames of the directory, not with its largest
+        group: `merge_by_similarity` compares every schema of the directory at once, and
+        the merged tables are all kept in `self.tables`.
+        """
+        print(f"Processing {dir}")
+        read_names = []
+        buckets = SchemaBuckets(min_columns=match_cols)
+        batches = self._read_batches(
+            filter_files, prefetch, prefetch_bytes, stream, excel_engine, sheet_workers
+        )
+        for frames, frame_names, blob_name, corrected in batches:
+            read_names.extend(frame_names)
+            # The cache keeps the output of `fix`, the other steps depend on the config
+            cache_batch = self.cache is not None and blob_name is not None and not corrected
+            if not corrected:
+                frames, frame_names = self._fix_batch(frames, frame_names, complete=not cache_batch)
+                if cache_batch:
+                    self.cache.put(blob_name, self._blob_etag(blob_name), frames, frame_names)
+            for j, frame_name in enumerate(frame_names):
+                corrected_df = frames[j]
+                if corrected or cache_batch:
+                    plan = self._frame_plan(TransformPlan.keep(corrected_df.columns), frame_name)
+                    corrected_df = plan.apply(corrected_df)
+                frames[j] = None
+                buckets.add(corrected_df, frame_name)
+        self._update_logs(dir, read_names, logs_path)
+
+        print(f"{buckets.frames} files of {dir} share {len(buckets)} schemas")
+        df_list, name_list = buckets.pop_all()
+
+        with self.profiler.profile("build", "merge_by_similarity", dir) as record:
+            dfs, names = self._merge_directory(
+                dir, df_list, name_list, dist_min, match_cols, drop_empty
+            )
+            record["rows"], record["bytes"] = table_size(dfs)
+        return dfs, names
+
+    def _merge_directory(
+        self,
+        dir: str,
+        df_list: List[DataFrame],
+        name_list: List[str],
+        dist_min: int = 9,
+        match_cols: int = 4,
+        drop_empty: bool = False,
+    ) -> Tuple[List[DataFrame], List[str]]:
+        """Merges the frames of a directory with `merge_by_similarity`, replaying the
+        decisions of the column memo when it has seen every schema of the directory.
+
+        With `column_memo=True` the table each schema is merged into and the name of each
+        of its columns are kept in `catalog_columns.parquet` next to the catalog (see
+        `ColumnMatchMemo`). A directory whose schemas were all seen in a previous run with
+        the same `dist_min`, `match_cols` and `drop_empty` is merged from the memo without
+        comparing column names. On a miss the frames are merged by `merge_by_similarity`,
+        and the decisions are stored only if `learn_merge` finds that replaying them gives
+        the same tables.
+        """
+        merge_params = dict(dist_min=dist_min, match_cols=match_cols, drop_empty=drop_empty)
+        fingerprints = None
+        if self.column_memo is not None and len(df_list) > 1:
+            if drop_empty:
+                df_list, name_list = check_empty_df(dfs=df_list, names=name_list)
+            fingerprints = [schema_fingerprint(df.columns) for df in df_list]
+            # Frames too narrow to be bucketed can share their schema
+            if len(df_list) < 2 or len(set(fingerprints)) != len(fingerprints):
+                fingerprints = None
+            else:
+                decisions = self.column_memo.get(dir, fingerprints)
+                if decisions is not None:
+                    print(f"Merging the files of {dir} from the column memo")
+                    return replay_merge(df_list, name_list, decisions)
+        try:
+            # The frames are learned from after the merge, which may rename their columns
+            frames = [df.copy(deep=False) for df in df_list] if fingerprints else df_list
+            dfs, names, _ = merge_by_similarity(frames, list(name_list), **merge_params)
+        except ZeroDivisionError:
+            print("\nThere is only one DataFrame. No merge necessary.\n")
+            dfs, names = df_list, name_list
+        if fingerprints is not None:
+            decisions = learn_merge(df_list, name_list, dfs, names, **merge_params)
+            if decisions is None:
+                print(f"The merge of {dir} depends on its data, it is not kept in the memo")
+            else:
+                self.column_memo.put(dir, fingerprints, decisions)
+        return dfs, names
+
+    def _fix_batch(
+        self, frames: List[DataFrame], frame_names: List[str], complete: bool = True
+    ) -> Tuple[List[DataFrame], List[str]]:
+        """Applies `fix` to the frames of a batch, dropping those that cannot be corrected.
+
+        The `Unnamed` columns are dropped and the names normalized, and with
+        `complete=True` the period column and the config of the columns are applied too,
+        all the steps being compiled into a single `TransformPlan` per frame. The corrected
+        frame shares the column data of the parsed one, the bytes of the copies that the
+        plan avoids are recorded as `bytes_saved`.
+        """
+        corrected_frames, corrected_names = [], []
+        for j, df in enumerate(frames):
+            print(f"Applying DataFrame corrections to {frame_names[j]}")
+            with self.profiler.profile("build", "fix", frame_names[j]) as record:
+                plan = self._fix_plan(df)
+                corrected_df = None
+                if plan is not None:
+                    if complete:
+                        plan = self._frame_plan(plan, frame_names[j])
+                    corrected_df = plan.apply(df)
+                    record["rows"], record["bytes"] = table_size(corrected_df)
+                    record["bytes_saved"] = plan.saved_bytes(df)
+            # The corrected frame shares the data of the raw one, which is not needed anymore
+            frames[j] = df = None
+            if corrected_df is not None:
+                corrected_frames.append(corrected_df)
+                corrected_names.append(frame_names[j])
+            print(f"{j} | Progress: {100 * j / len(frames):.2f}%")
+            clear_console()
+        return corrected_frames, corrected_names
+
+    def _read_batches(
+        self,
+        filter_files: List[str],
+        prefetch: int = 0,
+        prefetch_bytes: int = 256 * 1024**2,
+        stream: bool = False,
+        excel_engine: str = "pandas",
+        sheet_workers: int = 1,
+    ) -> Iterator[Tuple[List[DataFrame], List[str], Optional[str], bool]]:
+        """Yields the batches of `_read_directory`, plus whether their frames are already
+        corrected.
+
+        When the workflow has a `cache_dir`, the corrected frames of each file are kept
+        there, keyed by the blob name and its ETag. The frames of unchanged blobs are read
+        from it and only the other blobs are downloaded, one batch per blob in the order of
+        `filter_files`."""
+        if self.cache is None:
+            batches = self._read_directory(
+                filter_files, prefetch, prefetch_bytes, stream, excel_engine, sheet_workers
+            )
+            for frames, frame_names, blob_name in batches:
+                yield frames, frame_names, blob_name, False
+            return
+
+        cached = deque(
+            name for name in filter_files if self.cache.contains(name, self._blob_etag(name))
+        )
+        cached_names = set(cached)
+        position = {name: i for i, name in enumerate(filter_files)}
+        batches = self._read_directory(
+            [name for name in filter_files if name not in cached_names],
+            prefetch,
+            prefetch_bytes,
+            True,
+            excel_engine,
+            sheet_workers,
+        )
+        for batch in chain(batches, [None]):
+            # Blobs skipped by `_read_directory` have no batch, the cached blobs that
+            # precede the next downloaded one are yielded first
+            until = position[batch[2]] if batch is not None else len(filter_files)
+            while cached and position[cached[0]] < until:
+                blob_name = cached.popleft()
+                with self.profiler.profile("build", "cache", blob_name) as record:
+                    entry = self.cache.get(blob_name, self._blob_etag(blob_name))
+                    if entry is not None:
+                        record["rows"], record["bytes"] = table_size(entry[0])
+                if entry is not None:
+                    print(f"Reading {blob_name} from the cache")
+                    yield *entry, blob_name, True
+                else:
+                    # Evicted since it was looked up
+                    for frames, frame_names, _ in self._read_directory(
+                        [blob_name], 0, prefetch_bytes, True, excel_engine, sheet_workers
+                    ):
+                        yield frames, frame_names, blob_name, False
+            if batch is not None:
+                yield *batch, False
+
+    def _read_directory(
+        self,
+        filter_files: List[str],
+        prefetch: int = 0,
+        prefetch_bytes: int = 256 * 1024**2,
+        stream: bool = False,
+        excel_engine: str = "pandas",
+        sheet_workers: int = 1,
+    ) -> Iterator[Tuple[List[DataFrame], List[str], Optional[str]]]:
+        """Yields the non-empty frames of a directory and the blob they come from, one
+        batch per blob when prefetching or streaming, a single batch for the whole
+        directory (without blob name) otherwise.
+
+        `prefetch` blobs are downloaded concurrently ahead of the file being parsed and
+        corrected (`0` reads the whole directory first), and `prefetch_bytes` bounds the
+        bytes held by blobs downloaded but not yet consumed. `excel_engine` selects the
+        reader of `.xlsx` files (see `EXCEL_ENGINES`): `openpyxl` streams the cell values of
+        a read-only workbook and `calamine` requires python-calamine, `auto` picking the
+        fastest one installed. With `sheet_workers > 1` the sheets of a workbook are parsed
+        in parallel processes.
+        """
+        regex = r"\w+\.(xlsx|csv)"
+        self.controller.excel_engine = excel_engine
+        self.controller.sheet_workers = sheet_workers
+        if prefetch <= 0:
+            batches = [[name] for name in filter_files] if stream else [filter_files]
+            for batch in batches:
+                item = batch[0] if len(batch) == 1 else f"{len(batch)} files"
+                with self.profiler.profile("build", "read", item) as record:
+                    self.controller.file_list = [BlobPrefix(name) for name in batch]
+                    df_list, name_list = self.controller.get_excel_csv(
+                        directory_name=self.directory, regex=regex, manual_mode=True
+                    )
+                    record["rows"] = table_size(df_list)[0]
+                    record["bytes"] = sum(self._blob_size(name) for name in batch)
+                df_list, name_list = check_empty_df(dfs=df_list, names=name_list)
+                yield df_list, name_list, batch[0] if stream else None
+            return
+
+        blob_names = []
+        for name in filter_files:
+            if re.search(regex, name, re.IGNORECASE):
+                blob_names.append(name)
+            else:
+                print(f"Ignoring {name}, does not match {regex}")
+        prefetcher = BlobPrefetcher(
+            self.controller,
+            blob_names,
+            concurrency=prefetch,
+            max_bytes=prefetch_bytes,
+            sizes={name: self._blob_size(name) for name in blob_names},
+            profiler=self.profiler,
+        )
+        for blob_name, blob_data in prefetcher:
+            with self.profiler.profile("build", "parse", blob_name) as record:
+                df_list, name_list = read_excel_csv_blob(
+                    blob_name, blob_data, excel_engine, sheet_workers
+                )
+                record["rows"], record["bytes"] = table_size(df_list)[0], len(blob_data)
+            del blob_data
+            df_list, name_list = check_empty_df(dfs=df_list, names=name_list)
+            yield df_list, name_list, blob_name
+
+    def _start_run(self, files: List[str], resume: bool = True) -> Tuple[dict, List[str]]:
+        """Gets the state of the build of the checkpointed run to resume, starting a new run
+        unless it was interrupted with the same listing of files.
+
+        When the workflow has a `checkpoint_dir`, the tables of each stage are written
+        there, and the build of a resumed run is restored instead of executed.
+
+        A run is identified by the `listing_fingerprint` of the files listed by `build`. With
+        `resume=False`, or when the blobs changed since the run was interrupted, the
+        checkpoint is cleared and a new run is started. The files of a run interrupted
+        before its tables were loaded are returned, to be built again with the new ones,
+        since the catalog already recorded them.
+        """
+        if self.checkpoint is None:
+            return {}, []
+        fingerprint = listing_fingerprint(files, self.blob_properties)
+        state = self.checkpoint.get_state("build")
+        if resume and state.get("fingerprint") == fingerprint:
+            return state, []
+        carried = []
+        if not self.checkpoint.is_completed("load"):
+            carried = [file for file in state.get("files", []) if file in self.blob_properties]
+        if carried:
+            logger.info(f"Building again the {len(carried)} files of the interrupted run...")
+        self.checkpoint.clear()
+        self.checkpoint.save_state("build", fingerprint=fingerprint)
+        return {}, carried
+
+    def _complete_stage(self, stage: str) -> None:
+        """Records that `stage` finished, clearing the checkpoint when it is the last stage of
+        the run (`checkpoint_final_stage`), so the next `build` starts a new run."""
+        if stage == self.checkpoint_final_stage:
+            self.checkpoint.clear()
+        else:
+            self.checkpoint.complete(stage)
+
+    def _workflow_state(self) -> dict:
+        return dict(
+            table_names=self.table_names,
+            table_data=self.table_data,
+            table_sources=self.table_sources,
+            directories=self.directories,
+        )
+
+    def _checkpoint_stage(self, stage: str) -> None:
+        """Writes the tables and state of the workflow after `stage`."""
+        if self.checkpoint is None:
+            return
+        if stage != self.checkpoint_final_stage:
+            for i, table in enumerate(self.tables):
+                self.checkpoint.save_table(stage, i, table)
+            self.checkpoint.save_state(stage, **self._workflow_state())
+        self._complete_stage(stage)
+
+    def _restore_checkpoint(self, stage: str) -> None:
+        """Restores the tables and state of the workflow after `stage`."""
+        state = self.checkpoint.get_state(stage)
+        self.table_names = state["table_names"]
+        self.table_data = state["table_data"]
+        self.table_sources = state["table_sources"]
+        self.directories = state["directories"]
+        # The tables are not read back when the stage consuming them already finished
+        next_stage = CheckpointManager.STAGES[CheckpointManager.STAGES.index(stage) + 1]
+        if self.checkpoint.is_completed(next_stage):
+            self.tables = []
+            return
+        tables = self.checkpoint.load_tables(stage)
+        self.tables = [tables[i] for i in sorted(tables)]
+
+    def _blob_size(self, blob_name: str) -> int:
+        return self.blob_properties.get(blob_name, {}).get("size", 0)
+
+    def _blob_etag(self, blob_name: str) -> Optional[str]:
+        return self.blob_properties.get(blob_name, {}).get("etag")
+
+    def __getstate__(self) -> dict:
+        # Storage clients hold open sessions, they are rebuilt on the receiving side
+        state = self.__dict__.copy()
+        for attribute in ("controller", "manager", "loader", "tables", "database_handler"):
+            state.pop(attribute, None)
+        return state
 
-            self._name_settings(names, dir)
-            self.tables.extend(dfs)
-        del corrected_df, processed_dfs, df_list, name_list
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.controller = get_storage_controller(
+            self.conn_string, self.container_name, self.backend
+        )
+        self.tables = []
 
     def curate(
         self, rename_manually: bool = True, cleaning: bool = True, engine: str = "pyarrow", **kwargs
     ) -> List[Table] | List[DataFrame]:
-        self.engine = engine
-        """Processes the created database to load it into the Azure SQL database."""
-        print("The names of the tables to be processed are as follows :")
-        print(tabulate(self.table_data, headers=["index", "names"], tablefmt="grid"))
-        rename_tables = input("You want to rename the tables [y/n] :")
-        write_to_cloud = kwargs["write_to_cloud"] if "write_to_cloud" in kwargs else False
-        snake_case = kwargs["snake_case"] if "snake_case" in kwargs else True
-        sort = kwargs["sort"] if "sort" in kwargs else False
-        surrounding = kwargs["surrounding"] if "surrounding" in kwargs else True
-        if rename_tables == "y":
-            if not rename_manually:
-                self.table_names = set_table_names(self.table_names)
+        """Processes the created database to load it into the Azure SQL database.
+
+        With `engine="pyarrow"` and `arrow_native=True`, each table is converted to Arrow
+        once and its columns are standardized, cleaned and typed with `pyarrow.compute`
+        (see `clean_table` and `coerce_types`) instead of going through pandas, Polars
+        and `DataSchema`.
+        """
+        with self.profiler.profile("curate") as stage:
+            self.engine = engine
+            if self.checkpoint is not None and self.checkpoint.is_completed("curate"):
+                logger.info("Restoring the output of the curate stage from the checkpoint...")
+                self._restore_checkpoint("curate")
+                stage["rows"], stage["bytes"] = table_size(self.tables)
+                return self.tables
+            curate_state = self.checkpoint.get_state("curate") if self.checkpoint else {}
+            print("The names of the tables to be processed are as follows :")
+            print(tabulate(self.table_data, headers=["index", "names"], tablefmt="grid"))
+            if "table_names" in curate_state:
+                # The tables were already renamed by the interrupted run
+                self.table_names = curate_state["table_names"]
+                rename_tables = "n"
             else:
-                for i, table_name in enumerate(self.table_names):
-                    message = "insert the new name for the table {%s} : " % table_name
-                    rename_table = input(message)
-                    self.table_names[i] = rename_table
-        for i, _ in enumerate(self.tables):
-            if not isinstance(self.tables[i], DataFrame):
-                self.tables[i] = self.tables[i].to_frame().reset_index()
-
-            column_handler = StandardColumns(self.tables[i])
-            self.tables[i] = column_handler.get_frame(
-                self.table_names[i] + ".json",
-                write_to_cloud,
-                self.conn_string,
-                self.container_name,
-                snake_case=snake_case,
-                sort=sort,
-                surrounding=surrounding,
-            )
-            del column_handler
-            if cleaning:
-                print(f"Starting the cleaning process of {self.table_names[i]}")
-                self.tables[i] = self.clean_db(self.tables[i], **kwargs)
-                print("process completed!")
-                clear_console()
-            handler = ColumnsDtypes(self.tables[i])
-            self.tables[i] = handler.correct()
-            if engine == "pyarrow":
-                schema_handler = DataSchema(self.tables[i])
-                self.tables[i] = schema_handler.get_table()
-        del handler
-        return self.tables
+                rename_tables = input("You want to rename the tables [y/n] :")
+            write_to_cloud = kwargs["write_to_cloud"] if "write_to_cloud" in kwargs else False
+            snake_case = kwargs["snake_case"] if "snake_case" in kwargs else True
+            sort = kwargs["sort"] if "sort" in kwargs else False
+            surrounding = kwargs["surrounding"] if "surrounding" in kwargs else True
+            arrow_native = kwargs["arrow_native"] if "arrow_native" in kwargs else False
+            if write_to_cloud and self.backend != "azure":
+                warnings.warn(
+                    "write_to_cloud=True ignored because backend is not azure", UserWarning
+                )
+                write_to_cloud = False
+            if rename_tables == "y":
+                if not rename_manually:
+                    self.table_names = set_table_names(self.table_names)
+                else:
+                    for i, table_name in enumerate(self.table_names):
+                        message = "insert the new name for the table {%s} : " % table_name
+                        rename_table = input(message)
+                        self.table_names[i] = rename_table
+            if self.checkpoint is not None:
+                self.checkpoint.save_state("curate", **self._workflow_state())
+            curated_tables = self.checkpoint.load_tables("curate") if self.checkpoint else {}
+            for i, _ in enumerate(self.tables):
+                if i in curated_tables:
+                    self.tables[i] = curated_tables.pop(i)
+                    continue
+                if engine == "pyarrow" and arrow_native:
+                    table = self.tables[i]
+                    if isinstance(table, DataFrame):
+                        table = to_arrow(table)
+                    self.tables[i] = table = standardize_columns(
+                        table,
+                        self.table_names[i] + ".json",
+                        write_to_cloud,
+                        self.conn_string,
+                        self.container_name,
+                        snake_case=snake_case,
+                        sort=sort,
+                        surrounding=surrounding,
+                    )
+                    if cleaning:
+                        with self.profiler.profile(
+                            "curate", "clean_db", self.table_names[i]
+                        ) as record:
+                            table = clean_table(table, **kwargs)
+                            record["rows"], record["bytes"] = table_size(table)
+                    self.tables[i] = table = attach_statistics(coerce_types(table))
+                    if self.checkpoint is not None:
+                        self.checkpoint.save_table("curate", i, table)
+                    continue
+                if not isinstance(self.tables[i], DataFrame):
+                    self.tables[i] = self.tables[i].to_frame().reset_index()
+
+                column_handler = StandardColumns(self.tables[i])
+                self.tables[i] = column_handler.get_frame(
+                    self.table_names[i] + ".json",
+                    write_to_cloud,
+                    self.conn_string,
+                    self.container_name,
+                    snake_case=snake_case,
+                    sort=sort,
+                    surrounding=surrounding,
+                )
+                del column_handler
+                if cleaning:
+                    print(f"Starting the cleaning process of {self.table_names[i]}")
+                    with self.profiler.profile("curate", "clean_db", self.table_names[i]) as record:
+                        self.tables[i] = self.clean_db(self.tables[i], **kwargs)
+                        record["rows"], record["bytes"] = table_size(self.tables[i])
+                    print("process completed!")
+                    clear_console()
+                handler = ColumnsDtypes(self.tables[i])
+                self.tables[i] = handler.correct()
+                del handler
+                if engine == "pyarrow":
+                    schema_handler = DataSchema(self.tables[i])
+                    self.tables[i] = schema_handler.get_table()
+                    if self.tables[i] is not None:
+                        # Kept in the Parquet metadata so `upload` does not infer the types again
+                        self.tables[i] = attach_statistics(self.tables[i])
+                if self.checkpoint is not None:
+                    self.checkpoint.save_table("curate", i, self.tables[i])
+            if self.checkpoint is not None:
+                self._complete_stage("curate")
+            stage["rows"], stage["bytes"] = table_size(self.tables)
+            return self.tables
 
     def load(self, container_name: str = "processed", engine: str = "pyarrow", **kwargs) -> None:
-        print("Uploading data curated to Azure Blob storage...\n")
-        format_type = kwargs["format_type"] if "format_type" in kwargs else "csv"
-        encoding = kwargs["encoding"] if "encoding" in kwargs else "utf-8"
-        self.loader = StorageController(self.conn_string, container_name)
-        if engine == "pyarrow":
-            files_not_loaded = self.loader.write_pyarrow(
-                self.project, self.tables, self.table_names
+        """Writes the curated tables to the `container_name` container.
+
+        With `engine="pyarrow"` each table is written as `project/table.parquet`. The
+        `row_group_size`, `compression` (see `PARQUET_CODECS`) and `use_dictionary`
+        (`True`, `False` or a list of columns) keywords tune the Parquet files. With
+        `partition_by` (such as `"periodo"`) each value of the column is written to its
+        own `project/table/periodo=value/table.parquet` blob, and only the partitions of
+        the values present in the tables are replaced, so loading a new period leaves
+        the blobs of the previous ones untouched. Loading a table with the other layout
+        than its previous load deletes the blobs of the previous layout.
+        """
+        with self.profiler.profile("load") as stage:
+            print("Uploading data curated to Azure Blob storage...\n")
+            format_type = kwargs["format_type"] if "format_type" in kwargs else "csv"
+            encoding = kwargs["encoding"] if "encoding" in kwargs else "utf-8"
+            partition_by = kwargs["partition_by"] if "partition_by" in kwargs else None
+            options = parquet_options(
+                row_group_size=kwargs.get("row_group_size"),
+                compression=kwargs.get("compression", "snappy"),
+                use_dictionary=kwargs.get("use_dictionary", True),
             )
-            self._remove_from_catalog(files_not_loaded)
+            if self.checkpoint is not None and self.checkpoint.is_completed("load"):
+                logger.info("The tables were already loaded by a previous run.")
+                return
+            loaded = set(self.checkpoint.completed_items("load")) if self.checkpoint else set()
+            self.loader = get_storage_controller(self.conn_string, container_name, self.backend)
+            files_not_loaded = []
+            operation = "write_pyarrow" if engine == "pyarrow" else "upload_excel_csv"
+            for table, table_name in zip(self.tables, self.table_names):
+                if table_name in loaded:
+                    continue
+                with self.profiler.profile("load", operation, table_name) as record:
+                    record["rows"], record["bytes"] = table_size(table)
+                    if engine == "pyarrow":
+                        files_not_loaded += self._write_parquet(
+                            table, table_name, partition_by, **options
+                        )
+                    else:
+                        self.loader.upload_excel_csv(
+                            self.project, [table], [table_name], format_type, encoding
+                        )
+                if self.checkpoint is not None:
+                    self.checkpoint.mark_item("load", table_name)
+            if engine == "pyarrow":
+                self._remove_from_catalog(files_not_loaded)
+            if self.checkpoint is not None:
+                self._complete_stage("load")
+            stage.update(self.profiler.totals("load", operation, since=stage["started_at"]))
+            del self.tables, self.controller, self.loader
+
+    def _write_parquet(
+        self,
+        table: Table | DataFrame | None,
+        table_name: str,
+        partition_by: Optional[str],
+        **options,
+    ) -> List[str]:
+        """Writes a table with `load`, returning its name if it could not be written."""
+        if table is None:
+            return [table_name]
+        if isinstance(table, DataFrame):
+            table = Table.from_pandas(table, preserve_index=False)
+        if partition_by is not None and partition_by in table.column_names:
+            write_partitioned(self.loader, self.project, table, table_name, partition_by, **options)
         else:
-            self.loader.upload_excel_csv(
-                self.project, self.tables, self.table_names, format_type, encoding
-            )
-        del self.tables, self.controller, self.loader
+            if partition_by is not None:
+                warnings.warn(
+                    f"{table_name} has no {partition_by} column, it is not partitioned",
+                    UserWarning,
+                )
+            blob_name = f"{self.project}/{table_name}.parquet"
+            self.loader.write_parquet_blob(blob_name, table, overwrite=True, **options)
+            # The partitions of a previous partitioned load would be uploaded as well
+            for partition_name in partition_blobs(self.loader, self.project, table_name):
+                self.loader.delete_blob(partition_name)
+        return []
 
     def upload(
         self,
@@ -245,24 +863,78 @@ class ETLWorkflow:
         engine: str = "pyarrow",
         **kwargs,
     ) -> None:
-        print("Uploading data to Azure SQL Database...\n")
-        self.loader = StorageController(self.conn_string, container_name)
-        files_processed = self.loader.get_all_blob(self.project)
-        files_filtered: list = []
-        try:
-            _ = self.directories[0]
-        except AttributeError:
-            self.set_directories(files_processed)
-        for dir in self.directories:
-            files_filtered += list_filter(files_processed, dir, True)
-        print(
-            "These are the tables that will be uploaded to SQL or will be updated :",
-            files_filtered,
-        )
-        files_parquet = list_filter(files_filtered, ".parquet")
-        database_handler = DatabaseManager(self.conn_string, container_name, self.db_conn_string)
-        database_handler.upload(files=files_parquet, directory=self.project, **kwargs)
-        print("process completed!")
+        with self.profiler.profile("upload") as stage:
+            print("Uploading data to Azure SQL Database...\n")
+            self.loader = get_storage_controller(self.conn_string, container_name, self.backend)
+            index = BlobIndex.from_pages(self.loader.list_blob_pages(self.project))
+            # The listing also holds the blobs of the projects whose name starts alike
+            index = BlobIndex(index.under(self.project))
+            files_filtered = self._processed_files(index)
+            print(
+                "These are the tables that will be uploaded to SQL or will be updated :",
+                files_filtered,
+            )
+            files_parquet = [file for file in files_filtered if file.endswith(".parquet")]
+            # The handler and its tuned batch size are reused by later uploads to the container
+            database_handler = getattr(self, "database_handler", None)
+            if (
+                database_handler is None
+                or database_handler.storage.container_name != container_name
+            ):
+                if database_handler is not None:
+                    database_handler.close()
+                database_handler = DatabaseManager(
+                    self.conn_string,
+                    container_name,
+                    self.db_conn_string,
+                    backend=self.backend,
+                    profiler=self.profiler,
+                )
+                self.database_handler = database_handler
+            # The connections are closed once the files are uploaded, not kept between calls
+            with database_handler:
+                if self.checkpoint is None:
+                    database_handler.upload(files=files_parquet, directory=self.project, **kwargs)
+                else:
+                    self._upload_pending(database_handler, files_parquet, **kwargs)
+            stage.update(self.profiler.totals("upload", "execute", since=stage["started_at"]))
+            print("process completed!")
+
+    def _processed_files(self, index: BlobIndex) -> List[str]:
+        """Selects the processed blobs of the tables of the workflow, those written by `load`
+        as `project/table.parquet` or under `project/table/`.
+
+        Blobs are selected by segment, so the table `TB_BI_ventas` does not select the blobs
+        of `TB_BI_ventas_old`. Without a build, the tables are the segments of the
+        processed blobs under the project, and after a build with nothing new there is
+        nothing to upload.
+        """
+        if getattr(self, "directories", None) is None:
+            self.set_directories(index.under(self.project))
+            segments, level = self.directories, self.directory_level
+        else:
+            segments = [name + suffix for name in self.table_names for suffix in ("", ".parquet")]
+            level = len(self.project.strip("/").split("/")) if self.project.strip("/") else 0
+        files = [file for segment in segments for file in index.files(segment, level)]
+        return list(dict.fromkeys(files))
+
+    def _upload_pending(
+        self, database_handler: DatabaseManager, files_parquet: List[str], **kwargs
+    ) -> None:
+        """Uploads the files not uploaded by a previous run, recording each one."""
+        uploaded = set(self.checkpoint.completed_items("upload"))
+        pending = [file for file in files_parquet if file not in uploaded]
+        # Partitions of a table already started are appended to it, not overridden
+        started = {file.rsplit("/", 1)[-1] for file in uploaded}
+        for file in pending:
+            table_file = file.rsplit("/", 1)[-1]
+            file_kwargs = dict(kwargs, method="append") if table_file in started else kwargs
+            if database_handler.upload(files=[file], directory=self.project, **file_kwargs):
+                self.checkpoint.mark_item("upload", file)
+                uploaded.add(file)
+                started.add(table_file)
+        if uploaded.issuperset(files_parquet):
+            self._complete_stage("upload")
 
     @abstractmethod
     def clean_db(self, table: DataFrame, **kwargs) -> DataFrame:
@@ -275,21 +947,28 @@ class ETLWorkflow:
 
     def fix(self, df: DataFrame, drop_columns: bool = False) -> DataFrame:
         """Fix the dataframe according to predefined rules"""
-        try:
-            df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
-        except TypeError as e:
-            # This happens when there is only one column left after dropping Unnamed columns
-            warning_type = "UserWarning"
-            msg = "There is a problem with the database so it will not be processed, perform correction manually."
-            msg += "Error: {%s}" % e
-            print(f"{warning_type}: {msg}")
+        plan = self._fix_plan(df)
+        if plan is None:
             return None
+        df = plan.apply(df)
         if drop_columns:
             df = drop_empty_columns(df)
-        column_handler = ColumnsCheck(df)
-        df = column_handler.get_frame()
         return df
 
+    def _fix_plan(self, df: DataFrame) -> Optional[TransformPlan]:
+        """Plans the corrections of `fix`, `None` if the frame cannot be corrected."""
+        plan = TransformPlan.fix(df.columns)
+        if plan is None:
+            # This happens when the header is missing and columns are named by position
+            warning_type = "UserWarning"
+            msg = (
+                "There is a problem with the database so it will not be processed, "
+                "perform correction manually."
+            )
+            msg += "Error: {column names must be strings, got %s}" % list(df.columns)[:5]
+            print(f"{warning_type}: {msg}")
+        return plan
+
     def set_directories(self, files: List[str]) -> List[str]:
         """Inspects all directories and returns a list of names"""
         self.directories = sorted(self._read_root(files))
@@ -297,17 +976,6 @@ class ETLWorkflow:
         print(self.directories)
         return self.directories
 
-    def _remove_errors(
-        self, index_errors: List[int], df_list: List[DataFrame], name_list: List[str]
-    ) -> List[DataFrame]:
-        """Removes errors from dataframes in case they were not caught during processing"""
-        # check that index_errors is not empty
-        if len(index_errors) > 0:
-            for index_error in index_errors:
-                df_list.pop(index_error)
-                name_list.pop(index_error)
-        return df_list, name_list
-
     def _name_settings(self, names: List[str], dir: str) -> None:
         """Create a unique name for each database based on its content."""
         for name in names:
@@ -326,18 +994,33 @@ class ETLWorkflow:
             self.table_data.append([len(self.table_names), self.table_names[-1]])
 
     def _load_config(self, yaml_path: str = "./utilities/config_data.yml") -> None:
+        """Loads the config of the columns and compiles its rules, unless the file is the
+        one already loaded and did not change since.
+
+        The rules of the columns to delete and to rename can be names, `re:` regular
+        expressions or `glob:` patterns. They are compiled into `ColumnRules`, which
+        resolves the columns of each schema once for all the files sharing it.
+        """
         try:
+            config_key = (os.path.abspath(yaml_path), os.path.getmtime(yaml_path))
+            if config_key == self._config_key:
+                return
             with open(yaml_path, "r") as file:
                 yaml_data = yaml.safe_load(file)
             self.yaml_data = yaml_data
+            self.column_rules = ColumnRules(
+                yaml_data.get("columns_to_delete"), yaml_data.get("columns_to_rename")
+            )
+            self._config_key = config_key
         except:
             raise Exception("Error loading config file.")
 
-    def _ops_cols(self, df: DataFrame) -> DataFrame:
+    def _frame_plan(self, plan: TransformPlan, frame_name: str) -> TransformPlan:
+        """Adds the period column and the config of the columns to the plan of a frame."""
+        plan = plan.insert("periodo", get_period(frame_name))
         if self.add_config:
-            df = remove_by_dict(df, self.yaml_data["columns_to_delete"])
-            df = df.rename(columns=self.yaml_data["columns_to_rename"])
-        return df
+            plan = plan.drop_rename(self.column_rules)
+        return plan
 
     def _update_logs(self, dir: str, name_list: List[str], logs_path: str = "./logs/") -> None:
         assert logs_path.endswith("/"), "Directory not valid, must end with backslash."
@@ -354,35 +1037,55 @@ class ETLWorkflow:
     def _read_root(self, files) -> List[str]:
         """Read a list of file names in blob storage and return their root directories"""
         self.controller.file_list = [BlobPrefix(name) for name in files]
-        return get_directories(files)
+        # The index of the listing is reused when every file of the listing is processed
+        index = self.blob_index
+        if index is None or len(index) != len(files) or not all(name in index for name in files):
+            index = BlobIndex(files)
+        self.blob_index = index
+        self.directory_level, directories = find_directories(index)
+        return directories
 
     def _update_catalog(self, files, delete_catalog) -> None:
         if delete_catalog:
             self.manager._clean()
         if self._consult_catalog(files) is None:
-            self.manager.create_log(files, delete_catalog)
+            self.manager.create_log(files, delete_catalog, properties=self.blob_properties)
         else:
-            files = self.manager.diff(files)
-            self.manager.update(files)
+            files = self.manager.diff(files, self.blob_properties)
+            if files:
+                self.manager.update(files, properties=self.blob_properties)
         return files
 
     def _remove_from_catalog(self, files_not_loaded) -> None:
-        # Remove from catalog any files that could not be processed
-        try:
-            files_not_loaded = [
-                (files_not).replace("TB_BI_" + self.client_name.lower(), "")
-                for files_not in files_not_loaded
-            ]
-            self.manager.remove(files_not_loaded)
-        except:
-            pass
+        # Remove from catalog the source files of the tables that could not be processed
+        if not files_not_loaded:
+            return
+        files_not_loaded = set(files_not_loaded)
+        source_files = [
+            file
+            for table_name, files in zip(self.table_names, self.table_sources)
+            if table_name in files_not_loaded
+            for file in files
+        ]
+        self.manager.remove(source_files)
 
     def _get_file_list(self, **kwargs) -> List[str]:
+        """Lists the blobs to build, without those of `exclude_files` and the column memo.
+
+        The blobs are listed one page at a time into a `BlobIndex`, from which the
+        directories (the segments at the first level under the project) and the files of
+        each directory are taken. A directory only gets the blobs under it, not those of
+        other directories whose name contains its own.
+        """
         filter_criteria = kwargs["filter_criteria"] if "filter_criteria" in kwargs else self.project
         exclude_files = kwargs["exclude_files"] if "exclude_files" in kwargs else self.exclude_files
-        files = self.controller.get_all_blob(filter_criteria)
-        files = list_remove(files, exclude_files)
-        return files
+        # The listing is indexed one page at a time, as it is received
+        self.blob_properties, self.blob_index = {}, BlobIndex()
+        for page in self.controller.list_blob_pages(filter_criteria):
+            self.blob_properties.update(page)
+            names = list_remove(list(page), exclude_files, segments=True)
+            self.blob_index.update(list_remove(names, MEMO_NAME, segments=True))
+        return self.blob_index.names()
 
     def _consult_catalog(self, files) -> List[str] | None:
         is_catalog = self.manager.audit()
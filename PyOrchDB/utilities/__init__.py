@@ -1,2 +1,18 @@
+from PyOrchDB.utilities.blob_index import *
+from PyOrchDB.utilities.bulk import *
+from PyOrchDB.utilities.cache import *
 from PyOrchDB.utilities.catalog import *
+from PyOrchDB.utilities.checkpoint import *
+from PyOrchDB.utilities.curation import *
+from PyOrchDB.utilities.excel import *
+from PyOrchDB.utilities.matching import *
+from PyOrchDB.utilities.memo import *
+from PyOrchDB.utilities.partition import *
+from PyOrchDB.utilities.prefetch import *
+from PyOrchDB.utilities.profiling import *
+from PyOrchDB.utilities.schema import *
+from PyOrchDB.utilities.statistics import *
+from PyOrchDB.utilities.storage import *
 from PyOrchDB.utilities.tools import *
+from PyOrchDB.utilities.transform import *
+from PyOrchDB.utilities.watermark import *
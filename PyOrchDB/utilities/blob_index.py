@@ -0,0 +1,115 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class _Node:
+    __slots__ = ("children", "name", "order")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Blob ending at this node and its position in the listing
+        self.name: Optional[str] = None
+        self.order: int = -1
+
+
+class BlobIndex:
+    """Prefix tree of blob names keyed on their `/` separated segments.
+
+    The index is built once from the listing of a container, possibly one page at a
+    time, and answers which segments exist at a level of the tree (the directories of
+    a project are the segments at level 1) and which blobs lie under a segment, in time
+    proportional to the answer. Segments are compared as a whole, so the directory
+    `ventas` does not match the blobs of `ventas_old`.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        """
+        Parameters
+        ----------
+        names : `Iterable`
+            Blob names, in the order of the listing.
+        """
+        self.root = _Node()
+        # Nodes of each segment at each level
+        self.levels: List[Dict[str, List[_Node]]] = []
+        self.size = 0
+        self.update(names)
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Iterable[str]]) -> "BlobIndex":
+        """Build the index from a listing returned one page at a time."""
+        index = cls()
+        for page in pages:
+            index.update(page)
+        return index
+
+    def update(self, names: Iterable[str]) -> None:
+        """Add blob names to the index, after those already added."""
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str) -> None:
+        """Add a blob name, ignored if it is already in the index."""
+        node = self.root
+        for level, segment in enumerate(name.strip("/").split("/")):
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _Node()
+                if level == len(self.levels):
+                    self.levels.append({})
+                self.levels[level].setdefault(segment, []).append(child)
+            node = child
+        if node.name is None:
+            node.name, node.order = name, self.size
+            self.size += 1
+
+    def segments(self, level: int = 1) -> List[str]:
+        """Get the distinct segments at `level`, both directories and blobs, in listing order."""
+        if level >= len(self.levels):
+            return []
+        return list(self.levels[level])
+
+    def files(self, segment: Optional[str] = None, level: int = 0) -> List[str]:
+        """Get the blobs whose segment at `level` is `segment` (all blobs if `None`), in
+        listing order."""
+        if segment is None:
+            nodes = [self.root]
+        elif level < len(self.levels):
+            nodes = self.levels[level].get(segment, [])
+        else:
+            nodes = []
+        found = [node for start in nodes for node in self._walk(start)]
+        found.sort(key=lambda node: node.order)
+        return [node.name for node in found]
+
+    def under(self, path: str) -> List[str]:
+        """Get the blobs under a `/` separated path, such as a project, in listing order."""
+        node = self.root
+        for segment in path.strip("/").split("/") if path.strip("/") else []:
+            node = node.children.get(segment)
+            if node is None:
+                return []
+        return [found.name for found in sorted(self._walk(node), key=lambda node: node.order)]
+
+    def names(self) -> List[str]:
+        """Get every blob name in listing order."""
+        return self.files()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, name: str) -> bool:
+        node = self.root
+        for segment in name.strip("/").split("/"):
+            node = node.children.get(segment)
+            if node is None:
+                return False
+        return node.name is not None
+
+    @staticmethod
+    def _walk(node: _Node) -> Iterator[_Node]:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.name is not None:
+                yield node
+            stack.extend(node.children.values())
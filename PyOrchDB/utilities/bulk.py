@@ -0,0 +1,664 @@
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pyarrow.types as pat
+
+# Setting up basic configuration for logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Prefix of the database connection strings handled by SQLite, a local stand-in for SQL Server
+SQLITE_PREFIX = "sqlite:///"
+
+
+def sqlite_connect(connection_string: str) -> sqlite3.Connection:
+    """Open the SQLite database of a `sqlite:///<path>` connection string.
+
+    The connection can be used from any thread, one at a time, as the `ConnectionPool`
+    guarantees.
+    """
+    database = connection_string.removeprefix(SQLITE_PREFIX)
+    return sqlite3.connect(database, timeout=60, check_same_thread=False)
+
+
+def quote_identifier(identifier: str) -> str:
+    """Surround an identifier with brackets unless it already is."""
+    if identifier.startswith("[") and identifier.endswith("]"):
+        return identifier
+    return "[" + identifier.replace("]", "]]") + "]"
+
+
+def sql_type(field: pa.Field, length: Optional[int] = None, char_length: int = 256) -> str:
+    """Map the type of an Arrow field to a SQL Server column type.
+
+    Args:
+        field (pa.Field): Field of the Arrow schema.
+        length (Optional[int]): Maximum length of the strings of the column, if known.
+        char_length (int): Length of `VARCHAR` columns whose maximum length is unknown.
+
+    Returns:
+        str: SQL column type.
+    """
+    dtype = field.type
+    if pat.is_dictionary(dtype):
+        dtype = dtype.value_type
+    if pat.is_boolean(dtype):
+        return "BIT"
+    if pat.is_integer(dtype):
+        return "BIGINT" if dtype.bit_width == 64 or dtype == pa.uint32() else "INT"
+    if pat.is_floating(dtype) or pat.is_decimal(dtype):
+        return "FLOAT"
+    if pat.is_timestamp(dtype):
+        return "DATETIME2"
+    if pat.is_date(dtype):
+        return "DATE"
+    if pat.is_string(dtype) or pat.is_large_string(dtype) or pat.is_null(dtype):
+        return f"VARCHAR({max(length or char_length, 1)})"
+    raise ValueError(f"Data type of column {field.name} could not be inferred: {dtype}")
+
+
+def string_lengths(data: pa.Table | Iterable[pa.RecordBatch]) -> Dict[str, int]:
+    """Get the maximum length of the strings of each string column.
+
+    Args:
+        data (pa.Table | Iterable[pa.RecordBatch]): Table, or record batches scanned one at a time.
+
+    Returns:
+        Dict[str, int]: Maximum length of each string column.
+    """
+    batches = data.to_batches() if isinstance(data, pa.Table) else data
+    lengths = {}
+    for batch in batches:
+        for field, column in zip(batch.schema, batch.columns):
+            dtype = field.type.value_type if pat.is_dictionary(field.type) else field.type
+            if pat.is_string(dtype) or pat.is_large_string(dtype):
+                if pat.is_dictionary(field.type):
+                    column = column.cast(dtype)
+                length = pc.max(pc.utf8_length(column)).as_py() or 0
+                lengths[field.name] = max(lengths.get(field.name, 0), length)
+    return lengths
+
+
+def row_group_ranges(metadata: pq.FileMetaData, workers: int, split_rows: int) -> List[List[int]]:
+    """Split the row groups of a Parquet file into contiguous ranges with similar row counts.
+
+    Args:
+        metadata (pq.FileMetaData): Metadata of the Parquet file.
+        workers (int): Maximum number of ranges.
+        split_rows (int): Minimum number of rows of the file per range.
+
+    Returns:
+        List[List[int]]: Indices of the row groups of each range.
+    """
+    num_rows = metadata.num_rows
+    n_ranges = max(min(workers, -(-num_rows // split_rows), metadata.num_row_groups), 1)
+    ranges, current, rows = [], [], 0
+    for index in range(metadata.num_row_groups):
+        current.append(index)
+        rows += metadata.row_group(index).num_rows
+        if len(ranges) < n_ranges - 1 and rows >= num_rows * (len(ranges) + 1) / n_ranges:
+            ranges.append(current)
+            current = []
+    if current or not ranges:
+        ranges.append(current)
+    return ranges
+
+
+# Types of each family ranked by the values they can hold
+_NUMERIC_TYPES = {
+    "BIT": 0,
+    "TINYINT": 1,
+    "SMALLINT": 2,
+    "INT": 3,
+    "BIGINT": 4,
+    "DECIMAL": 5,
+    "NUMERIC": 5,
+    "REAL": 6,
+    "FLOAT": 7,
+}
+_DATE_TYPES = {"DATE": 0, "SMALLDATETIME": 1, "DATETIME": 2, "DATETIME2": 3, "DATETIMEOFFSET": 4}
+_STRING_TYPES = {"CHAR", "VARCHAR", "NCHAR", "NVARCHAR", "TEXT", "NTEXT"}
+
+
+def parse_type(column_type: str) -> Tuple[str, Optional[int]]:
+    """Split a SQL column type such as `VARCHAR(256)` into its name and length (-1 for `MAX`)."""
+    match = re.match(r"\s*(\w+)\s*(?:\(\s*(\w+)[^)]*\))?", column_type)
+    size = match.group(2)
+    if size is None:
+        return match.group(1).upper(), None
+    return match.group(1).upper(), -1 if size.upper() == "MAX" else int(size)
+
+
+def format_type(data_type: str, length: Optional[int] = None) -> str:
+    if data_type in _STRING_TYPES and length is not None:
+        return f"{data_type}({'MAX' if length == -1 else length})"
+    return data_type
+
+
+def table_columns(
+    connection: Any, table_name: str
+) -> Optional[Dict[str, Tuple[str, Optional[int]]]]:
+    """Get the type and length of the columns of a SQL table, keyed by lowercase name.
+
+    Args:
+        connection (Any): DB-API connection to SQL Server or SQLite.
+        table_name (str): Name of the table.
+
+    Returns:
+        Optional[Dict[str, Tuple[str, Optional[int]]]]: Columns of the table, `None` if the
+        table does not exist.
+    """
+    cursor = connection.cursor()
+    name = table_name.strip("[]")
+    if _is_sqlite(connection):
+        cursor.execute(f"PRAGMA table_info({quote_identifier(name)})")
+        rows = [(row[1], *parse_type(row[2] or "")) for row in cursor.fetchall()]
+    else:
+        cursor.execute(
+            "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH "
+            "FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ?",
+            (name,),
+        )
+        rows = [(column, data_type.upper(), length) for column, data_type, length in cursor]
+    return {column.lower(): (data_type, length) for column, data_type, length in rows} or None
+
+
+def reconcile_schema(
+    connection: Any,
+    table_name: str,
+    columns: Dict[str, str],
+    method: str = "append",
+    on_type_conflict: str = "raise",
+) -> str:
+    """Prepare an existing SQL table to receive the given columns.
+
+    Columns missing from the table are added and columns too narrow for the incoming
+    values (shorter `VARCHAR`, smaller numeric or date types) are altered. When a column
+    cannot hold the incoming values without changing its family, for example strings
+    into a numeric column, appending fails unless `on_type_conflict="override"`, which
+    lets the table, and the rows it holds, be dropped and created again.
+
+    Args:
+        connection (Any): DB-API connection to SQL Server or SQLite.
+        table_name (str): Name of the table.
+        columns (Dict[str, str]): SQL type of each incoming column.
+        method (str): Requested method, `"append"` or `"override"`.
+        on_type_conflict (str): `"raise"` or `"override"`, what to do when a column
+            cannot hold the incoming values.
+
+    Returns:
+        str: `"append"` if the data can be appended to the table (after the `ALTER`s),
+        `"override"` if the table does not exist or must be recreated.
+
+    Raises:
+        ValueError: If a column cannot hold the incoming values and `on_type_conflict`
+            is `"raise"`.
+    """
+    if on_type_conflict not in ("raise", "override"):
+        raise ValueError(
+            'Invalid value for argument "on_type_conflict". Choose from ["raise", "override"].'
+        )
+    existing = table_columns(connection, table_name)
+    if method == "override" or existing is None:
+        return "override"
+    statements = []
+    for column, column_type in columns.items():
+        column = column.strip("[]")
+        current = existing.get(column.lower())
+        if current is None:
+            statements.append(
+                f"ALTER TABLE {quote_identifier(table_name)} "
+                f"ADD {quote_identifier(column)} {column_type}"
+            )
+            continue
+        required = _required_type(current, parse_type(column_type))
+        if required is None:
+            if on_type_conflict == "raise":
+                raise ValueError(
+                    f"Column {column} of {table_name} ({format_type(*current)}) cannot hold "
+                    f"{column_type} values. Fix the data or upload with "
+                    f'on_type_conflict="override" to recreate the table.'
+                )
+            logger.warning(
+                f"Column {column} of {table_name} ({format_type(*current)}) cannot hold "
+                f"{column_type} values, the table will be overridden."
+            )
+            return "override"
+        # SQLite does not enforce column types, and cannot alter them either
+        if required != format_type(*current) and not _is_sqlite(connection):
+            statements.append(
+                f"ALTER TABLE {quote_identifier(table_name)} "
+                f"ALTER COLUMN {quote_identifier(column)} {required}"
+            )
+    cursor = connection.cursor()
+    for statement in statements:
+        logger.info(statement)
+        cursor.execute(statement)
+    connection.commit()
+    return "append"
+
+
+def create_table_query(table_name: str, columns: Dict[str, str]) -> str:
+    """Build the `CREATE TABLE` query of a table with the given column types."""
+    definitions = ", ".join(
+        f"{quote_identifier(name)} {column_type}" for name, column_type in columns.items()
+    )
+    return f"CREATE TABLE {quote_identifier(table_name)} ({definitions})"
+
+
+def recreate_table(connection: Any, table_name: str, create_query: str) -> None:
+    """Drop `table_name` if it exists and create it again with `create_query`."""
+    cursor = connection.cursor()
+    if table_columns(connection, table_name) is not None:
+        cursor.execute(f"DROP TABLE {quote_identifier(table_name)}")
+    cursor.execute(create_query)
+    connection.commit()
+
+
+def execute_chunk(
+    connection: Any,
+    query: str,
+    rows: List[tuple],
+    retries: int = 3,
+    retry_delay: float = 1.0,
+    record: Optional[Callable[[Any], None]] = None,
+) -> None:
+    """Insert `rows` with `executemany` in a single transaction, retrying it if it fails.
+
+    Args:
+        connection (Any): DB-API connection, not in autocommit mode.
+        query (str): Parametrized `INSERT` query.
+        rows (List[tuple]): Parameters of each row.
+        retries (int): Number of retries after the first attempt.
+        retry_delay (float): Seconds to wait before the first retry, doubled on each retry.
+        record (Optional[Callable[[Any], None]]): Called with the cursor after the insert,
+            what it writes is committed along with the rows, see `UploadProgress`.
+    """
+    for attempt in range(retries + 1):
+        try:
+            cursor = connection.cursor()
+            if hasattr(cursor, "fast_executemany"):
+                cursor.fast_executemany = True
+            cursor.executemany(query, rows)
+            if record is not None:
+                record(cursor)
+            connection.commit()
+            return
+        except Exception as e:
+            connection.rollback()
+            if attempt == retries:
+                raise
+            delay = retry_delay * 2**attempt
+            logger.warning(f"Chunk of {len(rows)} rows failed ({e}), retrying in {delay:.1f}s.")
+            time.sleep(delay)
+
+
+def _required_type(
+    current: Tuple[str, Optional[int]], incoming: Tuple[str, Optional[int]]
+) -> Optional[str]:
+    """Get the type a column must have to hold both types, `None` if they are incompatible."""
+    (current_type, current_length), (incoming_type, incoming_length) = current, incoming
+    for family in (_NUMERIC_TYPES, _DATE_TYPES):
+        if current_type in family and incoming_type in family:
+            return max(current_type, incoming_type, key=family.get)
+    if current_type in _STRING_TYPES and incoming_type in _STRING_TYPES:
+        if current_length in (None, -1) or (incoming_length or 0) <= current_length:
+            return format_type(current_type, current_length)
+        return format_type(current_type, incoming_length)
+    if current_type == incoming_type:
+        return format_type(current_type, current_length)
+    return None
+
+
+def _fits_int(minimum: Optional[int], maximum: Optional[int]) -> bool:
+    if not isinstance(minimum, int) or not isinstance(maximum, int):
+        return False
+    return -(2**31) <= minimum and maximum < 2**31
+
+
+def _is_sqlite(connection: Any) -> bool:
+    return type(connection).__module__.startswith("sqlite3")
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections, opened on demand up to `size`.
+
+    A connection is used by a single thread at a time. Connections are returned to
+    the pool after use, rolled back if the work raised, and discarded if the rollback
+    fails as well. Connections borrowed before `close` are closed once returned.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 4):
+        """
+        Parameters
+        ----------
+        connect : `Callable`
+            Function opening a new DB-API connection.
+        size : `int`
+            Maximum number of open connections.
+        """
+        self.connect = connect
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        # Incremented by `close`, the connections of a previous generation are not reused
+        self._generation = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection, waiting for one to be released if the pool is exhausted."""
+        generation = self._generation
+        connection = self._acquire()
+        try:
+            yield connection
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                self._discard(connection)
+                raise
+            self._release(connection, generation)
+            raise
+        else:
+            self._release(connection, generation)
+
+    def close(self) -> None:
+        """Close the idle connections of the pool, and those still borrowed once they are
+        returned. The pool opens new connections if it is used again."""
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def _acquire(self) -> Any:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self.connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get()
+
+    def _release(self, connection: Any, generation: int) -> None:
+        if generation == self._generation:
+            self._idle.put(connection)
+        else:
+            self._discard(connection)
+
+    def _discard(self, connection: Any) -> None:
+        with self._lock:
+            self._opened -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class BulkLoader:
+    """Inserts Arrow record batches into a SQL table in batches of adaptive size.
+
+    Each batch is bound as arrays of parameters in a single `executemany` call
+    (`fast_executemany` is enabled when the cursor supports it, as with `pyodbc`) and
+    committed. The batch size is tuned by hill climbing on the measured rows per
+    second: it keeps growing (or shrinking) while the throughput improves, reverses
+    direction when it drops, and holds while it stays within `tolerance`.
+
+    Any DB-API 2.0 connection with `qmark` parameters can be used, such as `pyodbc`
+    for SQL Server or `sqlite3` as a local stand-in.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 10_000,
+        min_batch_size: int = 1_000,
+        max_batch_size: int = 200_000,
+        tolerance: float = 0.1,
+        char_length: int = 256,
+        override_length: bool = True,
+        retries: int = 3,
+        retry_delay: float = 1.0,
+        on_type_conflict: str = "raise",
+    ):
+        """
+        Parameters
+        ----------
+        batch_size : `int`
+            Number of rows of the first batch.
+        min_batch_size : `int`
+            Lower bound of the adaptive batch size.
+        max_batch_size : `int`
+            Upper bound of the adaptive batch size.
+        tolerance : `float`
+            Relative change of throughput under which the batch size is kept.
+        char_length : `int`
+            Length of `VARCHAR` columns whose maximum length is unknown.
+        override_length : `bool`
+            Use at least `char_length` for `VARCHAR` columns, even when the data is shorter.
+        retries : `int`
+            Number of times a failed batch is retried before the load fails.
+        retry_delay : `float`
+            Seconds to wait before the first retry of a batch, doubled on each retry.
+        on_type_conflict : `str`
+            `"raise"` fails an append to a table whose columns cannot hold the incoming
+            values, `"override"` drops and creates the table again (see `reconcile_schema`).
+        """
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.tolerance = tolerance
+        self.char_length = char_length
+        self.override_length = override_length
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.on_type_conflict = on_type_conflict
+        self.reports: List[dict] = []
+        self._throughput: Optional[float] = None
+        self._growing = True
+
+    def load(
+        self,
+        connection: Any,
+        table_name: str,
+        batches: Iterable[pa.RecordBatch],
+        schema: pa.Schema,
+        method: str = "append",
+        lengths: Optional[Dict[str, int]] = None,
+    ) -> dict:
+        """
+        Insert the record batches into `table_name`, creating the table when needed.
+
+        Parameters
+        ----------
+        connection : DB-API connection
+            Open connection to the database. It is not closed by this method.
+        table_name : `str`
+            Name of the SQL table.
+        batches : `Iterable[pa.RecordBatch]`
+            Record batches to insert, all of them following `schema`.
+        schema : `pa.Schema`
+            Schema of the record batches, used to create the table.
+        method : `str`
+            `"append"` inserts into the existing table (created if missing), `"override"`
+            drops and creates the table first.
+        lengths : `dict`
+            Maximum length of the strings of each column, used to size `VARCHAR` columns.
+
+        Returns
+        -------
+        `dict`
+            Report of the load with the number of rows, Arrow bytes, seconds, rows per
+            second, batches and final batch size.
+        """
+        self.prepare(connection, table_name, schema, method, lengths)
+        return self.insert(connection, table_name, batches, schema)
+
+    def prepare(
+        self,
+        connection: Any,
+        table_name: str,
+        schema: pa.Schema,
+        method: str = "append",
+        lengths: Optional[Dict[str, int]] = None,
+        statistics: Optional[Dict[str, dict]] = None,
+    ) -> str:
+        """Reconcile the schema of `table_name` with `schema`, creating the table as needed.
+
+        Missing columns are added and narrow columns altered so that the batches can be
+        appended. The table is dropped and created again with `method="override"`, or
+        when one of its columns cannot hold the incoming values and `on_type_conflict`
+        is `"override"`. Returns the method
+        finally applied. See `column_types` for `lengths` and `statistics`.
+        """
+        if method not in ("append", "override"):
+            raise ValueError(
+                'Invalid value for argument "method". Choose from ["override", "append"].'
+            )
+        columns = self.column_types(schema, lengths, statistics)
+        method = reconcile_schema(connection, table_name, columns, method, self.on_type_conflict)
+        if method == "override":
+            recreate_table(connection, table_name, create_table_query(table_name, columns))
+        return method
+
+    def insert(
+        self,
+        connection: Any,
+        table_name: str,
+        batches: Iterable[pa.RecordBatch],
+        schema: pa.Schema,
+        record: Optional[Callable[[Any, int], None]] = None,
+    ) -> dict:
+        """Insert the record batches into the existing `table_name` and report the throughput.
+
+        Each batch is committed on its own and retried on failure, so a failed batch is
+        never written twice nor leaves the rows inserted before it uncommitted. `record`
+        is called with the cursor and the number of rows inserted once the batch is,
+        within its transaction, so the caller can tell which rows were committed.
+        """
+        query = self.insert_query(table_name, schema)
+        rows, nbytes, n_batches, start = 0, 0, 0, time.perf_counter()
+        for chunk in self._chunks(batches):
+            batch_start = time.perf_counter()
+            execute_chunk(
+                connection,
+                query,
+                self._rows(chunk),
+                self.retries,
+                self.retry_delay,
+                partial(record, rows=rows + chunk.num_rows) if record is not None else None,
+            )
+            elapsed = time.perf_counter() - batch_start
+            rows += chunk.num_rows
+            nbytes += chunk.nbytes
+            n_batches += 1
+            self._adapt(chunk.num_rows / max(elapsed, 1e-9))
+
+        seconds = time.perf_counter() - start
+        report = {
+            "table": table_name,
+            "rows": rows,
+            "bytes": nbytes,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+            "batches": n_batches,
+            "batch_size": self.batch_size,
+        }
+        self.reports.append(report)
+        logger.info(
+            f"Inserted {rows} rows into {table_name} in {seconds:.2f}s "
+            f"({report['rows_per_second']:.0f} rows/s, {n_batches} batches)."
+        )
+        return report
+
+    def column_types(
+        self,
+        schema: pa.Schema,
+        lengths: Optional[Dict[str, int]] = None,
+        statistics: Optional[Dict[str, dict]] = None,
+    ) -> Dict[str, str]:
+        """Get the SQL type of each column of `schema`.
+
+        `VARCHAR` columns are sized from `lengths`, or from the `max_length` of the
+        `statistics` stored by `attach_statistics`. With statistics, 64-bit integer
+        columns whose values fit in 32 bits are created as `INT`, which later appends
+        widen with `reconcile_schema` if needed.
+        """
+        statistics = statistics or {}
+        if lengths is None:
+            lengths = {
+                name: column["max_length"]
+                for name, column in statistics.items()
+                if "max_length" in column
+            }
+        columns = {}
+        for field in schema:
+            length = lengths.get(field.name)
+            if self.override_length:
+                length = max(length or 0, self.char_length)
+            column_type = sql_type(field, length, self.char_length)
+            column = statistics.get(field.name, {})
+            if column_type == "BIGINT" and _fits_int(column.get("min"), column.get("max")):
+                column_type = "INT"
+            columns[field.name] = column_type
+        return columns
+
+    @staticmethod
+    def insert_query(table_name: str, schema: pa.Schema) -> str:
+        columns = ", ".join(quote_identifier(name) for name in schema.names)
+        placeholders = ", ".join("?" * len(schema.names))
+        return f"INSERT INTO {quote_identifier(table_name)} ({columns}) VALUES ({placeholders})"
+
+    def _chunks(self, batches: Iterable[pa.RecordBatch]) -> Iterator[pa.Table]:
+        """Regroup the incoming batches into chunks of the current batch size."""
+        pending, pending_rows = [], 0
+        for batch in batches:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            while pending_rows >= self.batch_size:
+                # The batch size may be adapted while the chunk is consumed
+                size = self.batch_size
+                table = pa.Table.from_batches(pending)
+                pending, pending_rows = table.slice(size).to_batches(), pending_rows - size
+                yield table.slice(0, size)
+        if pending_rows > 0:
+            yield pa.Table.from_batches(pending)
+
+    @staticmethod
+    def _rows(chunk: pa.Table) -> List[tuple]:
+        columns = []
+        for column in chunk.columns:
+            if pat.is_timestamp(column.type):
+                # Database drivers expect naive `datetime` objects, which hold microseconds
+                column = column.cast(pa.timestamp("us"), safe=False)
+            columns.append(column.to_pylist())
+        return list(zip(*columns))
+
+    def _adapt(self, throughput: float) -> None:
+        last, self._throughput = self._throughput, throughput
+        if last is not None:
+            if throughput < last * (1 - self.tolerance):
+                self._growing = not self._growing
+            elif throughput < last * (1 + self.tolerance):
+                return
+        size = self.batch_size * 2 if self._growing else self.batch_size // 2
+        self.batch_size = min(max(size, self.min_batch_size), self.max_batch_size)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.core.frame import DataFrame
+
+# Setting up basic configuration for logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bumped when the cached frames would no longer match those produced by `build`
+CACHE_VERSION = 2
+
+# Staging directories older than this, in seconds, were left by a process that died
+STAGING_TIMEOUT = 3600
+
+
+class ParsedFileCache:
+    """Keeps the parsed and corrected frames of each raw file in a local directory.
+
+    An entry holds the frames of one blob, as returned by `ETLWorkflow.fix` for each
+    of its sheets, and is keyed by the blob name and its ETag, so a blob uploaded again
+    with a different content is never served from the cache. Entries live in their own
+    sub-directory, written to a temporary directory and renamed into place, so several
+    worker processes can share the cache.
+
+    When the entries exceed `max_bytes`, the least recently used ones are evicted. The
+    modification time of the entry manifest records its last use.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 2 * 1024**3):
+        """
+        Parameters
+        ----------
+        path : `str`
+            Directory holding the entries of the cache.
+        max_bytes : `int`
+            Bound on the bytes on disk of all the entries.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    def contains(self, blob_name: str, etag: Optional[str]) -> bool:
+        """Check whether the blob has an entry, without reading it."""
+        if etag is None:
+            return False
+        return os.path.exists(os.path.join(self._entry_path(blob_name, etag), "manifest.json"))
+
+    def get(
+        self, blob_name: str, etag: Optional[str]
+    ) -> Optional[Tuple[List[DataFrame], List[str]]]:
+        """Get the frames and names stored for the blob, `None` if they are not cached."""
+        if etag is None:
+            return None
+        entry_path = self._entry_path(blob_name, etag)
+        manifest_path = os.path.join(entry_path, "manifest.json")
+        try:
+            with open(manifest_path, "r") as file:
+                manifest = json.load(file)
+            if manifest["version"] != CACHE_VERSION:
+                return None
+            frames = []
+            for entry in manifest["frames"]:
+                file_path = os.path.join(entry_path, entry["file"])
+                if entry["format"] == "pickle":
+                    frames.append(pd.read_pickle(file_path))
+                else:
+                    df = pq.read_table(file_path, memory_map=True).to_pandas()
+                    for i in entry.get("nan_columns", []):
+                        # Parquet reads the missing values of object columns as `None`
+                        df.isetitem(i, df.iloc[:, i].where(df.iloc[:, i].notna(), np.nan))
+                    frames.append(df)
+            os.utime(manifest_path)
+        except (OSError, ValueError, KeyError, pa.ArrowException):
+            # Missing, evicted by another process while reading, or unreadable
+            return None
+        return frames, [entry["name"] for entry in manifest["frames"]]
+
+    def put(
+        self, blob_name: str, etag: Optional[str], frames: List[DataFrame], names: List[str]
+    ) -> None:
+        """Store the frames of the blob, then evict entries until the cache fits `max_bytes`."""
+        if etag is None:
+            return
+        entry_path = self._entry_path(blob_name, etag)
+        staging_path = tempfile.mkdtemp(prefix=".staging-", dir=self.path)
+        try:
+            manifest = {"version": CACHE_VERSION, "blob": blob_name, "etag": etag, "frames": []}
+            for i, (df, name) in enumerate(zip(frames, names)):
+                frame = {"name": name}
+                try:
+                    frame["nan_columns"] = _nan_columns(df)
+                    file_name = f"{i:05d}.parquet"
+                    pq.write_table(pa.Table.from_pandas(df), os.path.join(staging_path, file_name))
+                    frame.update(file=file_name, format="parquet")
+                except (ValueError, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                    # Raw columns mixing numbers and strings or kinds of missing values, and
+                    # repeated column names, are kept as they are
+                    frame.pop("nan_columns", None)
+                    file_name = f"{i:05d}.pkl"
+                    pd.to_pickle(df, os.path.join(staging_path, file_name))
+                    frame.update(file=file_name, format="pickle")
+                manifest["frames"].append(frame)
+            with open(os.path.join(staging_path, "manifest.json"), "w") as file:
+                json.dump(manifest, file)
+            shutil.rmtree(entry_path, ignore_errors=True)
+            os.replace(staging_path, entry_path)
+        except OSError as e:
+            # The cache is an optimization, a failed write (such as a full disk or an entry
+            # stored at the same time by another process) must not stop the build
+            logger.warning(f"Could not cache {blob_name}: {e}")
+            shutil.rmtree(staging_path, ignore_errors=True)
+            return
+        self.evict(keep=entry_path)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove the least recently used entries until the cache fits `max_bytes`.
+
+        The staging directories and entries left half-written by a process that died are
+        removed as well.
+        """
+        entries = []
+        for entry in os.scandir(self.path):
+            if not entry.is_dir():
+                continue
+            try:
+                if entry.name.startswith("."):
+                    if time.time() - entry.stat().st_mtime > STAGING_TIMEOUT:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                manifest_path = os.path.join(entry.path, "manifest.json")
+                if not os.path.exists(manifest_path):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                last_used = os.stat(manifest_path).st_mtime
+                size = sum(file.stat().st_size for file in os.scandir(entry.path))
+            except OSError:
+                continue
+            entries.append((last_used, size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            if entry_path == keep:
+                continue
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_bytes -= size
+
+    def clear(self) -> None:
+        """Remove every entry of the cache."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _entry_path(self, blob_name: str, etag: str) -> str:
+        key = hashlib.sha256(f"{blob_name}\n{etag}".encode()).hexdigest()
+        return os.path.join(self.path, key)
+
+
+def _nan_columns(df: DataFrame) -> List[int]:
+    """Get the positions of the object columns whose missing values are NaN.
+
+    Raises:
+        ValueError: If a column mixes kinds of missing values, which Parquet cannot tell apart.
+    """
+    positions = []
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        if column.dtype != object or not column.hasnans:
+            continue
+        missing = column[column.isna()]
+        if missing.map(lambda value: isinstance(value, float)).all():
+            positions.append(i)
+        elif not missing.map(lambda value: value is None).all():
+            raise ValueError("The column mixes NaN, None or other missing values")
+    return positions
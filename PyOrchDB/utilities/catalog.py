@@ -1,17 +1,22 @@
 import datetime
-import sys
-from typing import List, Optional
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import yaml
 from pandas.errors import EmptyDataError
-from pydbsmgr.utils.azure_sdk import StorageController
+
+from PyOrchDB.utilities.matching import KeywordMatcher
+from PyOrchDB.utilities.storage import get_storage_controller
 
 
 def load_table_names(file_path: str) -> dict:
-    """Load table names from a YAML file."""
+    """Load table names from a YAML file, with the C parser of libyaml if available."""
     with open(file_path, "r") as file:
-        return yaml.safe_load(file)
+        return yaml.load(file, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
 
 
 def set_table_names(
@@ -20,90 +25,210 @@ def set_table_names(
     file_path: str = "./utilities/table_names.yml",
 ) -> List[str]:
     """Map original table names to those in the YAML file."""
-    yaml_table = load_table_names(file_path)
-    keys_tables = [k.split()[0] for k in yaml_table.keys()]
-
-    updated_names = []
-    for name in table_names:
-        new_name = name
-        for key_name in keys_tables:
-            if key_name in name:
-                value = yaml_table[key_name]
-                if isinstance(value, str):
-                    new_name = value
-                    break
-                else:
-                    sub_keys_tables = [k.split()[0] for k in value.keys() if k != "None"]
-                    for sub_key_name in sub_keys_tables:
-                        if sub_key_name in name:
-                            new_name = value[sub_key_name]
-                            break
-                    else:
-                        if default_name:
-                            new_name = value.get("None", name)
-                break
-        updated_names.append(new_name)
-
-    return updated_names
-
-
-class EventController(StorageController):
-    def __init__(self, connection_string: str, container_name: str, directory: str):
-        super().__init__(connection_string, container_name)
-        self.catalog = pd.DataFrame()
+    resolver = _table_name_resolver(os.path.abspath(file_path), os.path.getmtime(file_path))
+    return [resolver.resolve(name, default_name) for name in table_names]
+
+
+class TableNameResolver:
+    """Mapping of `table_names.yml` compiled into keyword automatons.
+
+    A table takes the value of the first key of the file contained in its name. When
+    the value is a mapping, the table takes the value of its first sub-key contained in
+    the name, or else that of its `None` key with `default_name=True`, or else keeps its
+    name. Keys are matched by their first word. The keys of the file, and the sub-keys
+    of each of its mappings, are searched for in a single pass over the table name.
+    """
+
+    def __init__(self, yaml_table: dict):
+        """
+        Parameters
+        ----------
+        yaml_table : `dict`
+            Content of `table_names.yml`.
+        """
+        self.yaml_table = yaml_table
+        self.keys = [k.split()[0] for k in yaml_table.keys()]
+        self.matcher = KeywordMatcher(self.keys)
+        self._sub_matchers: Dict[int, Tuple[List[str], KeywordMatcher]] = {}
+
+    def resolve(self, name: str, default_name: bool = False) -> str:
+        """Get the new name of a table, `name` if no key is contained in it."""
+        i = self.matcher.first(name)
+        if i is None:
+            return name
+        value = self.yaml_table[self.keys[i]]
+        if isinstance(value, str):
+            return value
+        if i not in self._sub_matchers:
+            sub_keys = [k.split()[0] for k in value.keys() if k != "None"]
+            self._sub_matchers[i] = (sub_keys, KeywordMatcher(sub_keys))
+        sub_keys, sub_matcher = self._sub_matchers[i]
+        j = sub_matcher.first(name)
+        if j is not None:
+            return value[sub_keys[j]]
+        return value.get("None", name) if default_name else name
+
+
+@lru_cache(maxsize=8)
+def _table_name_resolver(file_path: str, mtime: float) -> TableNameResolver:
+    # Cached by path and modification time, so the file is read again once it changes
+    return TableNameResolver(load_table_names(file_path))
+
+
+CATALOG_COLUMNS = ["files", "datetime", "etag", "size", "last_modified"]
+
+
+class EventController:
+    """Keeps the catalog of processed files of a directory.
+
+    The catalog is stored as `catalog.parquet` in the directory and kept in memory
+    for the whole run, indexed by file name. The remote copy is only read again when
+    its ETag differs from the one of the last read or write. A legacy `catalog.csv`
+    is read when no Parquet catalog exists yet and is replaced by the next write.
+
+    Each entry records the fingerprint of the blob when it was processed (ETag, size
+    and last modification date), so that `diff` also returns blobs that were
+    uploaded again with a different content. Entries without fingerprint, such as
+    those of a legacy catalog, are considered unchanged and get their fingerprint
+    on the next `update`.
+    """
+
+    def __init__(
+        self, connection_string: str, container_name: str, directory: str, backend: str = "azure"
+    ):
+        self.storage = get_storage_controller(connection_string, container_name, backend)
+        self.catalog = pd.DataFrame(columns=CATALOG_COLUMNS)
         self.directory = directory
+        self._fingerprints: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+        self._etag: Optional[str] = None
+        self._loaded = False
+
+    @property
+    def catalog_name(self) -> str:
+        return f"{self.directory}/catalog.parquet"
 
     def create_log(
-        self, files: List[str], overwrite: bool = False, delete_catalog: bool = False
+        self,
+        files: List[str],
+        overwrite: bool = False,
+        delete_catalog: bool = False,
+        properties: Optional[Dict[str, dict]] = None,
     ) -> None:
-        """Create a log of uploaded files with timestamps."""
-        events = pd.DataFrame({"files": files, "datetime": datetime.datetime.now()})
+        """Create a log of uploaded files with timestamps and blob fingerprints."""
+        events = self._events(files, properties)
         if delete_catalog:
             overwrite = True
         self.upload_catalog(events, overwrite)
 
     def audit(self) -> Optional[pd.DataFrame]:
         """Retrieve the current catalog of files."""
-        try:
-            self.catalog, _ = super().get_excel_csv(self.directory, "catalog.csv")
-        except EmptyDataError:
-            return None
-
+        self._refresh()
         if len(self.catalog) > 0:
-            return self.catalog[0]
+            return self.catalog
         return None
 
     def remove(self, files_not_loaded: List[str]) -> None:
         """Remove entries from the catalog for specified files."""
-        self.catalog, _ = super().get_excel_csv(self.directory, "catalog.csv")
-        if not self.catalog.empty:
-            self.catalog = self.catalog[
-                ~self.catalog["files"].str.contains("|".join(files_not_loaded))
-            ]
-            self.upload_catalog(self.catalog)
-
-    def update(self, files: List[str], overwrite: bool = True) -> None:
-        """Update the catalog with new entries."""
-        events = pd.DataFrame({"files": files, "datetime": datetime.datetime.now()})
+        self._refresh()
+        files_not_loaded = self._fingerprints.keys() & set(files_not_loaded)
+        if files_not_loaded:
+            self.upload_catalog(self.catalog[~self.catalog["files"].isin(files_not_loaded)], True)
+
+    def update(
+        self,
+        files: List[str],
+        overwrite: bool = True,
+        properties: Optional[Dict[str, dict]] = None,
+    ) -> None:
+        """Update the catalog with new entries, replacing those of changed files."""
+        events = self._events(files, properties)
         if (catalog := self.audit()) is not None:
+            catalog = catalog[~catalog["files"].isin(set(files))]
+            if properties:
+                catalog = self._fill_fingerprints(catalog, properties)
             events = pd.concat([catalog, events], ignore_index=True)
         self.upload_catalog(events, overwrite)
 
     def _clean(self) -> None:
         """Clear the catalog."""
-        self.upload_catalog(pd.DataFrame(), True)
-
-    def diff(self, files: List[str]) -> List[str]:
-        """Find new files not in the catalog."""
-        if (cat := self.audit()) is not None and not cat.empty:
-            cat_list = set(cat["files"])
-            new_files = list(set(files).difference(cat_list))
-            if new_files:
-                return new_files
-            else:
-                sys.exit("There is nothing new to upload")
+        self.upload_catalog(pd.DataFrame(columns=CATALOG_COLUMNS), True)
+
+    def diff(self, files: List[str], properties: Optional[Dict[str, dict]] = None) -> List[str]:
+        """Find files that are not in the catalog or whose blob changed since, an empty
+        list if there is nothing new."""
+        if self.audit() is not None:
+            properties = properties or {}
+            return [file for file in files if self._is_new_or_changed(file, properties.get(file))]
         return files
 
     def upload_catalog(self, catalog: pd.DataFrame, overwrite: bool = False) -> None:
-        """Upload the catalog to Azure storage."""
-        super().upload_excel_csv(self.directory, [catalog], ["catalog"], overwrite=overwrite)
+        """Upload the catalog to the storage backend."""
+        self._set_catalog(catalog)
+        table = pa.Table.from_pandas(self.catalog, preserve_index=False)
+        self.storage.write_pyarrow(self.directory, [table], ["catalog"], overwrite=overwrite)
+        self._etag = self.storage.get_blob_etag(self.catalog_name)
+        self._loaded = True
+
+    def _is_new_or_changed(self, file: str, blob_properties: Optional[dict]) -> bool:
+        if file not in self._fingerprints:
+            return True
+        etag, size = self._fingerprints[file]
+        if blob_properties is None or etag is None:
+            return False
+        return etag != blob_properties["etag"] or size != blob_properties["size"]
+
+    @staticmethod
+    def _events(files: List[str], properties: Optional[Dict[str, dict]] = None) -> pd.DataFrame:
+        blob_properties = [(properties or {}).get(file, {}) for file in files]
+        return pd.DataFrame(
+            {
+                "files": files,
+                "datetime": datetime.datetime.now(),
+                "etag": [blob.get("etag") for blob in blob_properties],
+                "size": pd.array([blob.get("size") for blob in blob_properties], dtype="Int64"),
+                "last_modified": pd.to_datetime(
+                    [blob.get("last_modified") for blob in blob_properties], utc=True
+                ),
+            }
+        )
+
+    @staticmethod
+    def _fill_fingerprints(catalog: pd.DataFrame, properties: Dict[str, dict]) -> pd.DataFrame:
+        """Add the fingerprint of the entries recorded without one."""
+        missing = catalog["etag"].isna() & catalog["files"].isin(properties.keys())
+        if not missing.any():
+            return catalog
+        catalog = catalog.copy()
+        files = catalog.loc[missing, "files"]
+        for column in ("etag", "size", "last_modified"):
+            catalog.loc[missing, column] = files.map(lambda file: properties[file][column])
+        return catalog
+
+    def _refresh(self) -> None:
+        """Read the remote catalog if it changed since it was last read or written."""
+        etag = self.storage.get_blob_etag(self.catalog_name)
+        if etag is not None:
+            if etag != self._etag:
+                blob_data = self.storage._download_blob(self.catalog_name)
+                self._set_catalog(pq.read_table(pa.BufferReader(blob_data)).to_pandas())
+                self._etag = etag
+        elif not self._loaded:
+            self._set_catalog(self._read_legacy_catalog())
+        self._loaded = True
+
+    def _read_legacy_catalog(self) -> pd.DataFrame:
+        try:
+            catalog, _ = self.storage.get_excel_csv(self.directory, "catalog.csv")
+        except EmptyDataError:
+            return pd.DataFrame(columns=CATALOG_COLUMNS)
+        return catalog[0] if catalog else pd.DataFrame(columns=CATALOG_COLUMNS)
+
+    def _set_catalog(self, catalog: pd.DataFrame) -> None:
+        self.catalog = catalog.reindex(columns=CATALOG_COLUMNS).reset_index(drop=True)
+        self.catalog["datetime"] = pd.to_datetime(self.catalog["datetime"])
+        self.catalog["etag"] = self.catalog["etag"].astype(object)
+        self.catalog["size"] = self.catalog["size"].astype("Int64")
+        self.catalog["last_modified"] = pd.to_datetime(self.catalog["last_modified"], utc=True)
+        etags = self.catalog["etag"].where(self.catalog["etag"].notna(), None)
+        sizes = self.catalog["size"].astype(object).where(self.catalog["size"].notna(), None)
+        self._fingerprints = dict(zip(self.catalog["files"], zip(etags, sizes)))
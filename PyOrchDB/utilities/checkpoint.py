@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from pandas.core.frame import DataFrame
+from pyarrow import Table
+
+
+def listing_fingerprint(files: List[str], properties: Dict[str, dict]) -> str:
+    """Get a digest of the names and ETags of the files a run is built from.
+
+    Args:
+        files (List[str]): Blob names of the listing.
+        properties (Dict[str, dict]): Properties of each blob, as listed by the storage.
+
+    Returns:
+        str: The hexadecimal digest, the same whatever the order of `files`.
+    """
+    listing = sorted((file, properties.get(file, {}).get("etag")) for file in files)
+    return hashlib.sha256(json.dumps(listing).encode()).hexdigest()
+
+
+class CheckpointManager:
+    """Persists the output of the `ETLWorkflow` stages in a local directory.
+
+    Each stage writes its tables to `path/<stage>/` in Parquet or Arrow IPC format, and
+    `path/manifest.json` records, for every stage, the tables written, the items (tables
+    or files) already completed, the state needed to restore the workflow and whether
+    the stage finished. Frames that Arrow cannot represent, such as raw columns mixing
+    numbers and strings, are pickled instead so that the checkpoint never alters data.
+    """
+
+    STAGES = ("build", "curate", "load", "upload")
+
+    def __init__(self, path: str, format_type: str = "parquet"):
+        """
+        Parameters
+        ----------
+        path : `str`
+            Directory where the manifest and the tables of each stage are written.
+        format_type : `str`
+            Format of the checkpointed tables, either `"parquet"` or `"arrow"` (Arrow IPC).
+        """
+        if format_type not in ("parquet", "arrow"):
+            raise ValueError(f"Unsupported format: {format_type}. Choose from parquet, arrow.")
+        self.path = path
+        self.format_type = format_type
+        os.makedirs(self.path, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.json")
+
+    def is_completed(self, stage: str) -> bool:
+        """Check whether `stage` finished in a previous run."""
+        return self._stage(stage).get("completed", False)
+
+    def last_completed(self) -> str | None:
+        """Get the name of the last stage that finished, `None` if there is none."""
+        completed = [stage for stage in self.STAGES if self.is_completed(stage)]
+        return completed[-1] if completed else None
+
+    def completed_items(self, stage: str) -> List[str]:
+        """Get the items (tables or files) of `stage` already completed."""
+        return list(self._stage(stage).get("items", []))
+
+    def mark_item(self, stage: str, item: str) -> None:
+        """Record that `item` of `stage` was completed."""
+        items = self._stage(stage).setdefault("items", [])
+        if item not in items:
+            items.append(item)
+        self._write_manifest()
+
+    def save_state(self, stage: str, **state) -> None:
+        """Record the JSON serializable state needed to restore the workflow after `stage`."""
+        self._stage(stage).setdefault("state", {}).update(state)
+        self._write_manifest()
+
+    def get_state(self, stage: str) -> dict:
+        return dict(self._stage(stage).get("state", {}))
+
+    def save_table(self, stage: str, index: int, table: DataFrame | Table) -> None:
+        """Write the table at position `index` of the output of `stage`."""
+        stage_path = os.path.join(self.path, stage)
+        os.makedirs(stage_path, exist_ok=True)
+        kind = "arrow" if isinstance(table, Table) else "pandas"
+        try:
+            pytable = table if kind == "arrow" else pa.Table.from_pandas(table)
+            file_name = f"{index:05d}.{self.format_type}"
+            if self.format_type == "parquet":
+                pq.write_table(pytable, os.path.join(stage_path, file_name))
+            else:
+                feather.write_feather(pytable, os.path.join(stage_path, file_name))
+            format_type = self.format_type
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            file_name = f"{index:05d}.pkl"
+            pd.to_pickle(table, os.path.join(stage_path, file_name))
+            format_type = "pickle"
+        self._stage(stage).setdefault("tables", {})[str(index)] = {
+            "file": file_name,
+            "format": format_type,
+            "kind": kind,
+        }
+        self._write_manifest()
+
+    def load_tables(self, stage: str) -> Dict[int, DataFrame | Table]:
+        """Read the tables written by `stage`, keyed by their position."""
+        tables = {}
+        for index, entry in self._stage(stage).get("tables", {}).items():
+            file_path = os.path.join(self.path, stage, entry["file"])
+            if entry["format"] == "pickle":
+                tables[int(index)] = pd.read_pickle(file_path)
+                continue
+            if entry["format"] == "parquet":
+                pytable = pq.read_table(file_path, memory_map=True)
+            else:
+                pytable = feather.read_table(file_path, memory_map=True)
+            tables[int(index)] = pytable if entry["kind"] == "arrow" else pytable.to_pandas()
+        return tables
+
+    def complete(self, stage: str) -> None:
+        """Record that `stage` finished."""
+        self._stage(stage)["completed"] = True
+        self._write_manifest()
+
+    def clear(self) -> None:
+        """Remove every checkpointed table and start a new manifest."""
+        for stage in self.STAGES:
+            shutil.rmtree(os.path.join(self.path, stage), ignore_errors=True)
+        self.manifest = {"version": 1, "stages": {}}
+        self._write_manifest()
+
+    def _stage(self, stage: str) -> dict:
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown stage: {stage}. Choose from {list(self.STAGES)}.")
+        return self.manifest["stages"].setdefault(stage, {})
+
+    def _read_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {"version": 1, "stages": {}}
+        with open(self.manifest_path, "r") as file:
+            return json.load(file)
+
+    def _write_manifest(self) -> None:
+        # Replace the manifest atomically so an interrupted write never corrupts it
+        temporary_path = self.manifest_path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(temporary_path, self.manifest_path)
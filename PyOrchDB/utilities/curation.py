@@ -0,0 +1,180 @@
+import re
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.types as pat
+from merge_by_lev.schema_config import StandardColumns
+from pandas.core.frame import DataFrame
+from pydbsmgr.lightest import get_date_format
+
+# Dates such as `2023-01-31`, `2023/1/31` or `31-01-2023`, as detected by `LightCleaner`
+DATE_REGEX = r"\d{4}(-|/)\d{1,2}(-|/)\d{1,2}|\d{1,2}(-|/)\d{1,2}(-|/)\d{4}"
+# Values that `ColumnsDtypes` takes as the sign of a numeric column
+NUMBER_REGEX = r"^(\d+|\d+\.\d+)$"
+# Values accepted by `float`, which are coerced, anything else becomes null
+FLOAT_REGEX = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+# Runs of the characters kept by the cleaning of `LightCleaner` which end in a letter or
+# digit, anything else that is not whitespace is removed
+CLEAN_REGEX = r"([a-zñáéíóú_@.0-9]*[a-zñáéíóú_0-9])|\S"
+
+
+def to_arrow(df: DataFrame) -> pa.Table:
+    """Convert a frame to an Arrow table, columns mixing types are kept as strings."""
+    arrays = []
+    for _, series in df.items():
+        try:
+            arrays.append(pa.array(series, from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            values = [None if pd.isna(value) else str(value) for value in series]
+            arrays.append(pa.array(values, type=pa.string()))
+    return pa.Table.from_arrays(arrays, names=[str(name) for name in df.columns])
+
+
+def standardize_columns(table: pa.Table, *args, **kwargs) -> pa.Table:
+    """Rename the columns of `table` with `StandardColumns` without converting its data.
+
+    The handler is given an empty frame with the schema of the table, so its naming rules
+    and its dictionary of columns (written as JSON) are those of the pandas path. The
+    arguments are those of `StandardColumns.get_frame`, `sort` orders the final names.
+    """
+    sort = kwargs.pop("sort", False)
+    column_handler = StandardColumns(table.schema.empty_table().to_pandas())
+    names = [str(name) for name in column_handler.get_frame(*args, sort=False, **kwargs).columns]
+    table = table.rename_columns(names)
+    return table.select(sorted(range(len(names)), key=names.__getitem__)) if sort else table
+
+
+def clean_table(
+    table: pa.Table,
+    fast_execution: bool = True,
+    sample_frac: float = 0.1,
+    seed: Optional[int] = None,
+    **kwargs,
+) -> pa.Table:
+    """Clean the string columns of a table with `pyarrow.compute`, as `LightCleaner` does.
+
+    Columns whose sample contains dates are parsed with the most common format of the
+    sample, the second most common one being used for the values the first one cannot
+    parse, and values that are not dates become null. Other string columns are lowercased,
+    stripped of the characters outside `CLEAN_REGEX` and of extra whitespace, then title
+    cased when `fast_execution=False` (unless `title_mode=False`). Nulls are kept, and
+    the columns with a duplicated name are dropped.
+
+    Args:
+        table (pa.Table): Table to clean.
+        fast_execution (bool): Skip the title casing of the text.
+        sample_frac (float): Fraction of the rows used to detect the date columns.
+        seed (Optional[int]): Seed of the sampling.
+
+    Returns:
+        pa.Table: The cleaned table.
+    """
+    rng = np.random.default_rng(seed)
+    title_mode = kwargs.get("title_mode", True)
+    columns, names = [], []
+    for name, column in zip(table.column_names, table.columns):
+        if name in names:
+            continue
+        if pat.is_string(column.type) or pat.is_large_string(column.type):
+            sample = _sample(column, sample_frac, rng)
+            if len(sample) and pc.any(pc.match_substring_regex(sample, DATE_REGEX)).as_py():
+                column = _parse_dates(column, sample)
+            else:
+                column = _clean_text(column)
+                if not fast_execution and title_mode:
+                    column = pc.utf8_title(column)
+        columns.append(column)
+        names.append(name)
+    return pa.Table.from_arrays(columns, names=names)
+
+
+def coerce_types(table: pa.Table, sample_frac: float = 0.1, seed: Optional[int] = None) -> pa.Table:
+    """Resolve the numeric and date columns of a table, as `ColumnsDtypes.correct` does.
+
+    A column whose first value is a number is coerced to `int64` when all its values are
+    integers, to `float64` otherwise, values that are not numbers becoming null. String
+    columns whose sample contains dates are then parsed as `%Y%m%d` dates after removing
+    their dashes, values that do not match becoming null.
+
+    Args:
+        table (pa.Table): Table whose types are resolved.
+        sample_frac (float): Fraction of the rows used to detect the date columns.
+        seed (Optional[int]): Seed of the sampling.
+
+    Returns:
+        pa.Table: Table with the resolved types.
+    """
+    rng = np.random.default_rng(seed)
+    columns = []
+    for column in table.columns:
+        first = column[0].as_py() if len(column) else None
+        if re.match(NUMBER_REGEX, str(first)):
+            column = _to_number(column)
+        if pat.is_string(column.type) or pat.is_large_string(column.type):
+            sample = _sample(column, sample_frac, rng)
+            if len(sample) and pc.any(pc.match_substring_regex(sample, DATE_REGEX)).as_py():
+                column = pc.strptime(
+                    pc.replace_substring(column, "-", ""),
+                    format="%Y%m%d",
+                    unit="ns",
+                    error_is_null=True,
+                )
+        columns.append(column)
+    return pa.Table.from_arrays(columns, names=table.column_names)
+
+
+def _sample(column: pa.ChunkedArray, sample_frac: float, rng: np.random.Generator):
+    if sample_frac >= 1.0:
+        return column
+    size = int(len(column) * sample_frac)
+    return column.take(rng.choice(len(column), size, replace=False))
+
+
+def _clean_text(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    column = pc.replace_substring_regex(pc.utf8_lower(column), r"\s+", " ")
+    return pc.utf8_trim_whitespace(pc.replace_substring_regex(column, CLEAN_REGEX, r"\1"))
+
+
+def _parse_dates(column: pa.ChunkedArray, sample: pa.ChunkedArray) -> pa.ChunkedArray:
+    formats = Counter(
+        date_format
+        for date_format in (get_date_format(value) for value in sample.to_pylist() if value)
+        if date_format
+    )
+    if not formats:
+        # Dates in a format that `get_date_format` does not know are left as text
+        return column
+    return pc.coalesce(
+        *(_parse_date_format(column, date_format) for date_format, _ in formats.most_common(2))
+    )
+
+
+def _parse_date_format(column: pa.ChunkedArray, date_format: str) -> pa.ChunkedArray:
+    if date_format in ("dayfirst", "monthfirst"):
+        parts = pc.extract_regex(column, r"^(?P<a>\d{1,2})[-/](?P<b>\d{1,2})[-/](?P<y>\d{4})")
+        day, month = ("a", "b") if date_format == "dayfirst" else ("b", "a")
+        column = pc.binary_join_element_wise(
+            pc.struct_field(parts, "y"),
+            pc.utf8_lpad(pc.struct_field(parts, month), 2, "0"),
+            pc.utf8_lpad(pc.struct_field(parts, day), 2, "0"),
+            "",
+        )
+        date_format = "%Y%m%d"
+    else:
+        column = pc.utf8_slice_codeunits(pc.replace_substring_regex(column, "[-/]", ""), 0, 8)
+    return pc.strptime(column, format=date_format, unit="ns", error_is_null=True)
+
+
+def _to_number(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    if pat.is_string(column.type) or pat.is_large_string(column.type):
+        column = pc.utf8_trim_whitespace(column)
+        valid = pc.match_substring_regex(column, FLOAT_REGEX)
+        column = pc.cast(pc.if_else(valid, column, None), pa.float64())
+    if pat.is_floating(column.type) and column.null_count == 0:
+        if pc.all(pc.equal(pc.floor(column), column)).as_py() is not False:
+            return pc.cast(column, pa.int64())
+    return column
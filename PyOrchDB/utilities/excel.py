@@ -0,0 +1,139 @@
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import repeat
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.core.frame import DataFrame
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+
+# `pandas` is the `read_excel` default, `openpyxl` parses the cells of a read-only workbook
+# as `read_excel` does without going through `ExcelFile`, `calamine` parses the workbook in
+# Rust and `auto` selects `calamine` when it is installed and `openpyxl` otherwise
+EXCEL_ENGINES = ("pandas", "openpyxl", "calamine", "auto")
+
+
+def resolve_excel_engine(engine: str = "pandas") -> str:
+    """Get the engine used to read `.xlsx` files, resolving `auto` from the installed packages."""
+    if engine not in EXCEL_ENGINES:
+        raise ValueError(f"Unsupported Excel engine: {engine}. Choose from {EXCEL_ENGINES}.")
+    calamine = importlib.util.find_spec("python_calamine") is not None
+    if engine == "auto":
+        return "calamine" if calamine else "openpyxl"
+    if engine == "calamine" and not calamine:
+        raise ImportError("The 'calamine' engine requires the python-calamine package.")
+    return engine
+
+
+def read_excel_sheets(
+    source: str | bytes, engine: str = "pandas", workers: int = 1
+) -> Dict[str, DataFrame]:
+    """Read every sheet of an `.xlsx` file.
+
+    Args:
+        source (str | bytes): Path or content of the file.
+        engine (str): One of `EXCEL_ENGINES`.
+        workers (int): Processes parsing the sheets of a multi-sheet workbook in parallel,
+            each one opening the workbook and reading a single sheet.
+
+    Returns:
+        Dict[str, DataFrame]: The frame of each sheet, in the order of the workbook.
+    """
+    engine = resolve_excel_engine(engine)
+    sheet_names = _sheet_names(source, engine) if workers > 1 else []
+    if len(sheet_names) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sheet_names))) as executor:
+            frames = list(executor.map(_read_sheet, repeat(source), sheet_names, repeat(engine)))
+        return dict(zip(sheet_names, frames))
+
+    if engine == "openpyxl":
+        workbook = _open_workbook(source)
+        try:
+            return {sheet.title: _stream_sheet(sheet) for sheet in workbook.worksheets}
+        finally:
+            workbook.close()
+    all_sheets = _read_excel(source, None, "openpyxl" if engine == "pandas" else engine)
+    return {name: df.reset_index(drop=True) for name, df in all_sheets.items()}
+
+
+def _read_sheet(source: str | bytes, sheet_name: str, engine: str) -> DataFrame:
+    if engine == "openpyxl":
+        workbook = _open_workbook(source)
+        try:
+            return _stream_sheet(workbook[sheet_name])
+        finally:
+            workbook.close()
+    engine = "openpyxl" if engine == "pandas" else engine
+    return _read_excel(source, sheet_name, engine).reset_index(drop=True)
+
+
+def _read_excel(source: str | bytes, sheet_name: str | None, engine: str):
+    if isinstance(source, bytes):
+        with BytesIO(source) as xlsx_buffer:
+            return pd.read_excel(xlsx_buffer, sheet_name=sheet_name, index_col=None, engine=engine)
+    return pd.read_excel(source, sheet_name=sheet_name, index_col=None, engine=engine)
+
+
+def _sheet_names(source: str | bytes, engine: str) -> List[str]:
+    if engine == "calamine":
+        with pd.ExcelFile(BytesIO(source) if isinstance(source, bytes) else source, engine) as f:
+            return f.sheet_names
+    workbook = _open_workbook(source)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def _open_workbook(source: str | bytes):
+    return load_workbook(
+        BytesIO(source) if isinstance(source, bytes) else source,
+        read_only=True,
+        data_only=True,
+        keep_links=False,
+    )
+
+
+def _stream_sheet(sheet) -> DataFrame:
+    """Build the frame of a sheet from the cells of a read-only workbook.
+
+    The cells are converted and the rows parsed with `TextParser` as `read_excel` does
+    with its `openpyxl` engine, so the frames are the same, including the `na_values`
+    and the inferred dtypes, without building a second `ExcelFile` over the workbook.
+    """
+    sheet.reset_dimensions()
+    data, last_row = [], -1
+    for row in sheet.iter_rows():
+        values = [_convert_cell(cell) for cell in row]
+        while values and values[-1] == "":
+            values.pop()
+        if values:
+            last_row = len(data)
+        data.append(values)
+    # Trailing empty rows are not part of the table
+    data = data[: last_row + 1]
+    if not data:
+        return DataFrame()
+    width = max(len(values) for values in data)
+    data = [values + [""] * (width - len(values)) for values in data]
+    try:
+        return TextParser(data, header=0, index_col=None, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return DataFrame()
+
+
+def _convert_cell(cell):
+    # Empty cells are blank strings, errors NaN and integral numbers `int`
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
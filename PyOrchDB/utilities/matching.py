@@ -0,0 +1,91 @@
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton finding which of a set of keywords occur in a text.
+
+    The automaton is built once from the keywords and scans a text in a single pass,
+    whatever the number of keywords. `first` returns the keyword that comes first in
+    the list among those contained in the text, as the loop
+
+        next(i for i, keyword in enumerate(keywords) if keyword in text)
+
+    does with one substring search per keyword, and `all` returns every keyword
+    contained in the text.
+    """
+
+    def __init__(self, keywords: List[str]):
+        """
+        Parameters
+        ----------
+        keywords : `list`
+            Keywords to look for, in order of priority.
+        """
+        self.keywords = list(keywords)
+        self.goto: List[Dict[str, int]] = [{}]
+        # Smallest index of the keywords ending at each state, directly or by its suffixes
+        self.best: List[Optional[int]] = [None]
+        self.ends: List[List[int]] = [[]]
+        for i, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.best.append(None)
+                    self.ends.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            if self.best[state] is None:
+                self.best[state] = i
+            self.ends[state].append(i)
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self.best[state] = self._min(self.best[state], self.best[self.fail[state]])
+            for char, child in self.goto[state].items():
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                queue.append(child)
+
+    def first(self, text: str) -> Optional[int]:
+        """Get the index of the first keyword contained in `text`, `None` if there is none."""
+        goto, fail, best = self.goto, self.fail, self.best
+        state, found = 0, best[0]
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] is not None and (found is None or best[state] < found):
+                found = best[state]
+                if found == 0:
+                    break
+        return found
+
+    def all(self, text: str) -> List[int]:
+        """Get the indexes of all the keywords contained in `text`, in increasing order."""
+        goto, fail = self.goto, self.fail
+        state, found = 0, set(self._outputs(0))
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found.update(self._outputs(state))
+        return sorted(found)
+
+    def _outputs(self, state: int) -> Iterator[int]:
+        # Keywords ending at the state, following its suffixes
+        while True:
+            yield from self.ends[state]
+            if not state:
+                return
+            state = self.fail[state]
+
+    @staticmethod
+    def _min(a: Optional[int], b: Optional[int]) -> Optional[int]:
+        if a is None:
+            return b
+        return a if b is None else min(a, b)
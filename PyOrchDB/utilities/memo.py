@@ -0,0 +1,305 @@
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from merge_by_lev.main import merge_by_similarity
+from pandas.core.frame import DataFrame
+
+from PyOrchDB.utilities.storage import get_storage_controller
+
+# Setting up basic configuration for logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bumped when the stored decisions would no longer reproduce `merge_by_similarity`
+MEMO_VERSION = 2
+
+# Name of the memo, next to the catalog, excluded from the files to process by `build`
+MEMO_NAME = "catalog_columns"
+
+MEMO_COLUMNS = [
+    "directory",
+    "schema",
+    "target",
+    "rank",
+    "names_target",
+    "column",
+    "canonical",
+    "position",
+]
+
+
+def learn_merge(
+    frames: List[DataFrame],
+    names: List[str],
+    merged: List[DataFrame],
+    merged_names: List[str],
+    **kwargs,
+) -> Optional[dict]:
+    """Record the decisions `merge_by_similarity` took to merge `frames` into `merged`.
+
+    The table each frame goes to, its position among the frames of that table and the
+    name each of its columns gets are read from a merge of probe frames with the columns
+    of each frame, whose cells encode the frame and the column they come from, and whose
+    lengths follow the order of the lengths of `frames`. The decisions are only returned
+    if replaying them on `frames` gives `merged`, the output of the merge of the frames
+    themselves, so a merge that depends on the data and not only on the column names is
+    never replayed.
+
+    Args:
+        frames (List[DataFrame]): Frames with distinct schemas.
+        names (List[str]): Names of the frames.
+        merged (List[DataFrame]): Tables returned by `merge_by_similarity` for `frames`.
+        merged_names (List[str]): Names of the tables.
+        **kwargs: Arguments of `merge_by_similarity`, such as `dist_min` and `match_cols`.
+
+    Returns:
+        Optional[dict]: The decisions, see `replay_merge`, `None` if they do not reproduce
+        the merge.
+    """
+    width = max(len(df.columns) for df in frames) + 1
+    lengths = pd.Series([len(df) for df in frames]).rank(method="dense").astype(int)
+    probes = [
+        DataFrame(
+            np.full((lengths[i], len(df.columns)), i * width, dtype=np.int64)
+            + np.arange(len(df.columns)),
+            columns=df.columns,
+        )
+        for i, df in enumerate(frames)
+    ]
+    try:
+        merged_probes, merged_probe_names, _ = merge_by_similarity(probes, list(names), **kwargs)
+    except ZeroDivisionError:
+        merged_probes, merged_probe_names = probes, list(names)
+
+    schemas = [{"target": None, "rank": None, "columns": {}, "names_target": False} for _ in frames]
+    targets = []
+    for k, (probe, merged_name) in enumerate(zip(merged_probes, merged_probe_names)):
+        targets.append([str(column) for column in probe.columns])
+        rank = 0
+        for row in probe.itertuples(index=False):
+            codes = [int(value) for value in row if pd.notna(value)]
+            if not codes:
+                continue
+            i = codes[0] // width
+            if schemas[i]["target"] is not None:
+                continue
+            schemas[i].update(target=k, rank=rank, names_target=names[i] == merged_name)
+            rank += 1
+            for column, value in zip(probe.columns, row):
+                if pd.notna(value):
+                    schemas[i]["columns"][str(frames[i].columns[int(value) % width])] = str(column)
+    decisions = {"schemas": schemas, "targets": targets}
+    try:
+        replayed, replayed_names = replay_merge(frames, names, decisions)
+    except (KeyError, ValueError):
+        return None
+    if not same_tables(replayed, replayed_names, merged, merged_names):
+        return None
+    return decisions
+
+
+def same_tables(
+    tables: List[DataFrame], names: List[str], other: List[DataFrame], other_names: List[str]
+) -> bool:
+    """Check whether two merges give the same tables, with the same names, columns and rows."""
+    if list(names) != list(other_names) or len(tables) != len(other):
+        return False
+    for df, other_df in zip(tables, other):
+        if list(map(str, df.columns)) != list(map(str, other_df.columns)):
+            return False
+        if not df.reset_index(drop=True).equals(other_df.reset_index(drop=True)):
+            return False
+    return True
+
+
+def replay_merge(
+    frames: List[DataFrame], names: List[str], decisions: dict
+) -> Tuple[List[DataFrame], List[str]]:
+    """Merge the frames as decided by `learn_merge`, without comparing column names.
+
+    Args:
+        frames (List[DataFrame]): Frames with the schemas of the decisions, in any order.
+        names (List[str]): Names of the frames.
+        decisions (dict): Decisions of each schema, in the order of `frames`, and column
+            names of each table.
+
+    Returns:
+        Tuple[List[DataFrame], List[str]]: The merged tables and their names.
+    """
+    groups: Dict[int, list] = {}
+    for df, name, schema in zip(frames, names, decisions["schemas"]):
+        if schema["target"] is None:
+            # Dropped by the merge
+            continue
+        mapping = schema["columns"]
+        if not all(str(column) in mapping for column in df.columns):
+            # Columns dropped by the merge
+            df = df[[column for column in df.columns if str(column) in mapping]]
+        df = df.set_axis([mapping[str(column)] for column in df.columns], axis=1)
+        groups.setdefault(schema["target"], []).append((schema["rank"], df, name, schema))
+
+    tables, table_names = [], []
+    for target in sorted(groups):
+        members = sorted(groups[target], key=lambda member: member[0])
+        df = (
+            pd.concat([member[1] for member in members], ignore_index=True)
+            if len(members) > 1
+            else members[0][1]
+        )
+        columns = [column for column in decisions["targets"][target] if column in df.columns]
+        if list(df.columns) != columns:
+            df = df[columns]
+        tables.append(df)
+        named = [member[2] for member in members if member[3]["names_target"]]
+        table_names.append(named[0] if named else members[0][2])
+    return tables, table_names
+
+
+class ColumnMatchMemo:
+    """Keeps the decisions of `merge_by_similarity` for each directory across runs.
+
+    For each schema fingerprint (see `schema_fingerprint`) of a directory, the memo
+    records the table its frames are merged into and the name given to each of its
+    columns. When every schema of a directory has been seen, the merge is replayed
+    from the memo instead of comparing the column names again.
+
+    The memo is stored as `catalog_columns.parquet` (`MEMO_NAME`) next to the catalog of
+    the project, and `build` keeps it out of the files to process. The version
+    and the arguments of the merge are stored in its metadata, a memo written with
+    other arguments is discarded.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        container_name: str,
+        directory: str,
+        backend: str = "azure",
+        **params,
+    ):
+        """
+        Parameters
+        ----------
+        connection_string : `str`
+            Connection string or root path of the storage.
+        container_name : `str`
+            Container holding the memo.
+        directory : `str`
+            Directory of the catalog.
+        **params :
+            Arguments of `merge_by_similarity` the decisions depend on.
+        """
+        self.storage = get_storage_controller(connection_string, container_name, backend)
+        self.directory = directory
+        self.params = {"version": MEMO_VERSION, **params}
+        self.entries: Dict[str, dict] = {}
+        self.updated = set()
+
+    @property
+    def memo_name(self) -> str:
+        return f"{self.directory}/{MEMO_NAME}.parquet"
+
+    def load(self) -> None:
+        """Read the stored memo, unless it was written with other arguments."""
+        self.entries, self.updated = {}, set()
+        if self.storage.get_blob_etag(self.memo_name) is None:
+            return
+        try:
+            table = self.storage.read_parquet_table(self.memo_name)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning(f"Could not read the column memo: {e}")
+            return
+        if self._stored_params(table) != self.params:
+            print("The column memo was written with other merge arguments, it will be rebuilt.")
+            return
+        memo = table.to_pandas()
+        for directory, rows in memo.groupby("directory", sort=False):
+            entry = {"schemas": {}, "targets": {}}
+            for schema, schema_rows in rows.groupby("schema", sort=False):
+                first = schema_rows.iloc[0]
+                target = None if pd.isna(first["target"]) else int(first["target"])
+                entry["schemas"][schema] = {
+                    "target": target,
+                    "rank": None if pd.isna(first["rank"]) else int(first["rank"]),
+                    "names_target": bool(first["names_target"]),
+                    "columns": dict(
+                        zip(schema_rows["column"].dropna(), schema_rows["canonical"].dropna())
+                    ),
+                }
+            for target, target_rows in rows.dropna(subset=["target"]).groupby("target"):
+                positions = target_rows.dropna(subset=["position"])
+                positions = dict(zip(positions["position"].astype(int), positions["canonical"]))
+                entry["targets"][int(target)] = [positions[i] for i in sorted(positions)]
+            self.entries[directory] = entry
+
+    def get(self, directory: str, fingerprints: List[str]) -> Optional[dict]:
+        """Get the decisions for the schemas of a directory, `None` if one was not seen."""
+        entry = self.entries.get(directory)
+        if entry is None or not all(
+            fingerprint in entry["schemas"] for fingerprint in fingerprints
+        ):
+            return None
+        return {
+            "schemas": [entry["schemas"][fingerprint] for fingerprint in fingerprints],
+            "targets": entry["targets"],
+        }
+
+    def put(self, directory: str, fingerprints: List[str], decisions: dict) -> None:
+        """Replace the decisions of a directory by those learned for its current schemas."""
+        entry = {
+            "schemas": dict(zip(fingerprints, decisions["schemas"])),
+            "targets": dict(enumerate(decisions["targets"])),
+        }
+        self.put_entry(directory, entry)
+
+    def put_entry(self, directory: str, entry: dict) -> None:
+        """Replace the entry of a directory, such as one added by a worker process."""
+        self.entries[directory] = entry
+        self.updated.add(directory)
+
+    def save(self) -> None:
+        """Write the memo if a directory was updated since it was loaded."""
+        if not self.updated:
+            return
+        rows = []
+        for directory, entry in self.entries.items():
+            for schema, decision in entry["schemas"].items():
+                order = entry["targets"].get(decision["target"], [])
+                for column, canonical in decision["columns"].items() or [(None, None)]:
+                    # Position of the column in its table
+                    position = order.index(canonical) if canonical in order else None
+                    rows.append(
+                        (
+                            directory,
+                            schema,
+                            decision["target"],
+                            decision["rank"],
+                            decision["names_target"],
+                            column,
+                            canonical,
+                            position,
+                        )
+                    )
+        memo = pd.DataFrame(rows, columns=MEMO_COLUMNS)
+        for column in ("target", "rank", "position"):
+            memo[column] = memo[column].astype("Int64")
+        table = pa.Table.from_pandas(memo, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), b"memo": json.dumps(self.params, sort_keys=True)}
+        )
+        self.storage.write_pyarrow(self.directory, [table], [MEMO_NAME], overwrite=True)
+        self.updated = set()
+
+    @staticmethod
+    def _stored_params(table: pa.Table) -> Optional[dict]:
+        metadata = (table.schema.metadata or {}).get(b"memo")
+        if metadata is None:
+            return None
+        try:
+            return json.loads(metadata)
+        except ValueError:
+            return None
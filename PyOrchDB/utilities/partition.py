@@ -0,0 +1,134 @@
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.types as pat
+
+from PyOrchDB.utilities.blob_index import BlobIndex
+from PyOrchDB.utilities.statistics import attach_statistics, read_statistics
+
+# Codecs accepted by `pyarrow.parquet.write_table`, `none` writes uncompressed pages
+PARQUET_CODECS = ("snappy", "zstd", "gzip", "brotli", "lz4", "none")
+# Partition of the rows whose partition value is null
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def parquet_options(
+    row_group_size: Optional[int] = None,
+    compression: str = "snappy",
+    use_dictionary: bool | List[str] = True,
+) -> dict:
+    """Get the arguments of `pyarrow.parquet.write_table` for the given settings.
+
+    Args:
+        row_group_size (Optional[int]): Maximum rows per row group, the whole table by default.
+        compression (str): One of `PARQUET_CODECS`.
+        use_dictionary (bool | List[str]): Dictionary encode all the columns, none of
+            them, or only those listed.
+
+    Returns:
+        dict: The keyword arguments of `write_table`.
+    """
+    if compression not in PARQUET_CODECS:
+        raise ValueError(f"Unsupported codec: {compression}. Choose from {PARQUET_CODECS}.")
+    return {
+        "row_group_size": row_group_size,
+        "compression": None if compression == "none" else compression,
+        "use_dictionary": use_dictionary,
+    }
+
+
+def partition_table(table: pa.Table, column: str) -> Iterator[Tuple[str, pa.Table]]:
+    """Split a table by the values of a column.
+
+    The rows are sorted once by their partition value, keeping their order within each
+    partition, and each partition is a zero-copy slice of the sorted table. Dates and
+    timestamps are formatted as `%Y-%m-%d`, null values go to `NULL_PARTITION`.
+
+    Args:
+        table (pa.Table): Table to split.
+        column (str): Name of the partition column, which is kept in the partitions.
+
+    Returns:
+        Iterator[Tuple[str, pa.Table]]: The value and the rows of each partition, by value.
+    """
+    values = table[column]
+    if pat.is_timestamp(values.type) or pat.is_date(values.type):
+        keys = pc.strftime(values, format="%Y-%m-%d")
+    else:
+        keys = pc.cast(values, pa.string())
+    keys = pc.fill_null(keys, NULL_PARTITION)
+    order = pc.sort_indices(keys)
+    table, keys = table.take(order), keys.take(order)
+    offset = 0
+    for count in pc.value_counts(keys).to_pylist():
+        # `value_counts` follows the order of appearance, which is sorted here
+        yield count["values"], table.slice(offset, count["counts"])
+        offset += count["counts"]
+
+
+def partition_path(directory_name: str, name: str, column: str, value: str) -> str:
+    """Get the blob name of a partition, `directory/name/column=value/name.parquet`."""
+    return f"{directory_name}/{name}/{column}={quote(value, safe='')}/{name}.parquet"
+
+
+def partition_value(blob_name: str, column: str) -> Optional[str]:
+    """Get the partition value from the blob name of a partition, `None` for other blobs."""
+    for segment in blob_name.split("/")[:-1]:
+        if segment.startswith(f"{column}="):
+            return unquote(segment.split("=", 1)[1])
+    return None
+
+
+def write_partitioned(
+    storage, directory_name: str, table: pa.Table, name: str, partition_by: str, **options
+) -> List[str]:
+    """Write a table as one `.parquet` blob per value of `partition_by`.
+
+    Only the partitions present in `table` are written, replacing those of a previous
+    write, so appending a new period leaves the blobs of the other periods untouched.
+    The `directory/name.parquet` blob of a table written before without partitions is
+    deleted, otherwise its rows would be uploaded along with those of the partitions.
+    The statistics stored by `attach_statistics` are computed again for each partition,
+    so the minimum, maximum and null count of a blob describe its own rows.
+    The blobs keep the partition column with its type, so a directory is read back with
+    `pq.read_table(path, partitioning=None, filters=...)`, which still prunes the blobs
+    by the statistics of the column.
+
+    Args:
+        storage: Storage controller, see `get_storage_controller`.
+        directory_name (str): Directory of the table.
+        table (pa.Table): Table to write.
+        name (str): Name of the table.
+        partition_by (str): Partition column.
+        **options: Arguments of `write_table`, see `parquet_options`.
+
+    Returns:
+        List[str]: The names of the blobs written.
+    """
+    blob_names = []
+    with_statistics = read_statistics(table.schema) is not None
+    for value, partition in partition_table(table, partition_by):
+        if with_statistics:
+            partition = attach_statistics(partition)
+        blob_name = partition_path(directory_name, name, partition_by, value)
+        storage.write_parquet_blob(blob_name, partition, overwrite=True, **options)
+        blob_names.append(blob_name)
+    storage.delete_blob(f"{directory_name}/{name}.parquet")
+    return blob_names
+
+
+def partition_blobs(storage, directory_name: str, name: str) -> List[str]:
+    """Get the blobs of the partitions of a table written by `write_partitioned`.
+
+    Args:
+        storage: Storage controller, see `get_storage_controller`.
+        directory_name (str): Directory of the table.
+        name (str): Name of the table.
+
+    Returns:
+        List[str]: The names of the blobs under `directory/name/`.
+    """
+    prefix = f"{directory_name}/{name}"
+    return BlobIndex.from_pages(storage.list_blob_pages(prefix)).under(prefix)
@@ -0,0 +1,76 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class BlobPrefetcher:
+    """Downloads blobs ahead of their consumer with bounded concurrency.
+
+    Iterating over the prefetcher yields `(blob_name, blob_data)` pairs in the order of
+    `blob_names`, while up to `concurrency` of the following blobs are downloaded in
+    background threads. Downloads are only started while the bytes held by the
+    prefetcher stay within `max_bytes`, except for the next blob to be consumed,
+    which is always requested so that a single large blob cannot stall the iteration.
+    """
+
+    def __init__(
+        self,
+        controller,
+        blob_names: List[str],
+        concurrency: int = 4,
+        max_bytes: int = 256 * 1024**2,
+        sizes: Optional[Dict[str, int]] = None,
+        profiler=None,
+    ):
+        """
+        Parameters
+        ----------
+        controller : `AzureStorageController` | `LocalStorageController`
+            Storage controller used to download each blob through `_download_blob`.
+        blob_names : `list`
+            Names of the blobs to download, in the order they will be consumed.
+        concurrency : `int`
+            Maximum number of blobs downloaded at the same time.
+        max_bytes : `int`
+            Budget of bytes held by downloaded blobs that have not been consumed yet.
+        sizes : `dict`
+            Size in bytes of each blob, blobs with unknown size are counted as zero bytes.
+        profiler : `RunProfiler`
+            Profiler recording each download as a `download` operation of `build`.
+        """
+        if concurrency < 1:
+            raise ValueError("'concurrency' must be greater than or equal to 1.")
+        self.controller = controller
+        self.blob_names = list(blob_names)
+        self.concurrency = concurrency
+        self.max_bytes = max_bytes
+        self.sizes = sizes or {}
+        self.profiler = profiler
+
+    def __iter__(self) -> Iterator[Tuple[str, bytes]]:
+        pending = deque()
+        queued = deque(self.blob_names)
+        reserved_bytes = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while queued or pending:
+                while queued and len(pending) < self.concurrency:
+                    size = self.sizes.get(queued[0], 0)
+                    if pending and reserved_bytes + size > self.max_bytes:
+                        break
+                    blob_name = queued.popleft()
+                    future = executor.submit(self._download, blob_name)
+                    pending.append((blob_name, size, future))
+                    reserved_bytes += size
+
+                blob_name, size, future = pending.popleft()
+                blob_data = future.result()
+                reserved_bytes -= size
+                yield blob_name, blob_data
+
+    def _download(self, blob_name: str) -> bytes:
+        if self.profiler is None:
+            return self.controller._download_blob(blob_name)
+        with self.profiler.profile("build", "download", blob_name) as record:
+            blob_data = self.controller._download_blob(blob_name)
+            record["bytes"] = len(blob_data)
+        return blob_data
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pandas.core.frame import DataFrame
+from pyarrow import Table
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Setting up basic configuration for logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+METRICS = ("wall_seconds", "cpu_seconds", "rows", "bytes", "bytes_saved")
+
+
+def peak_rss() -> Optional[int]:
+    """Get the peak resident set size of the process in bytes, `None` if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def table_size(tables: DataFrame | Table | List[DataFrame | Table]) -> Tuple[int, int]:
+    """Get the number of rows and the in-memory bytes of one or several tables.
+
+    The bytes of `DataFrame` columns of Python objects count their references only, a
+    deep count would cost as much as the operations being measured.
+    """
+    if not isinstance(tables, list):
+        tables = [tables]
+    rows, nbytes = 0, 0
+    for table in tables:
+        if isinstance(table, Table):
+            rows += table.num_rows
+            nbytes += table.nbytes
+        elif isinstance(table, DataFrame):
+            rows += len(table)
+            nbytes += int(table.memory_usage(index=True, deep=False).sum())
+    return rows, nbytes
+
+
+class RunProfiler:
+    """Records the wall time, CPU time, rows, bytes and peak RSS of a workflow run.
+
+    Each record describes a `stage` of the workflow (`build`, `curate`, `load`,
+    `upload`), or an `operation` of a stage (such as `fix` or `execute`) applied to one
+    `item` (a file or a table). Callbacks receive every record as soon as it is
+    finished, and the records can be exported as JSON or as a Prometheus text file.
+
+    CPU time is that of the whole process, so operations running in concurrent
+    threads share it. Peak RSS is the high-water mark of the process when the record
+    finished.
+    """
+
+    def __init__(self, callbacks: Optional[List[Callable[[dict], Any]]] = None):
+        """
+        Parameters
+        ----------
+        callbacks : `list`
+            Functions called with each finished record.
+        """
+        self.records: List[dict] = []
+        self.callbacks = list(callbacks or [])
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback: Callable[[dict], Any]) -> None:
+        self.callbacks.append(callback)
+
+    @contextmanager
+    def profile(self, stage: str, operation: str = "stage", item: str = "") -> Iterator[dict]:
+        """Measure the enclosed block. `rows`, `bytes` and `bytes_saved` can be set on the
+        yielded record."""
+        record = {
+            "stage": stage,
+            "operation": operation,
+            "item": item,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "rows": None,
+            "bytes": None,
+        }
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall_start
+            record["cpu_seconds"] = time.process_time() - cpu_start
+            record["peak_rss_bytes"] = peak_rss()
+            self.add_records([record])
+
+    def add_records(self, records: List[dict]) -> None:
+        """Add finished records, such as those of a worker process, and notify the callbacks."""
+        with self._lock:
+            self.records.extend(records)
+        for record in records:
+            for callback in self.callbacks:
+                try:
+                    callback(record)
+                except Exception as e:
+                    logger.warning(f"Profiling callback {callback!r} failed: {e}")
+
+    def totals(self, stage: str, operation: str, since: str = "") -> Dict[str, int]:
+        """Sum the rows and bytes of the records of `operation` started at or after `since`."""
+        totals = {"rows": 0, "bytes": 0}
+        with self._lock:
+            for record in self.records:
+                if record["stage"] == stage and record["operation"] == operation:
+                    if record["started_at"] >= since:
+                        totals["rows"] += record["rows"] or 0
+                        totals["bytes"] += record["bytes"] or 0
+        return totals
+
+    def summary(self) -> List[dict]:
+        """Aggregate the records by stage and operation."""
+        groups: Dict[Tuple[str, str], dict] = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            key = (record["stage"], record["operation"])
+            group = groups.setdefault(
+                key,
+                {"stage": key[0], "operation": key[1], "count": 0, "peak_rss_bytes": None}
+                | {metric: 0 for metric in METRICS},
+            )
+            group["count"] += 1
+            for metric in METRICS:
+                group[metric] += record.get(metric) or 0
+            if record["peak_rss_bytes"] is not None:
+                group["peak_rss_bytes"] = max(
+                    group["peak_rss_bytes"] or 0, record["peak_rss_bytes"]
+                )
+        return list(groups.values())
+
+    def write_json(self, path: str) -> None:
+        """Write the records and their summary as JSON."""
+        with self._lock:
+            records = list(self.records)
+        self._write(path, json.dumps({"records": records, "summary": self.summary()}, indent=2))
+
+    def write_prometheus(self, path: str, prefix: str = "pyorchdb") -> None:
+        """Write the summary in the Prometheus text format, for the textfile collector.
+
+        Metrics are labelled by stage and operation only, items are left out to keep the
+        cardinality of the series bounded.
+        """
+        descriptions = {
+            "wall_seconds": "Wall time of the workflow operations.",
+            "cpu_seconds": "CPU time of the process during the workflow operations.",
+            "rows": "Rows processed by the workflow operations.",
+            "bytes": "Bytes processed by the workflow operations.",
+            "bytes_saved": "Bytes of intermediate copies avoided by the workflow operations.",
+            "peak_rss_bytes": "Peak resident set size of the process during the operations.",
+            "count": "Number of workflow operations recorded.",
+        }
+        summary = self.summary()
+        lines = []
+        for metric, description in descriptions.items():
+            name = f"{prefix}_{metric}"
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+            for group in summary:
+                if group[metric] is None:
+                    continue
+                labels = ",".join(
+                    f'{label}="{self._escape(group[label])}"' for label in ("stage", "operation")
+                )
+                lines.append(f"{name}{{{labels}}} {group[metric]}")
+        self._write(path, "\n".join(lines) + "\n")
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @staticmethod
+    def _write(path: str, content: str) -> None:
+        # Replace the file atomically so collectors never read a partial file
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as file:
+            file.write(content)
+        os.replace(temporary_path, path)
+
+    def __getstate__(self) -> dict:
+        # Callbacks may not be picklable, they stay in the parent process
+        return {"records": self.records}
+
+    def __setstate__(self, state: dict) -> None:
+        self.records = state["records"]
+        self.callbacks = []
+        self._lock = threading.Lock()
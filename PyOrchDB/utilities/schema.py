@@ -0,0 +1,79 @@
+import hashlib
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+from pandas.core.frame import DataFrame
+
+
+def schema_fingerprint(columns: Iterable) -> str:
+    """Hash the set of column names of a frame.
+
+    Args:
+        columns (Iterable): Column names, as normalized by `ETLWorkflow.fix`.
+
+    Returns:
+        str: Hex digest that does not depend on the order of the columns, unless a name
+        is repeated, since frames with repeated names cannot be aligned by name.
+    """
+    columns = [str(name) for name in columns]
+    if len(set(columns)) == len(columns):
+        columns = sorted(columns)
+    return hashlib.sha1("\x1f".join(columns).encode()).hexdigest()
+
+
+class SchemaBuckets:
+    """Groups the frames of a directory by the fingerprint of their columns.
+
+    `merge_by_similarity` compares the column names of every pair of frames, which is
+    quadratic in the number of files, while most files of a directory share their
+    header. Frames with the same set of columns are concatenated once at the end, and
+    only one frame per schema is left to the fuzzy matching. Frames with fewer than
+    `min_columns` columns are kept apart, since `merge_by_similarity` requires that many
+    matching columns to merge two frames.
+    """
+
+    def __init__(self, min_columns: int = 0):
+        """
+        Parameters
+        ----------
+        min_columns : `int`
+            Number of columns a frame needs to be grouped with others.
+        """
+        self.min_columns = min_columns
+        self.buckets: Dict[str, Tuple[List[DataFrame], str]] = {}
+        self.frames = 0
+
+    def add(self, df: DataFrame, name: str) -> None:
+        """Add a frame to the bucket of its schema, the first name naming the bucket."""
+        key = schema_fingerprint(df.columns)
+        if len(df.columns) < self.min_columns:
+            # Unique key, the frame is left as it is
+            key = f"{key}:{self.frames}"
+        self.buckets.setdefault(key, ([], name))[0].append(df)
+        self.frames += 1
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+    def pop_all(self) -> Tuple[List[DataFrame], List[str]]:
+        """Concatenate the frames of each bucket and empty the buckets.
+
+        The frames of a bucket are released once they are concatenated, so at most one
+        bucket is held twice, as its frames and as their concatenation.
+
+        Returns:
+            Tuple[List[DataFrame], List[str]]: One frame and name per schema, in the order
+            in which the schemas were first added.
+        """
+        frames, names = [], []
+        for key in list(self.buckets):
+            group_frames, group_name = self.buckets.pop(key)
+            frames.append(
+                pd.concat(group_frames, ignore_index=True)
+                if len(group_frames) > 1
+                else group_frames[0]
+            )
+            names.append(group_name)
+            del group_frames
+        self.frames = 0
+        return frames, names
@@ -0,0 +1,50 @@
+import json
+from typing import Dict, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.types as pat
+
+# Key of the Parquet key-value metadata holding the statistics of the columns
+STATISTICS_KEY = b"pyorchdb.statistics"
+
+
+def compute_statistics(table: pa.Table) -> Dict[str, dict]:
+    """Compute the statistics of each column of a curated table.
+
+    Args:
+        table (pa.Table): Table whose types were already resolved.
+
+    Returns:
+        Dict[str, dict]: For each column, its Arrow `type`, `null_count`, and `max_length`
+        (string columns) or `min` and `max` (numeric and temporal columns).
+    """
+    statistics = {}
+    for field, column in zip(table.schema, table.columns):
+        dtype = field.type.value_type if pat.is_dictionary(field.type) else field.type
+        if pat.is_dictionary(field.type):
+            column = column.cast(dtype)
+        column_statistics = {"type": str(field.type), "null_count": column.null_count}
+        if pat.is_string(dtype) or pat.is_large_string(dtype):
+            column_statistics["max_length"] = pc.max(pc.utf8_length(column)).as_py() or 0
+        elif pat.is_integer(dtype) or pat.is_floating(dtype) or pat.is_temporal(dtype):
+            min_max = pc.min_max(column).as_py()
+            for key in ("min", "max"):
+                value = min_max[key]
+                column_statistics[key] = value.isoformat() if hasattr(value, "isoformat") else value
+        statistics[field.name] = column_statistics
+    return statistics
+
+
+def attach_statistics(table: pa.Table) -> pa.Table:
+    """Store the statistics of `table` in its schema metadata, which Parquet files keep."""
+    metadata = dict(table.schema.metadata or {})
+    metadata[STATISTICS_KEY] = json.dumps(compute_statistics(table)).encode()
+    return table.replace_schema_metadata(metadata)
+
+
+def read_statistics(schema: pa.Schema) -> Optional[Dict[str, dict]]:
+    """Get the statistics stored by `attach_statistics`, `None` if the schema has none."""
+    if not schema.metadata or STATISTICS_KEY not in schema.metadata:
+        return None
+    return json.loads(schema.metadata[STATISTICS_KEY])
@@ -0,0 +1,510 @@
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager, contextmanager
+from datetime import datetime, timezone
+from io import StringIO
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from azure.core.exceptions import ResourceNotFoundError
+from pandas import read_csv
+from pandas.core.frame import DataFrame
+from pyarrow import Table
+from pydbsmgr.utils.azure_sdk import StorageController
+
+from PyOrchDB.utilities.excel import read_excel_sheets
+
+
+class BlobPrefix:
+    def __init__(self, name=""):
+        self._name = name
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        if isinstance(name, str):
+            self._name = name
+        else:
+            raise ValueError("Name must be provided as a string.")
+
+
+class StorageBackend(ABC):
+    """Operations of a storage backend that the workflow relies on.
+
+    The controllers created by `get_storage_controller` implement this interface, so a
+    backend missing one of its methods fails when it is instantiated rather than in the
+    middle of a run. `file_list` holds the blobs read by `get_excel_csv` with
+    `manual_mode=True`, and `excel_engine` and `sheet_workers` select the reader of the
+    `.xlsx` blobs (see `read_excel_sheets`).
+    """
+
+    file_list: List[BlobPrefix]
+    excel_engine: str = "pandas"
+    sheet_workers: int = 1
+
+    @abstractmethod
+    def get_excel_csv(
+        self, directory_name: str, regex: str, manual_mode: bool = False
+    ) -> Tuple[List[DataFrame], List[str]]:
+        """Read the `.xlsx` and `.csv` blobs of a directory"""
+
+    @abstractmethod
+    def upload_excel_csv(
+        self,
+        directory_name: str,
+        dfs: List[DataFrame],
+        blob_names: List[str],
+        format_type: str = "csv",
+        encoding: str = "utf-8",
+        overwrite: bool = True,
+    ) -> None:
+        """Write DataFrames as `.csv` or `.xlsx` blobs of a directory"""
+
+    @abstractmethod
+    def write_pyarrow(
+        self,
+        directory_name: str,
+        pytables: List[Table],
+        names: List[str],
+        overwrite: bool = True,
+    ) -> List[str] | None:
+        """Write Arrow tables as `.parquet` blobs of a directory"""
+
+    @abstractmethod
+    def get_blob_properties(self, filter_criteria: str = None) -> Dict[str, dict]:
+        """Get the size, ETag and last modification date of each blob"""
+
+    @abstractmethod
+    def list_blob_pages(
+        self, filter_criteria: str = None, page_size: int = 5000
+    ) -> Iterator[Dict[str, dict]]:
+        """Stream the properties of the blobs, one page of the listing at a time"""
+
+    @abstractmethod
+    def get_blob_etag(self, blob_name: str) -> Optional[str]:
+        """Get the ETag of a blob, `None` if it does not exist"""
+
+    @abstractmethod
+    def read_parquet_table(self, blob_name: str) -> Table:
+        """Read a `.parquet` blob as an Arrow table"""
+
+    @abstractmethod
+    def write_parquet_blob(
+        self, blob_name: str, table: Table, overwrite: bool = True, **options
+    ) -> None:
+        """Write an Arrow table as a `.parquet` blob, `options` going to `write_table`"""
+
+    @abstractmethod
+    def delete_blob(self, blob_name: str) -> None:
+        """Delete a blob, nothing is done if it does not exist"""
+
+    @abstractmethod
+    def local_copy(self, blob_name: str) -> AbstractContextManager[str]:
+        """Context manager yielding the path of a local file with the content of a blob"""
+
+    @abstractmethod
+    def _read_files(self, file_list, regex, file_type):
+        """Read the blobs of `file_list` matching `regex`, `file_type` being `"parquet"` or
+        `"excel_csv"`"""
+
+    @abstractmethod
+    def _download_blob(self, blob_name):
+        """Get the content of a blob as bytes"""
+
+
+class AzureStorageController(StorageController, StorageBackend):
+    """`StorageController` with access to the blob properties of the container."""
+
+    def get_blob_properties(self, filter_criteria: str = None) -> Dict[str, dict]:
+        """Get the size, ETag and last modification date of each blob in the container"""
+        properties = {}
+        for page in self.list_blob_pages(filter_criteria):
+            properties.update(page)
+        return properties
+
+    def list_blob_pages(
+        self, filter_criteria: str = None, page_size: int = 5000
+    ) -> Iterator[Dict[str, dict]]:
+        """Stream the properties of the blobs, one page of the container listing at a time"""
+        blobs = self._container_client.list_blobs(results_per_page=page_size)
+        for page in blobs.by_page():
+            yield {
+                blob.name: {
+                    "size": blob.size,
+                    "etag": blob.etag,
+                    "last_modified": blob.last_modified,
+                }
+                for blob in page
+                if len(blob.name.split("/")) > 1
+                and (not filter_criteria or filter_criteria in blob.name)
+            }
+
+    def get_blob_etag(self, blob_name: str) -> Optional[str]:
+        """Get the ETag of a blob, `None` if it does not exist"""
+        try:
+            return self._container_client.get_blob_client(blob_name).get_blob_properties().etag
+        except ResourceNotFoundError:
+            return None
+
+    def read_parquet_table(self, blob_name: str) -> Table:
+        """Read a `.parquet` blob as an Arrow table"""
+        return pq.read_table(pa.BufferReader(self._download_blob(blob_name)))
+
+    def write_parquet_blob(
+        self, blob_name: str, table: Table, overwrite: bool = True, **options
+    ) -> None:
+        """Write an Arrow table as a `.parquet` blob, `options` going to `write_table`"""
+        buffer = pa.BufferOutputStream()
+        pq.write_table(table, buffer, **options)
+        self._container_client.upload_blob(
+            name=blob_name, data=buffer.getvalue().to_pybytes(), overwrite=overwrite
+        )
+
+    def delete_blob(self, blob_name: str) -> None:
+        """Delete a blob, nothing is done if it does not exist"""
+        try:
+            self._container_client.delete_blob(blob_name)
+        except ResourceNotFoundError:
+            pass
+
+    @contextmanager
+    def local_copy(self, blob_name: str) -> Iterator[str]:
+        """Download a blob to a temporary file, removed on exit, and yield its path"""
+        file_descriptor, file_path = tempfile.mkstemp(suffix=os.path.splitext(blob_name)[1])
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                self._container_client.get_blob_client(blob_name).download_blob().readinto(file)
+            yield file_path
+        finally:
+            os.remove(file_path)
+
+    def _read_files(self, file_list, regex, file_type):
+        """Read files based on the given type and regex filter, `.xlsx` with `excel_engine`."""
+        if file_type != "excel_csv":
+            return super()._read_files(file_list, regex, file_type)
+        dataframes = []
+        dataframe_names = []
+        for file in file_list:
+            if not re.search(regex, file.name, re.IGNORECASE):
+                print(f"Ignoring {file.name}, does not match {regex}")
+                continue
+            frames, names = read_excel_csv_blob(
+                file.name, self._download_blob(file.name), self.excel_engine, self.sheet_workers
+            )
+            dataframes.extend(frames)
+            dataframe_names.extend(names)
+        return dataframes, dataframe_names
+
+
+class LocalStorageController(StorageBackend):
+    """Retrieve and write blobs from a local directory laid out as `root_path/container_name/`.
+
+    Blob names keep the same `/` separated layout used in Azure Blob Storage, so
+    `project/directory/file.csv` is read from `root_path/container_name/project/directory/file.csv`.
+    Parquet and `.csv` files are read through memory-mapped I/O and files are written
+    directly to disk.
+    """
+
+    def __init__(self, root_path: str, container_name: str):
+        self.root_path = os.path.abspath(root_path)
+        self.container_name = container_name
+        self.container_path = os.path.join(self.root_path, container_name)
+        os.makedirs(self.container_path, exist_ok=True)
+        self.file_list: List[BlobPrefix] = []
+
+    def get_blob_list(self, directory_name: str) -> List[str]:
+        return sorted(blob.name for blob in self._walk_directory(directory_name))
+
+    def get_parquet(
+        self, directory_name: str, regex: str, manual_mode: bool = False
+    ) -> Tuple[List[DataFrame], List[str]]:
+        """Perform reading of `.parquet` and `.parquet.gzip` files in container-directory"""
+        file_list = self.file_list if manual_mode else self._walk_directory(directory_name)
+        return self._read_files(file_list, regex, "parquet")
+
+    def read_parquet_table(self, blob_name: str) -> Table:
+        """Read a `.parquet` blob as an Arrow table through a memory map"""
+        return pq.read_table(self._blob_path(blob_name), memory_map=True)
+
+    @contextmanager
+    def local_copy(self, blob_name: str) -> Iterator[str]:
+        """Yield the path of the blob, which is already on disk"""
+        yield self._blob_path(blob_name)
+
+    def upload_parquet(
+        self,
+        directory_name: str,
+        dfs: List[DataFrame],
+        blob_names: List[str],
+        format_type: str = "parquet",
+        compression: bool = True,
+        overwrite: bool = True,
+    ) -> None:
+        """Perform writing of `.parquet` and `.parquet.gz` files in container-directory"""
+        for df, blob_name in zip(dfs, blob_names):
+            extension = f"{format_type}.gz" if compression else format_type
+            blob_path = self._prepare_path(f"{directory_name}/{blob_name}.{extension}", overwrite)
+            df.to_parquet(
+                blob_path,
+                index=False,
+                engine="pyarrow",
+                compression="gzip" if compression else None,
+            )
+
+    def get_excel_csv(
+        self, directory_name: str, regex: str, manual_mode: bool = False
+    ) -> Tuple[List[DataFrame], List[str]]:
+        """Perform reading of `.xlsx` and `.csv` files in container-directory"""
+        file_list = self.file_list if manual_mode else self._walk_directory(directory_name)
+        return self._read_files(file_list, regex, "excel_csv")
+
+    def upload_excel_csv(
+        self,
+        directory_name: str,
+        dfs: List[DataFrame],
+        blob_names: List[str],
+        format_type: str = "csv",
+        encoding: str = "utf-8",
+        overwrite: bool = True,
+    ) -> None:
+        """Perform writing of `.xlsx` and `.csv` files in container-directory"""
+        for df, blob_name in zip(dfs, blob_names):
+            if format_type not in ("csv", "xlsx"):
+                raise ValueError(f"Unsupported format: {format_type}")
+            blob_path = self._prepare_path(f"{directory_name}/{blob_name}.{format_type}", overwrite)
+            if format_type == "csv":
+                df.to_csv(blob_path, index=False, encoding=encoding)
+            else:
+                df.to_excel(blob_path, index=False)
+
+    def write_pyarrow(
+        self,
+        directory_name: str,
+        pytables: List[Table],
+        names: List[str],
+        overwrite: bool = True,
+    ) -> List[str] | None:
+        """Write PyArrow tables as Parquet format."""
+        files_not_loaded = []
+        for table, name in zip(pytables, names):
+            if table is None:
+                files_not_loaded.append(name)
+                continue
+            pq.write_table(table, self._prepare_path(f"{directory_name}/{name}.parquet", overwrite))
+        return files_not_loaded or None
+
+    def write_parquet_blob(
+        self, blob_name: str, table: Table, overwrite: bool = True, **options
+    ) -> None:
+        """Write an Arrow table as a `.parquet` blob, `options` going to `write_table`"""
+        pq.write_table(table, self._prepare_path(blob_name, overwrite), **options)
+
+    def delete_blob(self, blob_name: str) -> None:
+        """Delete a blob, nothing is done if it does not exist"""
+        try:
+            os.remove(self._blob_path(blob_name))
+        except FileNotFoundError:
+            pass
+
+    def write_parquet(
+        self,
+        directory_name: str,
+        dfs: List[DataFrame],
+        names: List[str],
+        overwrite: bool = True,
+    ) -> List[str] | None:
+        """Write DataFrames as Parquet format."""
+        pytables = [pa.Table.from_pandas(df) for df in dfs]
+        return self.write_pyarrow(directory_name, pytables, names, overwrite)
+
+    def show_all_blobs(self) -> None:
+        """Show directories from a container"""
+        print(f"Container Name: {self.container_name}")
+        for blob_name in self.get_all_blob():
+            print(f"\tBlob name : {blob_name}")
+
+    def get_all_blob(self, filter_criteria: str = None) -> List[str]:
+        """Get all blob names from a container"""
+        blob_names = []
+        for root, _, files in os.walk(self.container_path):
+            for file in files:
+                blob_path = os.path.relpath(os.path.join(root, file), self.container_path)
+                blob_name = blob_path.replace(os.sep, "/")
+                if len(blob_name.split("/")) > 1:
+                    blob_names.append(blob_name)
+        blob_names.sort()
+        if filter_criteria:
+            return [name for name in blob_names if filter_criteria in name]
+        return blob_names
+
+    def get_blob_properties(self, filter_criteria: str = None) -> Dict[str, dict]:
+        """Get the size, ETag and last modification date of each blob in the container"""
+        properties = {}
+        for page in self.list_blob_pages(filter_criteria):
+            properties.update(page)
+        return properties
+
+    def list_blob_pages(
+        self, filter_criteria: str = None, page_size: int = 5000
+    ) -> Iterator[Dict[str, dict]]:
+        """Stream the properties of the blobs, `page_size` blobs at a time"""
+        blob_names = self.get_all_blob(filter_criteria)
+        for start in range(0, len(blob_names), page_size):
+            page, stop = {}, start + page_size
+            for blob_name in blob_names[start:stop]:
+                stat = os.stat(self._blob_path(blob_name))
+                page[blob_name] = {
+                    "size": stat.st_size,
+                    "etag": self._stat_etag(stat),
+                    "last_modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                }
+            yield page
+
+    def get_blob_etag(self, blob_name: str) -> Optional[str]:
+        """Get the ETag of a blob, `None` if it does not exist"""
+        try:
+            stat = os.stat(self._blob_path(blob_name))
+        except FileNotFoundError:
+            return None
+        return self._stat_etag(stat)
+
+    @staticmethod
+    def _stat_etag(stat: os.stat_result) -> str:
+        # Modification time and size stand in for the ETag computed by Azure
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def show_blobs(self, directory_name: str) -> None:
+        """Show blobs from a directory"""
+        print(f"Container Name: {self.container_name}")
+        print(f"\tDirectory Name: {directory_name}")
+        for file in self._walk_directory(directory_name):
+            print(f"\t\tBlob name: {file.name.rsplit('/', 1)[-1]}")
+
+    def _walk_directory(self, directory_name: str) -> List[BlobPrefix]:
+        """List the blobs located directly under `directory_name`."""
+        directory_name = directory_name.strip("/")
+        directory_path = self._blob_path(directory_name)
+        if not os.path.isdir(directory_path):
+            return []
+        return [
+            BlobPrefix(f"{directory_name}/{entry.name}" if directory_name else entry.name)
+            for entry in sorted(os.scandir(directory_path), key=lambda entry: entry.name)
+            if entry.is_file()
+        ]
+
+    def _blob_path(self, blob_name: str) -> str:
+        return os.path.join(self.container_path, *blob_name.strip("/").split("/"))
+
+    def _prepare_path(self, blob_name: str, overwrite: bool) -> str:
+        blob_path = self._blob_path(blob_name)
+        if not overwrite and os.path.exists(blob_path):
+            raise FileExistsError(f"The blob {blob_name} already exists.")
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        return blob_path
+
+    def _read_files(self, file_list, regex, file_type):
+        """Read files based on the given type and regex filter."""
+        dataframes = []
+        dataframe_names = []
+
+        for file in file_list:
+            if not re.search(regex, file.name, re.IGNORECASE):
+                print(f"Ignoring {file.name}, does not match {regex}")
+                continue
+
+            blob_path = self._blob_path(file.name)
+            if file_type == "parquet":
+                dataframe_names.append(file.name.rsplit(".", 2)[0].rsplit("/", 1)[-1])
+                dataframes.append(pq.read_table(blob_path, memory_map=True).to_pandas())
+
+            elif file_type == "excel_csv":
+                filename, extension = os.path.splitext(file.name.split("/")[-1])
+                if extension == ".csv":
+                    dataframe_names.append(filename)
+                    dataframes.append(self._read_csv(blob_path))
+                elif extension == ".xlsx":
+                    # The zip reader seeks straight into the file, no full read is needed
+                    all_sheets = read_excel_sheets(blob_path, self.excel_engine, self.sheet_workers)
+                    for sheet_name, df in all_sheets.items():
+                        dataframe_names.append(f"{filename}-{sheet_name}")
+                        dataframes.append(df)
+
+        return dataframes, dataframe_names
+
+    @staticmethod
+    def _read_csv(blob_path: str) -> DataFrame:
+        try:
+            return read_csv(blob_path, index_col=None, low_memory=False, memory_map=True)
+        except UnicodeDecodeError:
+            return read_csv(
+                blob_path, index_col=None, low_memory=False, memory_map=True, encoding="latin-1"
+            )
+
+    def _download_blob(self, blob_name):
+        """Read the content of a blob from disk."""
+        # A single read, the bytes are returned as the Azure controller returns them
+        with open(self._blob_path(blob_name), "rb") as file:
+            return file.read()
+
+
+def read_excel_csv_blob(
+    blob_name: str, blob_data: bytes, excel_engine: str = "pandas", sheet_workers: int = 1
+) -> Tuple[List[DataFrame], List[str]]:
+    """Parse the content of a downloaded `.csv` or `.xlsx` blob.
+
+    Args:
+        blob_name (str): Name of the blob, its extension selects the parser.
+        blob_data (bytes): Content of the blob.
+        excel_engine (str): Reader of `.xlsx` blobs, one of `EXCEL_ENGINES`.
+        sheet_workers (int): Processes parsing the sheets of a workbook in parallel.
+
+    Returns:
+        Tuple[List[DataFrame], List[str]]: One frame per file (`.csv`) or per sheet (`.xlsx`)
+        and their names, following the naming used by `get_excel_csv`.
+    """
+    filename, extension = os.path.splitext(blob_name.split("/")[-1])
+    if extension == ".csv":
+        try:
+            blob_str = blob_data.decode("utf-8")
+        except UnicodeDecodeError:
+            blob_str = blob_data.decode("latin-1")
+        with StringIO(blob_str) as csv_file:
+            return [read_csv(csv_file, index_col=None, low_memory=False)], [filename]
+    if extension == ".xlsx":
+        all_sheets = read_excel_sheets(blob_data, excel_engine, sheet_workers)
+        return list(all_sheets.values()), [f"{filename}-{sheet_name}" for sheet_name in all_sheets]
+    return [], []
+
+
+# Backends implement `StorageBackend`
+STORAGE_BACKENDS: Dict[str, type] = {
+    "azure": AzureStorageController,
+    "local": LocalStorageController,
+}
+
+
+def get_storage_controller(
+    connection_string: str, container_name: str, backend: str = "azure"
+) -> StorageBackend:
+    """Create the storage controller registered under `backend`.
+
+    Args:
+        connection_string (str): Azure Storage connection string, or the root directory when
+            `backend="local"`.
+        container_name (str): Name of the container (a sub-directory of the root for `"local"`).
+        backend (str): Key of the backend in `STORAGE_BACKENDS`.
+
+    Returns:
+        StorageBackend: Controller bound to the container.
+    """
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(
+            f"Unsupported storage backend: {backend}. Choose from {list(STORAGE_BACKENDS)}."
+        )
+    return STORAGE_BACKENDS[backend](connection_string, container_name)
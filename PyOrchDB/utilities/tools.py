@@ -1,38 +1,62 @@
+import copy
 import logging
 import re
-from typing import List, Tuple
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyodbc
 from pydbsmgr.fast_upload import UploadToSQL
-from pydbsmgr.utils.azure_sdk import StorageController
 from pydbsmgr.utils.tools import ColumnsDtypes
 
+from PyOrchDB.utilities.blob_index import BlobIndex
+from PyOrchDB.utilities.bulk import (
+    SQLITE_PREFIX,
+    BulkLoader,
+    ConnectionPool,
+    create_table_query,
+    execute_chunk,
+    reconcile_schema,
+    recreate_table,
+    row_group_ranges,
+    sqlite_connect,
+    string_lengths,
+)
+from PyOrchDB.utilities.partition import partition_table, partition_value
+from PyOrchDB.utilities.profiling import RunProfiler, table_size
+from PyOrchDB.utilities.statistics import read_statistics
+from PyOrchDB.utilities.storage import BlobPrefix  # noqa: F401, kept importable from here
+from PyOrchDB.utilities.storage import get_storage_controller
+from PyOrchDB.utilities.watermark import (
+    UploadProgress,
+    UploadWatermarks,
+    delete_slice,
+    slice_fingerprint,
+)
+
+# Start and stop of a range of rows, and its record batches without their first rows
+RowRange = Tuple[int, int, Callable[[int], Iterable[pa.RecordBatch]]]
+
 # Setting up basic configuration for logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class BlobPrefix:
-    def __init__(self, name=""):
-        self._name = name
-
-    @property
-    def name(self):
-        return self._name
-
-    @name.setter
-    def name(self, name):
-        if isinstance(name, str):
-            self._name = name
-        else:
-            raise ValueError("Name must be provided as a string.")
-
-
-class DatabaseManager(StorageController, UploadToSQL):
+class DatabaseManager(UploadToSQL):
     """Manages the uploading of `.parquet` files to SQL tables."""
 
     def __init__(
-        self, connection_string: str, container_name: str, database_connection_string: str
+        self,
+        connection_string: str,
+        container_name: str,
+        database_connection_string: str,
+        backend: str = "azure",
+        profiler: RunProfiler | None = None,
     ):
         """
         Initialize the DatabaseManager with Azure and SQL connections.
@@ -48,15 +72,30 @@ class DatabaseManager(StorageController, UploadToSQL):
         database_connection_string : `str`
             Connection string for the SQL database. This is used to establish a connection
             to the SQL database for data operations such as inserting or querying tables.
+            A `sqlite:///<path>` string uploads to a SQLite database instead, as a local
+            stand-in for SQL Server.
+        backend : `str`
+            Storage backend holding the `.parquet` files, either `"azure"` or `"local"`
+            (see `get_storage_controller`). With `"local"`, `connection_string` is the
+            root directory of the containers.
+        profiler : `RunProfiler`
+            Profiler recording the SQL `execute` of each table as an operation of `upload`.
 
         Returns
         -------
         None
             This function initializes the connections but does not return any value.
         """
-        super().__init__(connection_string, container_name)
-        super(UploadToSQL, self).__init__(database_connection_string)
+        self.storage = get_storage_controller(connection_string, container_name, backend)
+        # Uploads only use the pooled connections, the connection opened by
+        # `UploadToSQL.__init__` would be left unused
+        self._connection_string = database_connection_string
         self._verbose = True
+        self.bulk_loader = BulkLoader()
+        self.pool = ConnectionPool(self._connect, size=1)
+        self.profiler = profiler if profiler is not None else RunProfiler()
+        self.watermarks = UploadWatermarks()
+        self.progress = UploadProgress()
 
     def upload(
         self,
@@ -67,8 +106,9 @@ class DatabaseManager(StorageController, UploadToSQL):
         chunk_size: int = 20,
         char_length: int = 256,
         override_length: bool = True,
+        bulk: bool = False,
         **kwargs,
-    ) -> None:
+    ) -> List[str]:
         """
         Uploads a collection of `.parquet` files to corresponding SQL tables.
 
@@ -80,7 +120,11 @@ class DatabaseManager(StorageController, UploadToSQL):
             Path to the directory in Azure Blob Storage where the `.parquet` files are stored.
         auto_resolve : `bool`
             Flag indicating whether to automatically resolve and infer column types
-            based on the data in the `.parquet` files (default is True).
+            based on the data in the `.parquet` files (default is True). Files written
+            from curated tables carry the statistics of their columns (see
+            `attach_statistics`). For them the types are not inferred again and the DDL
+            is built from the statistics, so `auto_resolve` and `frac` only apply to
+            files without statistics.
         frac : `float`
             Fraction of the data to sample for inferring column types (range: 0.0 to 1.0).
             A smaller value may speed up the inference process at the cost of accuracy.
@@ -94,58 +138,633 @@ class DatabaseManager(StorageController, UploadToSQL):
             Flag indicating whether to override the existing column lengths in
             the SQL tables if they already exist. If set to True, the new length from
             `char_length` will be applied to columns.
+        method : `str`
+            `"append"` (the default) or `"override"`. Before uploading, the schema of the
+            file is compared with the SQL table: missing columns are added and narrow
+            columns altered with `ALTER TABLE`. Each chunk is committed on its own and
+            retried up to `retries` times (3 by default) when it fails. The rows of a
+            file committed so far are recorded in the `UploadProgress` table of the
+            database, so uploading again a file that failed partway through inserts
+            only the rows that were not committed.
+        on_type_conflict : `str`
+            What to do when appending to a table one of whose columns cannot hold the
+            new values, such as text in an `INT` column. `"raise"` (the default) fails
+            the file and leaves the table untouched, `"override"` drops the table, with
+            the rows it holds, and creates it again.
+        bulk : `bool`
+            Read the `.parquet` files as Arrow record batches and insert them with
+            `BulkLoader`, whose batch size adapts to the measured rows per second. The
+            Arrow types of the files are kept, so `auto_resolve`, `frac` and `chunk_size`
+            are not used. The initial batch size can be set with `batch_size`.
+            Connections are borrowed from `pool` and kept open until `close`. `workers`
+            tables are uploaded concurrently, each on its own connection, and tables
+            with more than `split_rows` rows are split by row range across up to
+            `workers` connections.
+        stream : `bool`
+            With `bulk=True`, read each `.parquet` file row group by row group with
+            `iter_batches` instead of loading it whole, so the memory of the upload is
+            bounded by the batch size rather than by the size of the table. Blobs are
+            downloaded to a temporary file first and large tables are split across
+            connections by row group.
+        incremental : `bool`
+            Only upload the slices of each table that are new or changed since its last
+            incremental upload, replacing them with a `DELETE` of their rows followed by
+            an insert, and record them in `UploadWatermarks`. The slices are the values
+            of `partition_by` (`"periodo"` by default): the partitions written by
+            `load(partition_by=...)` are compared by the etag of their blob, without
+            being read, and the periods of other files by a fingerprint of their rows.
+            Files without the column are a single slice that replaces the whole table.
+            The files are uploaded through the bulk loader and `method` is not used.
 
         Returns
         -------
-        None
-            This function does not return any value. It performs the upload operation to the SQL database.
+        `list`
+            The file patterns that were successfully uploaded to the SQL database.
         """
         method = kwargs["method"] if "method" in kwargs else "append"
+        self.bulk_loader.char_length = char_length
+        self.bulk_loader.override_length = override_length
+        self.bulk_loader.on_type_conflict = kwargs.get("on_type_conflict", "raise")
+        with self.pool.connection() as connection:
+            self.progress.ensure(connection)
+        if bulk or kwargs.get("incremental", False):
+            if "batch_size" in kwargs:
+                self.bulk_loader.batch_size = kwargs["batch_size"]
+            self.bulk_loader.retries = kwargs.get("retries", 3)
+            return self._bulk_upload(
+                files,
+                directory,
+                method,
+                workers=kwargs.get("workers", 1),
+                split_rows=kwargs.get("split_rows", 1_000_000),
+                stream=kwargs.get("stream", False),
+                incremental_by=(
+                    kwargs.get("partition_by", "periodo")
+                    if kwargs.get("incremental", False)
+                    else None
+                ),
+            )
+
+        blob_names = self._list_blobs(directory)
+        uploaded, tables = [], set()
         for file_pattern in files:
             try:
-                df, file_name = self.get_parquet(directory_name=directory, regex=file_pattern)
-                if auto_resolve:
-                    handler = ColumnsDtypes(df[0])
-                    df[0] = handler.correct(sample_frac=frac)
-                self.execute(
-                    df=df[0],
-                    table_name=file_name[0],
+                blob_name, table_name = self._match_blob(file_pattern, blob_names)
+                # The partitions of a table after the first one are appended to it
+                table_method = "append" if table_name in tables else method
+                table = self.storage.read_parquet_table(blob_name)
+                statistics = read_statistics(table.schema)
+                df = table.to_pandas()
+                columns = None
+                if statistics is not None:
+                    # The types were resolved by `curate`, the DDL follows its statistics
+                    columns = self.bulk_loader.column_types(table.schema, statistics=statistics)
+                elif auto_resolve:
+                    handler = ColumnsDtypes(df)
+                    df = handler.correct(sample_frac=frac)
+                del table
+                self._upload_frame(
+                    df,
+                    table_name,
+                    method=table_method,
                     chunk_size=chunk_size,
-                    method=method,
                     char_length=char_length,
                     override_length=override_length,
                     auto_resolve=auto_resolve,
+                    frac=frac,
+                    retries=kwargs.get("retries", 3),
+                    columns=columns,
+                    blob=(blob_name, self.storage.get_blob_etag(blob_name)),
                 )
-                logger.info(f"Successfully uploaded {file_pattern} to SQL table {file_name}.")
+                logger.info(f"Successfully uploaded {file_pattern} to SQL table {table_name}.")
+                uploaded.append(file_pattern)
+                tables.add(table_name)
             except Exception as e:
-                try:
-                    self.execute(
-                        df=df[0],
-                        table_name=file_name[0],
-                        chunk_size=chunk_size,
-                        method="override",
-                        char_length=char_length,
-                        override_length=override_length,
-                        auto_resolve=auto_resolve,
+                logger.error(f"Failed to upload {file_pattern}: {str(e)}")
+        return uploaded
+
+    def close(self) -> None:
+        """Close the connections of the pool, which opens new ones if the manager is reused."""
+        self.pool.close()
+
+    def __enter__(self) -> "DatabaseManager":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _list_blobs(self, directory: str) -> List[str]:
+        """List the blobs under `directory`, including the partitions written by `load`."""
+        return BlobIndex.from_pages(self.storage.list_blob_pages(directory)).under(directory)
+
+    def _upload_frame(
+        self,
+        df: pd.DataFrame,
+        table_name: str,
+        method: str,
+        chunk_size: int,
+        char_length: int,
+        override_length: bool,
+        auto_resolve: bool,
+        frac: float,
+        retries: int = 3,
+        columns: Dict[str, str] | None = None,
+        blob: Tuple[str, Optional[str]] | None = None,
+    ) -> None:
+        """Upload `df` chunk by chunk after reconciling its schema with the SQL table.
+
+        The SQL type of each column is inferred from `df` unless given in `columns`, in
+        the order of the columns of `df`. With the name and ETag of the file of `df` in
+        `blob`, the rows committed are recorded with `UploadProgress`, and the upload
+        resumes after them if a previous upload of the file failed.
+        """
+        df = self._preprocess_dataframe(df)
+        if columns is not None:
+            # The preprocessing normalizes the names, which the DDL has to use as well
+            columns = dict(zip(df.columns, columns.values()))
+        else:
+            columns = {
+                column: self._infer_schema(column, df, char_length, override_length)
+                for column in df.columns
+            }
+
+        with self.profiler.profile("upload", "execute", table_name) as record:
+            record["rows"], record["bytes"] = table_size(df)
+            with self.pool.connection() as connection:
+                method = reconcile_schema(
+                    connection, table_name, columns, method, self.bulk_loader.on_type_conflict
+                )
+                if method == "override":
+                    recreate_table(connection, table_name, create_table_query(table_name, columns))
+                    self.progress.clear(connection, table_name)
+                offset = 0
+                if blob is not None:
+                    offset = self.progress.resume(connection, table_name, *blob, [(0, len(df))])[0]
+                rows = df.iloc[offset:]
+                # Chunks follow `UploadToSQL.execute`
+                if auto_resolve and len(rows) >= 0.5e6:
+                    n = max(int(len(rows) * frac), 1)
+                    chunks = [rows.iloc[i:].head(n) for i in range(0, len(rows), n)]
+                else:
+                    chunks = np.array_split(rows, max(min(chunk_size, len(rows)), 1))
+                query = self._insert_table_query(table_name, df)
+                for chunk in chunks:
+                    if len(chunk) > 0:
+                        offset += len(chunk)
+                        execute_chunk(
+                            connection,
+                            query,
+                            self._prepare_data_for_insertion(chunk),
+                            retries,
+                            self.bulk_loader.retry_delay,
+                            (
+                                partial(
+                                    self.progress.advance,
+                                    table_name=table_name,
+                                    blob_name=blob[0],
+                                    row_start=0,
+                                    committed=offset,
+                                )
+                                if blob is not None
+                                else None
+                            ),
+                        )
+                if blob is not None:
+                    self.progress.clear(connection, table_name, blob[0])
+
+    @staticmethod
+    def _match_blob(file_pattern: str, blob_names: List[str]) -> Tuple[str, str]:
+        """Get the first blob matching `file_pattern` and the name of its SQL table."""
+        matches = [name for name in blob_names if re.search(file_pattern, name, re.I)]
+        if not matches:
+            raise FileNotFoundError(f"No .parquet file matches {file_pattern}.")
+        # Named after the file, the partition directories may hold dots
+        return matches[0], matches[0].rsplit("/", 1)[-1].rsplit(".", 2)[0]
+
+    def _bulk_upload(
+        self,
+        files: List[str],
+        directory: str,
+        method: str,
+        workers: int = 1,
+        split_rows: int = 1_000_000,
+        stream: bool = False,
+        incremental_by: Optional[str] = None,
+    ) -> List[str]:
+        """Upload the `.parquet` files matching `files` through the bulk loader.
+
+        The files of the same SQL table, such as the partitions written by `load`, are
+        uploaded one after the other by the same worker, the tables concurrently. With
+        `incremental_by`, only the slices of that column that changed are uploaded.
+        """
+        blob_names = self._list_blobs(directory)
+        self.pool.size = max(self.pool.size, workers)
+        groups: Dict[str, List[str]] = {}
+        for file_pattern in files:
+            try:
+                _, table_name = self._match_blob(file_pattern, blob_names)
+            except FileNotFoundError:
+                # Reported as a failed upload by its own group
+                table_name = file_pattern
+            groups.setdefault(table_name, []).append(file_pattern)
+        if incremental_by is not None:
+            with self.pool.connection() as connection:
+                self.watermarks.ensure(connection)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (
+                    executor.submit(
+                        self._bulk_upload_group,
+                        group,
+                        blob_names,
+                        method,
+                        workers,
+                        split_rows,
+                        stream,
                     )
-                    logger.info(f"Successfully uploaded {file_pattern} to SQL table {file_name}.")
-                except:
-                    logger.error(f"Failed to upload {file_pattern}: {str(e)}")
+                    if incremental_by is None
+                    else executor.submit(
+                        self._incremental_upload_group,
+                        table_name,
+                        group,
+                        blob_names,
+                        incremental_by,
+                        workers,
+                        split_rows,
+                    )
+                )
+                for table_name, group in groups.items()
+            ]
+        results = {}
+        for future in futures:
+            results.update(future.result())
+        uploaded = []
+        for file_pattern in files:
+            table_name = results[file_pattern]
+            if isinstance(table_name, Exception):
+                logger.error(f"Failed to upload {file_pattern}: {str(table_name)}")
+            else:
+                logger.info(f"Successfully uploaded {file_pattern} to SQL table {table_name}.")
+                uploaded.append(file_pattern)
+        return uploaded
+
+    def _bulk_upload_group(
+        self,
+        file_patterns: List[str],
+        blob_names: List[str],
+        method: str,
+        workers: int,
+        split_rows: int,
+        stream: bool = False,
+    ) -> Dict[str, str | Exception]:
+        """Upload the files of one SQL table in order, the first one with `method` and the
+        others appended. Get the table name, or the error, of each file."""
+        results = {}
+        for file_pattern in file_patterns:
+            try:
+                results[file_pattern] = self._bulk_upload_file(
+                    file_pattern, blob_names, method, workers, split_rows, stream
+                )
+                method = "append"
+            except Exception as e:
+                results[file_pattern] = e
+        return results
 
+    def _bulk_upload_file(
+        self,
+        file_pattern: str,
+        blob_names: List[str],
+        method: str,
+        workers: int,
+        split_rows: int,
+        stream: bool = False,
+    ) -> str:
+        """Upload the first `.parquet` file matching `file_pattern`, split by row range if
+        large, resuming the ranges of a previous upload of the file that did not finish."""
+        blob_name, table_name = self._match_blob(file_pattern, blob_names)
+        # Each upload adapts its own batch size, starting from the one learned so far
+        loader = copy.copy(self.bulk_loader)
+        batch_size = loader.min_batch_size
+        blob = (blob_name, self.storage.get_blob_etag(blob_name))
+        with self.pool.connection() as connection:
+            etag, recorded = self.progress.read(connection, table_name, blob_name)
+        bounds = [(start, stop) for start, stop, _ in recorded] if etag == blob[1] else None
+
+        if stream:
+            with self.storage.local_copy(blob_name) as file_path:
+                parquet_file = pq.ParquetFile(file_path, memory_map=True)
+                schema = parquet_file.schema_arrow
+                statistics = read_statistics(schema)
+                # Without statistics the strings are scanned once to size the columns
+                lengths = (
+                    string_lengths(parquet_file.iter_batches(batch_size=batch_size))
+                    if statistics is None
+                    else None
+                )
+                ranges = self._row_group_ranges(
+                    file_path, parquet_file.metadata, workers, split_rows, batch_size, bounds
+                )
+                self._insert_ranges(
+                    loader, table_name, schema, method, lengths, ranges, statistics, blob=blob
+                )
+        else:
+            table = self.storage.read_parquet_table(blob_name)
+            statistics = read_statistics(table.schema)
+            if bounds is None:
+                bounds = self._table_bounds(table.num_rows, workers, split_rows)
+            ranges = self._table_ranges(table, bounds, batch_size)
+            lengths = string_lengths(table) if statistics is None else None
+            self._insert_ranges(
+                loader, table_name, table.schema, method, lengths, ranges, statistics, blob=blob
+            )
+        self.bulk_loader.batch_size = loader.batch_size
+        return table_name
+
+    def _incremental_upload_group(
+        self,
+        table_name: str,
+        file_patterns: List[str],
+        blob_names: List[str],
+        column: str,
+        workers: int,
+        split_rows: int,
+        reset: bool = False,
+    ) -> Dict[str, str | Exception]:
+        """Replace the slices of one SQL table that are new or changed since they were
+        last uploaded. Get the table name, or the error, of each file."""
+        loader = copy.copy(self.bulk_loader)
+        with self.pool.connection() as connection:
+            marks = self.watermarks.read(connection, table_name)
+        results, replaced, skipped = {}, 0, 0
+        for file_pattern in file_patterns:
+            try:
+                blob_name, _ = self._match_blob(file_pattern, blob_names)
+                for key, partition, fingerprint in self._changed_slices(blob_name, column, marks):
+                    if partition is None:
+                        skipped += 1
+                        continue
+                    method = self._replace_slice(
+                        loader, table_name, column, partition, workers, split_rows
+                    )
+                    if method == "override" and (marks or replaced):
+                        # The table was recreated for a new schema, dropping the other slices
+                        with self.pool.connection() as connection:
+                            self.watermarks.clear(connection, table_name)
+                        if reset:
+                            error = ValueError(
+                                f"The slices of {table_name} have incompatible column types."
+                            )
+                            return {file_pattern: error for file_pattern in file_patterns}
+                        logger.warning(f"{table_name} was recreated, all its slices are uploaded.")
+                        return self._incremental_upload_group(
+                            table_name, file_patterns, blob_names, column, workers, split_rows, True
+                        )
+                    with self.pool.connection() as connection:
+                        self.watermarks.record(
+                            connection, table_name, key, fingerprint, partition.num_rows
+                        )
+                    marks[key] = fingerprint
+                    replaced += 1
+                results[file_pattern] = table_name
+            except Exception as e:
+                results[file_pattern] = e
+        self.bulk_loader.batch_size = loader.batch_size
+        logger.info(
+            f"{table_name}: {replaced} slices uploaded, {skipped} unchanged, "
+            f"high-water mark {self.watermarks.high_water_mark(marks)}."
+        )
+        return results
+
+    def _changed_slices(
+        self, blob_name: str, column: str, marks: Dict[str, str]
+    ) -> Iterator[Tuple[str, Optional[pa.Table], str]]:
+        """Get the key, rows and fingerprint of the slices of a blob, with `None` rows for
+        those whose fingerprint is in `marks`."""
+        value = partition_value(blob_name, column)
+        if value is not None:
+            # A partition written by `load`, unchanged as long as its blob is
+            etag = self.storage.get_blob_etag(blob_name)
+            if marks.get(value) == etag:
+                yield value, None, etag
+            else:
+                yield value, self.storage.read_parquet_table(blob_name), etag
+            return
+        table = self.storage.read_parquet_table(blob_name)
+        if column not in table.column_names:
+            etag = self.storage.get_blob_etag(blob_name)
+            yield "", None if marks.get("") == etag else table, etag
+            return
+        for key, partition in partition_table(table, column):
+            fingerprint = slice_fingerprint(partition)
+            yield key, None if marks.get(key) == fingerprint else partition, fingerprint
+
+    def _replace_slice(
+        self,
+        loader: BulkLoader,
+        table_name: str,
+        column: str,
+        partition: pa.Table,
+        workers: int,
+        split_rows: int,
+    ) -> str:
+        """Delete the rows of a slice from the SQL table and insert them again."""
+        delete = partial(
+            delete_slice,
+            table_name=table_name,
+            column=column if column in partition.column_names else None,
+            partition=partition,
+        )
+        statistics = read_statistics(partition.schema)
+        bounds = self._table_bounds(partition.num_rows, workers, split_rows)
+        ranges = self._table_ranges(partition, bounds, loader.min_batch_size)
+        lengths = string_lengths(partition) if statistics is None else None
+        return self._insert_ranges(
+            loader, table_name, partition.schema, "append", lengths, ranges, statistics, delete
+        )
 
-def get_directories(files: List[str], subfolder_level: int = 1) -> List[str]:
+    @staticmethod
+    def _table_bounds(num_rows: int, workers: int, split_rows: int) -> List[Tuple[int, int]]:
+        """Split the rows of a table into up to `workers` ranges of at least `split_rows` rows."""
+        n_ranges = min(workers, -(-num_rows // split_rows)) if num_rows else 1
+        step = -(-num_rows // n_ranges) if num_rows else 1
+        return [
+            (offset, min(offset + step, num_rows)) for offset in range(0, max(num_rows, 1), step)
+        ]
+
+    @staticmethod
+    def _table_ranges(
+        table: pa.Table, bounds: List[Tuple[int, int]], batch_size: int
+    ) -> List[RowRange]:
+        """Get the record batches of each range of rows of a table."""
+        return [
+            (start, stop, partial(_slice_batches, table, start, stop, batch_size=batch_size))
+            for start, stop in bounds
+        ]
+
+    @staticmethod
+    def _row_group_ranges(
+        file_path: str,
+        metadata: pq.FileMetaData,
+        workers: int,
+        split_rows: int,
+        batch_size: int,
+        bounds: List[Tuple[int, int]] | None = None,
+    ) -> List[RowRange]:
+        """Get the record batches of each range of row groups of a Parquet file, following
+        `bounds` when given, which must fall between row groups."""
+        starts = [0]
+        for index in range(metadata.num_row_groups):
+            starts.append(starts[-1] + metadata.row_group(index).num_rows)
+        if bounds is None:
+            groups = row_group_ranges(metadata, workers, split_rows)
+            bounds = [
+                (starts[group[0]], starts[group[-1] + 1]) if group else (0, 0) for group in groups
+            ]
+        ranges = []
+        for start, stop in bounds:
+            row_groups = [i for i in range(metadata.num_row_groups) if start <= starts[i] < stop]
+            batches = partial(_row_group_batches, file_path, row_groups, batch_size=batch_size)
+            ranges.append((start, stop, batches))
+        return ranges
+
+    def _insert_ranges(
+        self,
+        loader: BulkLoader,
+        table_name: str,
+        schema: pa.Schema,
+        method: str,
+        lengths: Dict[str, int] | None,
+        ranges: List[RowRange],
+        statistics: Dict[str, dict] | None = None,
+        delete: Callable[[Any], None] | None = None,
+        blob: Tuple[str, Optional[str]] | None = None,
+    ) -> str:
+        """Prepare the table and insert each range of rows on its own connection.
+
+        `delete` is called with the connection once the table is prepared, so the rows
+        it removes are kept if the schema of the table cannot receive the batches. With
+        the name and ETag of the file of the rows in `blob`, the rows committed in each
+        range are recorded with `UploadProgress`, and the ranges resume after them if a
+        previous upload of the file failed. Returns the method applied by
+        `BulkLoader.prepare`.
+        """
+        with self.profiler.profile("upload", "execute", table_name) as record:
+            offsets = [start for start, _, _ in ranges]
+            with self.pool.connection() as connection:
+                method = loader.prepare(connection, table_name, schema, method, lengths, statistics)
+                if method == "override":
+                    # The rows recorded for the files of the table were dropped with it
+                    self.progress.clear(connection, table_name)
+                if delete is not None:
+                    delete(connection)
+                if blob is not None:
+                    bounds = [(start, stop) for start, stop, _ in ranges]
+                    offsets = self.progress.resume(connection, table_name, *blob, bounds)
+            tasks = []
+            for (start, _, batches), offset in zip(ranges, offsets):
+                progress = None
+                if blob is not None:
+                    progress = partial(
+                        self._record_progress,
+                        table_name=table_name,
+                        blob_name=blob[0],
+                        row_start=start,
+                        offset=offset,
+                    )
+                tasks.append((partial(batches, offset - start), progress))
+            if len(tasks) == 1:
+                reports = [self._insert_range(loader, table_name, schema, *tasks[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+                    futures = [
+                        executor.submit(
+                            self._insert_range, copy.copy(loader), table_name, schema, *task
+                        )
+                        for task in tasks
+                    ]
+                    reports = [future.result() for future in futures]
+            if blob is not None:
+                with self.pool.connection() as connection:
+                    self.progress.clear(connection, table_name, blob[0])
+            record["rows"] = sum(report["rows"] for report in reports)
+            record["bytes"] = sum(report["bytes"] for report in reports)
+        return method
+
+    def _insert_range(
+        self,
+        loader: BulkLoader,
+        table_name: str,
+        schema: pa.Schema,
+        batches: Callable[[], Iterable[pa.RecordBatch]],
+        progress: Callable[[Any, int], None] | None = None,
+    ) -> dict:
+        with self.pool.connection() as connection:
+            return loader.insert(connection, table_name, batches(), schema, progress)
+
+    def _record_progress(
+        self, cursor: Any, table_name: str, blob_name: str, row_start: int, offset: int, rows: int
+    ) -> None:
+        # The range resumed at `offset`, `rows` rows were inserted since
+        self.progress.advance(cursor, table_name, blob_name, row_start, offset + rows)
+
+    def _connect(self):
+        """Open a new connection to the database for the bulk loader."""
+        if self._connection_string.startswith(SQLITE_PREFIX):
+            sqlite3.register_adapter(pd.Timestamp, pd.Timestamp.isoformat)
+            return sqlite_connect(self._connection_string)
+        return pyodbc.connect(self._connection_string, autocommit=False)
+
+
+def _slice_batches(
+    table: pa.Table, start: int, stop: int, skip: int, batch_size: int
+) -> List[pa.RecordBatch]:
+    """Get the record batches of the rows of `table` from `start + skip` to `stop`."""
+    return table.slice(start + skip, stop - start - skip).to_batches(max_chunksize=batch_size)
+
+
+def _row_group_batches(
+    file_path: str, row_groups: List[int], skip: int, batch_size: int
+) -> Iterator[pa.RecordBatch]:
+    """Read the row groups of a Parquet file batch by batch, without their first `skip` rows."""
+    parquet_file = pq.ParquetFile(file_path, memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups):
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        yield batch.slice(skip)
+        skip = 0
+
+
+def get_directories(files: List[str] | BlobIndex, subfolder_level: int = 1) -> List[str]:
     """Get directories from list of files."""
-    directories = set(file.split("/")[subfolder_level] for file in files)
+    return find_directories(files, subfolder_level)[1]
+
+
+def find_directories(
+    files: List[str] | BlobIndex, subfolder_level: int = 1
+) -> Tuple[int, List[str]]:
+    """Get the directories of a list of files and the level at which they were found.
+
+    Args:
+        files (List[str] | BlobIndex): Blob names, or their index.
+        subfolder_level (int): Level of the directories in the blob names, asked again
+            when no blob has that many levels.
+
+    Returns:
+        Tuple[int, List[str]]: The level and the segments of the blob names at that level.
+    """
+    index = files if isinstance(files, BlobIndex) else BlobIndex(files)
+    directories = index.segments(subfolder_level)
 
     if directories:
         print("The directories could be successfully inferred.")
-        return list(directories)
+        return subfolder_level, directories
     else:
         print("No directory found to process!")
         subfolder_level = int(
             input("Insert the level at which they can be found (number of subfolders): ")
         )
-        return get_directories(files, subfolder_level)
+        return find_directories(index, subfolder_level)
 
 
 def list_filter(elements: List[str], character: str, lowercase: bool = False) -> List[str]:
@@ -167,16 +786,28 @@ def list_filter(elements: List[str], character: str, lowercase: bool = False) ->
     return [element for element in elements if character in element]
 
 
-def list_remove(elements: List[str], character: str) -> List[str]:
+def list_remove(elements: List[str], character: str, segments: bool = False) -> List[str]:
     """Remove items from a list based on a criteria.
 
     Args:
         elements (List[str]): List of values to be filtered.
         character (str): Filter criteria.
+        segments (bool): Remove only the blob names with a `/` separated segment equal to
+            `character`, with or without its extension, so `catalog` removes
+            `project/catalog.parquet` but not `project/catalogo/file.csv`.
 
     Returns:
         List[str]: List of filtered elements.
     """
+    if segments:
+        return [
+            element
+            for element in elements
+            if not any(
+                segment == character or segment.rsplit(".", 1)[0] == character
+                for segment in element.split("/")
+            )
+        ]
     return [element for element in elements if character not in element]
 
 
@@ -193,18 +824,21 @@ def insert_period(
     Returns:
         pd.DataFrame: Resulting base with the period column.
     """
+    if "periodo" not in df.columns:
+        df["periodo"] = get_period(df_name, regex_pattern)
+
+    return df
+
+
+def get_period(df_name: str, regex_pattern: str = r"\d{4}-\d{2}-\d{2}") -> str:
+    """Extract the period from the database name, its date or else its year."""
     period_extract = re.findall(regex_pattern, df_name)
 
     if not period_extract:
         regex_pattern = r".*([1-2][0-9]{3})"
         period_extract = re.findall(regex_pattern, df_name)
 
-    period = period_extract[0] if period_extract else ""
-
-    if "periodo" not in df.columns:
-        df["periodo"] = period
-
-    return df
+    return period_extract[0] if period_extract else ""
 
 
 def remove_by_dict(df: pd.DataFrame, to_delete: List[str]) -> pd.DataFrame:
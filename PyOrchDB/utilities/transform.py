@@ -0,0 +1,191 @@
+import fnmatch
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from pandas.core.frame import DataFrame
+
+
+def standard_column_name(name: str, surrounding: bool = True) -> str:
+    """Normalize a column name as `ColumnsCheck.get_frame` does.
+
+    Args:
+        name (str): Name of the column.
+        surrounding (bool): Wrap the name in square brackets.
+
+    Returns:
+        str: Lowercase name where any character other than letters, digits and `_` is
+        replaced by `_`, after removing `.` and `,`.
+    """
+    name = re.sub("[.,]", "", name.lower())
+    name = re.sub("_+", "_", re.sub(r"[^a-zA-Z0-9ñáéíóú_]", "_", name)).strip().rstrip("_")
+    return f"[{name}]" if surrounding else name
+
+
+class TransformPlan:
+    """Column selection, renaming and constant columns of a frame, applied in one pass.
+
+    The corrections of `build` (`fix`, `insert_period` and the config of the columns)
+    only depend on the column names of a frame, so they are resolved once into a plan
+    that lists, for each output column, the input column it comes from or the constant
+    it holds.
+    Applying the plan assembles the output from views of the input columns, where
+    the step-by-step corrections copied the whole frame at every step. Only the
+    constant columns are allocated.
+    """
+
+    def __init__(self, columns: List[Tuple[str, Optional[int], object]], copies: int = 0):
+        """
+        Parameters
+        ----------
+        columns : `list`
+            Name, input position (`None` for constants) and constant of each output column.
+        copies : `int`
+            Number of copies of the frame made by the corrections the plan replaces.
+        """
+        self.columns = columns
+        self.copies = copies
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _, _ in self.columns]
+
+    @classmethod
+    def keep(cls, columns: Iterable) -> "TransformPlan":
+        """Plan that keeps every column, to which further steps are added."""
+        return cls([(name, position, None) for position, name in enumerate(columns)])
+
+    @classmethod
+    def fix(cls, columns: Iterable, surrounding: bool = True) -> Optional["TransformPlan"]:
+        """Plan the corrections of `ETLWorkflow.fix`: drop the `Unnamed` columns and
+        normalize the names. `None` if a column name is not a string."""
+        columns = list(columns)
+        if not all(isinstance(name, str) for name in columns):
+            return None
+        return cls(
+            [
+                (standard_column_name(name, surrounding), position, None)
+                for position, name in enumerate(columns)
+                if not name.startswith("Unnamed")
+            ],
+            # The column slice and `ColumnsCheck`
+            copies=2,
+        )
+
+    def insert(self, name: str, value: object) -> "TransformPlan":
+        """Add a constant column, unless a column with that name exists (`insert_period`)."""
+        if name in self.names:
+            return self
+        return TransformPlan(self.columns + [(name, None, value)], self.copies)
+
+    def drop_rename(self, rules: "ColumnRules") -> "TransformPlan":
+        """Drop columns then rename others, as `remove_by_dict` and `DataFrame.rename` do."""
+        keep, names = rules.resolve(self.names)
+        return TransformPlan(
+            [(name, *self.columns[i][1:]) for i, name in zip(keep, names)], self.copies + 2
+        )
+
+    def apply(self, df: DataFrame) -> DataFrame:
+        """Assemble the output frame, sharing the data of the columns of `df`."""
+        series = []
+        for name, position, value in self.columns:
+            if position is None:
+                column = pd.Series(value, index=df.index, dtype=object)
+            else:
+                column = df.iloc[:, position]
+            column.name = name
+            series.append(column)
+        if not series:
+            return DataFrame(index=df.index)
+        return pd.concat(series, axis=1, copy=False)
+
+    def saved_bytes(self, df: DataFrame) -> int:
+        """Estimate the bytes of the copies of `df` avoided by applying the plan."""
+        sizes = df.memory_usage(index=False, deep=False).to_numpy()
+        kept = sum(int(sizes[position]) for _, position, _ in self.columns if position is not None)
+        return self.copies * kept
+
+
+class ColumnRules:
+    """Columns to delete and to rename of `config_data.yml`, compiled once.
+
+    A rule is a column name, a regular expression prefixed with `re:` or a glob
+    pattern prefixed with `glob:` (matched against the whole name). The names are looked
+    up in a set and the patterns to delete are joined into a single expression. A column
+    is renamed by its exact name first, then by the first matching pattern, the
+    replacement of a regular expression being able to refer to its groups.
+
+    The columns of each schema are resolved once, into the positions to keep and their
+    new names, so the cost of a file does not depend on the number of rules.
+    """
+
+    def __init__(
+        self, to_delete: Optional[Iterable[str]] = None, to_rename: Optional[Dict[str, str]] = None
+    ):
+        """
+        Parameters
+        ----------
+        to_delete : `list`
+            Rules of the columns to delete.
+        to_rename : `dict`
+            Rules of the columns to rename, with their new name.
+        """
+        self.delete_names, delete_patterns = set(), []
+        for rule in to_delete or []:
+            pattern = _rule_pattern(rule)
+            if pattern is None:
+                self.delete_names.add(rule)
+            else:
+                delete_patterns.append(pattern)
+        self.delete_pattern = (
+            re.compile("|".join(f"(?:{pattern})" for pattern in delete_patterns))
+            if delete_patterns
+            else None
+        )
+        self.rename_names, self.rename_patterns = {}, []
+        for rule, new_name in (to_rename or {}).items():
+            pattern = _rule_pattern(rule)
+            if pattern is None:
+                self.rename_names[rule] = new_name
+            else:
+                # Glob patterns have no groups to refer to
+                literal = str(rule).startswith("glob:")
+                self.rename_patterns.append((re.compile(pattern), new_name, literal))
+        self._resolved: Dict[Tuple[str, ...], Tuple[List[int], List[str]]] = {}
+
+    def resolve(self, columns: Iterable[str]) -> Tuple[List[int], List[str]]:
+        """Get the positions of the columns to keep and their new names."""
+        key = tuple(columns)
+        if key not in self._resolved:
+            keep, names = [], []
+            for i, name in enumerate(key):
+                if self._delete(name):
+                    continue
+                keep.append(i)
+                names.append(self._rename(name))
+            self._resolved[key] = (keep, names)
+        return self._resolved[key]
+
+    def _delete(self, name: str) -> bool:
+        if name in self.delete_names:
+            return True
+        return self.delete_pattern is not None and bool(self.delete_pattern.search(str(name)))
+
+    def _rename(self, name: str) -> str:
+        if name in self.rename_names:
+            return self.rename_names[name]
+        for pattern, new_name, literal in self.rename_patterns:
+            match = pattern.search(str(name))
+            if match:
+                return new_name if literal else pattern.sub(new_name, str(name), count=1)
+        return name
+
+
+def _rule_pattern(rule: str) -> Optional[str]:
+    """Regular expression of a `re:` or `glob:` rule, `None` for a column name."""
+    rule = str(rule)
+    if rule.startswith("re:"):
+        return rule[3:]
+    if rule.startswith("glob:"):
+        return r"\A" + fnmatch.translate(rule[5:])
+    return None
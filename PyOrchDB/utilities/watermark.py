@@ -0,0 +1,261 @@
+import hashlib
+import logging
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.types as pat
+
+from PyOrchDB.utilities.bulk import create_table_query, quote_identifier, table_columns
+from PyOrchDB.utilities.partition import NULL_PARTITION
+
+# Setting up basic configuration for logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQL table keeping the slices of each table uploaded by the incremental mode
+WATERMARK_TABLE = "pyorchdb_watermarks"
+
+WATERMARK_COLUMNS = {
+    "table_name": "NVARCHAR(256)",
+    "partition_key": "NVARCHAR(256)",
+    "fingerprint": "VARCHAR(64)",
+    "row_count": "BIGINT",
+    "uploaded_at": "VARCHAR(32)",
+}
+
+
+def slice_fingerprint(table: pa.Table) -> str:
+    """Get a digest of the rows of a table that does not depend on their order.
+
+    Args:
+        table (pa.Table): Rows of a slice, such as one period of a table.
+
+    Returns:
+        str: The hexadecimal digest of the schema and the rows.
+    """
+    digest = hashlib.sha1(table.schema.to_string(show_schema_metadata=False).encode())
+    if table.num_rows:
+        hashes = pd.util.hash_pandas_object(table.to_pandas(), index=False).to_numpy()
+        digest.update(np.sort(hashes).tobytes())
+    return digest.hexdigest()
+
+
+def delete_slice(
+    connection: Any, table_name: str, column: Optional[str], partition: pa.Table
+) -> None:
+    """Delete the rows of `table_name` whose `column` holds the value of `partition`.
+
+    Timestamps are sliced by day by `partition_table`, so the rows of the whole day of
+    the slice are deleted, not only those of its first timestamp. With `column=None`
+    every row of the table is deleted. Nothing is done if the table does not exist yet.
+
+    Args:
+        connection (Any): DB-API connection to SQL Server or SQLite.
+        table_name (str): Name of the SQL table.
+        column (Optional[str]): Partition column, such as `periodo`.
+        partition (pa.Table): Rows of the slice, all with the same value of `column`.
+    """
+    if table_columns(connection, table_name) is None:
+        return
+    cursor = connection.cursor()
+    query = f"DELETE FROM {quote_identifier(table_name)}"
+    if column is None:
+        cursor.execute(query)
+    elif partition.num_rows:
+        values = partition[column].slice(0, 1)
+        if pat.is_timestamp(values.type):
+            # Compared as `BulkLoader` inserts it
+            values = values.cast(pa.timestamp("us"), safe=False)
+        value = values[0].as_py()
+        if value is None:
+            cursor.execute(f"{query} WHERE {quote_identifier(column)} IS NULL")
+        elif isinstance(value, datetime):
+            start = datetime.combine(value.date(), time())
+            cursor.execute(
+                f"{query} WHERE {quote_identifier(column)} >= ? AND {quote_identifier(column)} < ?",
+                (start, start + timedelta(days=1)),
+            )
+        else:
+            cursor.execute(f"{query} WHERE {quote_identifier(column)} = ?", (value,))
+    connection.commit()
+
+
+class UploadWatermarks:
+    """Records which slices of each SQL table were uploaded, and from which data.
+
+    Each row of the `WATERMARK_TABLE` table of the database holds a slice of a table,
+    such as a value of `periodo`, and a fingerprint of the data it was uploaded from.
+    A slice whose fingerprint has not changed does not need to be uploaded again. The
+    high-water mark of a table is its latest period uploaded.
+
+    The marks live in the same database as the tables they describe, so dropping or
+    restoring the database never leaves them out of date.
+    """
+
+    def __init__(self, table_name: str = WATERMARK_TABLE):
+        """
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the SQL table holding the marks.
+        """
+        self.table_name = table_name
+
+    def ensure(self, connection: Any) -> None:
+        """Create the table of the marks if it does not exist."""
+        if table_columns(connection, self.table_name) is None:
+            connection.cursor().execute(create_table_query(self.table_name, WATERMARK_COLUMNS))
+            connection.commit()
+
+    def read(self, connection: Any, table_name: str) -> Dict[str, str]:
+        """Get the fingerprint of each slice of `table_name` uploaded so far."""
+        cursor = connection.cursor()
+        cursor.execute(
+            f"SELECT [partition_key], [fingerprint] FROM {quote_identifier(self.table_name)} "
+            "WHERE [table_name] = ?",
+            (table_name,),
+        )
+        return {key: fingerprint for key, fingerprint in cursor.fetchall()}
+
+    def record(
+        self, connection: Any, table_name: str, key: str, fingerprint: str, row_count: int
+    ) -> None:
+        """Record that a slice of `table_name` was uploaded from the data of `fingerprint`."""
+        cursor = connection.cursor()
+        cursor.execute(
+            f"DELETE FROM {quote_identifier(self.table_name)} "
+            "WHERE [table_name] = ? AND [partition_key] = ?",
+            (table_name, key),
+        )
+        cursor.execute(
+            f"INSERT INTO {quote_identifier(self.table_name)} "
+            f"({', '.join(quote_identifier(column) for column in WATERMARK_COLUMNS)}) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (table_name, key, fingerprint, row_count, datetime.now().isoformat(timespec="seconds")),
+        )
+        connection.commit()
+
+    def clear(self, connection: Any, table_name: str) -> None:
+        """Forget the slices of `table_name`, such as when the table is recreated."""
+        connection.cursor().execute(
+            f"DELETE FROM {quote_identifier(self.table_name)} WHERE [table_name] = ?",
+            (table_name,),
+        )
+        connection.commit()
+
+    @staticmethod
+    def high_water_mark(marks: Dict[str, str]) -> Optional[str]:
+        """Get the latest period among the slices of `read`, `None` if there is none."""
+        periods = [key for key in marks if key and key != NULL_PARTITION]
+        return max(periods) if periods else None
+
+
+# SQL table keeping the rows of each file committed by an upload that did not finish
+PROGRESS_TABLE = "pyorchdb_upload_progress"
+
+PROGRESS_COLUMNS = {
+    "table_name": "NVARCHAR(256)",
+    "blob_name": "NVARCHAR(1024)",
+    "etag": "VARCHAR(128)",
+    "row_start": "BIGINT",
+    "row_stop": "BIGINT",
+    "committed": "BIGINT",
+}
+
+
+class UploadProgress:
+    """Records the rows of each file committed to its SQL table while it is uploaded.
+
+    The rows of a file are inserted as ranges, each committed chunk by chunk. The end of
+    the rows committed in a range is updated in the transaction of each chunk, so when
+    an upload fails partway through, the next upload of the same version of the file
+    resumes every range after its last committed chunk instead of inserting its first
+    rows again. The ranges of a file are forgotten once it is uploaded, and those of a
+    table when the table is recreated.
+    """
+
+    def __init__(self, table_name: str = PROGRESS_TABLE):
+        """
+        Parameters
+        ----------
+        table_name : `str`
+            Name of the SQL table holding the ranges.
+        """
+        self.table_name = table_name
+
+    def ensure(self, connection: Any) -> None:
+        """Create the table of the ranges if it does not exist."""
+        if table_columns(connection, self.table_name) is None:
+            connection.cursor().execute(create_table_query(self.table_name, PROGRESS_COLUMNS))
+            connection.commit()
+
+    def read(
+        self, connection: Any, table_name: str, blob_name: str
+    ) -> Tuple[Optional[str], List[Tuple[int, int, int]]]:
+        """Get the ETag of the file being uploaded and the start, stop and end of the rows
+        committed of each of its ranges, `None` and no range if there is none."""
+        cursor = connection.cursor()
+        cursor.execute(
+            f"SELECT [etag], [row_start], [row_stop], [committed] "
+            f"FROM {quote_identifier(self.table_name)} "
+            "WHERE [table_name] = ? AND [blob_name] = ? ORDER BY [row_start]",
+            (table_name, blob_name),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return None, []
+        return rows[0][0], [(start, stop, committed) for _, start, stop, committed in rows]
+
+    def resume(
+        self,
+        connection: Any,
+        table_name: str,
+        blob_name: str,
+        etag: Optional[str],
+        ranges: List[Tuple[int, int]],
+    ) -> List[int]:
+        """Get the end of the rows already committed in each range of a file, starting its
+        ranges from scratch unless they were recorded for the same ETag."""
+        recorded_etag, recorded = self.read(connection, table_name, blob_name)
+        if recorded and recorded_etag == etag and [r[:2] for r in recorded] == list(ranges):
+            return [committed for _, _, committed in recorded]
+        if recorded:
+            logger.warning(
+                f"The upload of {blob_name} to {table_name} did not finish and the file changed "
+                "since, the rows it committed are kept."
+            )
+        self.clear(connection, table_name, blob_name)
+        cursor = connection.cursor()
+        for start, stop in ranges:
+            cursor.execute(
+                f"INSERT INTO {quote_identifier(self.table_name)} "
+                f"({', '.join(quote_identifier(column) for column in PROGRESS_COLUMNS)}) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (table_name, blob_name, etag, start, stop, start),
+            )
+        connection.commit()
+        return [start for start, _ in ranges]
+
+    def advance(
+        self, cursor: Any, table_name: str, blob_name: str, row_start: int, committed: int
+    ) -> None:
+        """Record the end of the rows of a range inserted so far, in the transaction of the
+        cursor, which commits it along with the rows."""
+        cursor.execute(
+            f"UPDATE {quote_identifier(self.table_name)} SET [committed] = ? "
+            "WHERE [table_name] = ? AND [blob_name] = ? AND [row_start] = ?",
+            (committed, table_name, blob_name, row_start),
+        )
+
+    def clear(self, connection: Any, table_name: str, blob_name: Optional[str] = None) -> None:
+        """Forget the ranges of a file, or of every file of `table_name` if `blob_name` is
+        `None`, such as when the table is recreated."""
+        query = f"DELETE FROM {quote_identifier(self.table_name)} WHERE [table_name] = ?"
+        if blob_name is None:
+            connection.cursor().execute(query, (table_name,))
+        else:
+            connection.cursor().execute(f"{query} AND [blob_name] = ?", (table_name, blob_name))
+        connection.commit()
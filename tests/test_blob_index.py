@@ -0,0 +1,107 @@
+import os
+
+from PyOrchDB.main import ETLWorkflow
+from PyOrchDB.utilities import SQLITE_PREFIX, BlobIndex, list_remove
+
+NAMES = [
+    "project/ventas/2023-01.csv",
+    "project/ventas_old/2023-01.csv",
+    "project/catalog.parquet",
+    "project/ventas/2023-02.csv",
+    "project/compras/sub/2023-01.xlsx",
+]
+
+
+def test_segments_by_level():
+    index = BlobIndex(NAMES)
+
+    assert index.segments(0) == ["project"]
+    assert index.segments(1) == ["ventas", "ventas_old", "catalog.parquet", "compras"]
+    assert index.segments(3) == ["2023-01.xlsx"]
+    assert index.segments(4) == []
+
+
+def test_files_match_whole_segments():
+    index = BlobIndex(NAMES)
+
+    assert index.files("ventas", 1) == ["project/ventas/2023-01.csv", "project/ventas/2023-02.csv"]
+    assert index.files("ventas_old", 1) == ["project/ventas_old/2023-01.csv"]
+    assert index.files("venta", 1) == []
+    assert index.files("ventas", 5) == []
+    assert index.files() == NAMES
+
+
+def test_under_a_path():
+    index = BlobIndex(NAMES)
+
+    assert index.under("project") == NAMES
+    assert index.under("/project/ventas/") == [
+        "project/ventas/2023-01.csv",
+        "project/ventas/2023-02.csv",
+    ]
+    assert index.under("project/compras") == ["project/compras/sub/2023-01.xlsx"]
+    assert index.under("proj") == []
+    assert index.under("") == NAMES
+
+
+def test_from_pages_keeps_the_listing_order():
+    pages = [NAMES[:2], [], NAMES[2:4], NAMES[4:] + NAMES[:1]]
+    index = BlobIndex.from_pages(iter(pages))
+
+    assert len(index) == len(NAMES)
+    assert index.names() == NAMES
+    assert "project/catalog.parquet" in index
+    assert "project/ventas" not in index
+    assert index.files("ventas", 1) == BlobIndex(NAMES).files("ventas", 1)
+
+
+def test_list_remove_by_segment():
+    names = NAMES + ["project/catalogo/2023-01.csv", "project/catalog.csv"]
+
+    assert list_remove(names, "catalog", segments=True) == [
+        "project/ventas/2023-01.csv",
+        "project/ventas_old/2023-01.csv",
+        "project/ventas/2023-02.csv",
+        "project/compras/sub/2023-01.xlsx",
+        "project/catalogo/2023-01.csv",
+    ]
+    assert "project/catalogo/2023-01.csv" not in list_remove(names, "catalog")
+
+
+def test_upload_selects_the_blobs_of_each_table_once(tmp_path):
+    workflow = ETLWorkflow(
+        str(tmp_path),
+        "raw",
+        "project",
+        db_conn_string=f"{SQLITE_PREFIX}{tmp_path / 'test.db'}",
+        verbose=False,
+        backend="local",
+    )
+    index = BlobIndex(
+        [
+            "project/TB_BI_Ventas.parquet",
+            "project/TB_BI_Ventas_old.parquet",
+            "project/TB_BI_Compras/periodo=2023-01/TB_BI_Compras.parquet",
+            "project/TB_BI_Compras/periodo=2023-02/TB_BI_Compras.parquet",
+        ]
+    )
+
+    # Without a build every table of the project is uploaded, in the order of the tables
+    assert workflow._processed_files(index) == index.names()[2:] + index.names()[:2]
+
+    workflow.table_names = ["TB_BI_Ventas", "TB_BI_Compras", "TB_BI_Ventas"]
+    assert workflow._processed_files(index) == [
+        "project/TB_BI_Ventas.parquet",
+        "project/TB_BI_Compras/periodo=2023-01/TB_BI_Compras.parquet",
+        "project/TB_BI_Compras/periodo=2023-02/TB_BI_Compras.parquet",
+    ]
+
+
+def test_build_lists_neither_the_catalog_nor_the_column_memo(tmp_path):
+    project_path = tmp_path / "raw" / "project"
+    for name in ("catalog.csv", "catalog_columns.parquet", "catalogo/2023-01.csv"):
+        os.makedirs((project_path / name).parent, exist_ok=True)
+        (project_path / name).write_text("a\n1\n")
+    workflow = ETLWorkflow(str(tmp_path), "raw", "project", verbose=False, backend="local")
+
+    assert workflow._get_file_list() == ["project/catalogo/2023-01.csv"]
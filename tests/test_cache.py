@@ -0,0 +1,88 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from PyOrchDB.utilities import ParsedFileCache
+from PyOrchDB.utilities.cache import STAGING_TIMEOUT
+
+
+def frame(n=3):
+    return pd.DataFrame({"name": [f"row {i}" for i in range(n)], "value": range(n)})
+
+
+def test_entries_are_keyed_by_etag(tmp_path):
+    cache = ParsedFileCache(str(tmp_path))
+    cache.put("raw/file.xlsx", "etag-1", [frame()], ["file-sheet"])
+
+    assert cache.contains("raw/file.xlsx", "etag-1")
+    frames, names = cache.get("raw/file.xlsx", "etag-1")
+    pd.testing.assert_frame_equal(frames[0], frame())
+    assert names == ["file-sheet"]
+
+    assert not cache.contains("raw/file.xlsx", "etag-2")
+    assert cache.get("raw/file.xlsx", "etag-2") is None
+    assert cache.get("raw/file.xlsx", None) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ParsedFileCache(str(tmp_path))
+    for name in "abc":
+        cache.put(name, "etag", [frame(100)], [name])
+    entry_size = sum(file.stat().st_size for file in os.scandir(cache._entry_path("a", "etag")))
+    for age, name in enumerate("cba"):
+        manifest_path = os.path.join(cache._entry_path(name, "etag"), "manifest.json")
+        os.utime(manifest_path, (time.time() - 100 * (age + 1),) * 2)
+
+    # Reading `a` makes `b` the least recently used entry
+    assert cache.get("a", "etag") is not None
+    cache.max_bytes = 3 * entry_size
+    cache.put("d", "etag", [frame(100)], ["d"])
+
+    assert [name for name in "abcd" if cache.contains(name, "etag")] == ["a", "c", "d"]
+
+
+def test_entries_left_half_written_are_recovered(tmp_path):
+    cache = ParsedFileCache(str(tmp_path))
+    cache.put("raw/file.xlsx", "etag", [frame()], ["file-sheet"])
+    entry_path = cache._entry_path("raw/file.xlsx", "etag")
+    os.remove(os.path.join(entry_path, "00000.parquet"))
+    stale_staging = tmp_path / ".staging-dead"
+    stale_staging.mkdir()
+    (stale_staging / "00000.parquet").write_bytes(b"partial")
+    os.utime(stale_staging, (time.time() - 2 * STAGING_TIMEOUT,) * 2)
+    live_staging = tmp_path / ".staging-live"
+    live_staging.mkdir()
+    half_written = cache._entry_path("raw/other.xlsx", "etag")
+    os.makedirs(half_written)
+
+    assert cache.get("raw/file.xlsx", "etag") is None
+    assert not cache.contains("raw/other.xlsx", "etag")
+    cache.put("raw/file.xlsx", "etag", [frame()], ["file-sheet"])
+
+    frames, _ = cache.get("raw/file.xlsx", "etag")
+    pd.testing.assert_frame_equal(frames[0], frame())
+    assert not stale_staging.exists() and not os.path.exists(half_written)
+    # Another process may still be writing it
+    assert live_staging.exists()
+
+
+@pytest.mark.parametrize(
+    "df",
+    [
+        pd.DataFrame({"name": ["a", np.nan, "c"], "value": [1.0, np.nan, 3.0]}),
+        pd.DataFrame({"name": ["a", None, "c"], "empty": [np.nan] * 3}, dtype=object),
+        pd.DataFrame({"name": ["a", None, np.nan], "mixed": [1, "b", np.nan]}),
+        pd.DataFrame([["a", "b"], [np.nan, "d"]], columns=["name", "name"]),
+    ],
+)
+def test_cached_frames_equal_the_parsed_ones(tmp_path, df):
+    cache = ParsedFileCache(str(tmp_path))
+    cache.put("raw/file.xlsx", "etag", [df], ["file-sheet"])
+
+    frames, _ = cache.get("raw/file.xlsx", "etag")
+    pd.testing.assert_frame_equal(frames[0], df)
+    for column in range(df.shape[1]):
+        assert frames[0].iloc[:, column].map(type).equals(df.iloc[:, column].map(type))
@@ -0,0 +1,83 @@
+import os
+
+from PyOrchDB.utilities import EventController, get_storage_controller, set_table_names
+
+
+def test_table_names_follow_the_edited_mapping_file(tmp_path):
+    file_path = tmp_path / "table_names.yml"
+    file_path.write_text(
+        "ventas : TB_BI_sales\nregion :\n  norte : TB_BI_north\n  None : TB_BI_region\n"
+    )
+
+    names = ["TB_BI_ventas2023", "TB_BI_region_norte", "TB_BI_region_sur", "TB_BI_other"]
+    assert set_table_names(names, True, str(file_path)) == [
+        "TB_BI_sales",
+        "TB_BI_north",
+        "TB_BI_region",
+        "TB_BI_other",
+    ]
+
+    file_path.write_text("ventas : TB_BI_revenue\nother : TB_BI_misc\n")
+    # The edit may fall within the resolution of the modification time
+    mtime = os.path.getmtime(file_path)
+    os.utime(file_path, (mtime + 1, mtime + 1))
+
+    assert set_table_names(names, True, str(file_path)) == [
+        "TB_BI_revenue",
+        "TB_BI_region_norte",
+        "TB_BI_region_sur",
+        "TB_BI_misc",
+    ]
+
+
+def write_blob(root, name, content):
+    path = root / "raw" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def test_diff_of_new_modified_and_unchanged_files(tmp_path):
+    write_blob(tmp_path, "project/ventas/enero.csv", "a\n1\n")
+    write_blob(tmp_path, "project/ventas/febrero.csv", "a\n2\n")
+    storage = get_storage_controller(str(tmp_path), "raw", "local")
+    manager = EventController(str(tmp_path), "raw", "project", backend="local")
+    files = ["project/ventas/enero.csv", "project/ventas/febrero.csv"]
+
+    # Without catalog every file is new
+    assert manager.diff(files, storage.get_blob_properties("project")) == files
+    manager.create_log(files, properties=storage.get_blob_properties("project"))
+    assert manager.diff(files, storage.get_blob_properties("project")) == []
+
+    write_blob(tmp_path, "project/ventas/febrero.csv", "a\n2\n3\n")
+    write_blob(tmp_path, "project/ventas/marzo.csv", "a\n4\n")
+    files.append("project/ventas/marzo.csv")
+    assert manager.diff(files, storage.get_blob_properties("project")) == [
+        "project/ventas/febrero.csv",
+        "project/ventas/marzo.csv",
+    ]
+
+
+def test_diff_with_a_legacy_csv_catalog(tmp_path):
+    write_blob(tmp_path, "project/ventas/enero.csv", "a\n1\n")
+    write_blob(
+        tmp_path,
+        "project/catalog.csv",
+        "files,datetime\nproject/ventas/enero.csv,2023-01-31 00:00:00\n",
+    )
+    write_blob(tmp_path, "project/ventas/febrero.csv", "a\n2\n")
+    storage = get_storage_controller(str(tmp_path), "raw", "local")
+    manager = EventController(str(tmp_path), "raw", "project", backend="local")
+    files = ["project/ventas/enero.csv", "project/ventas/febrero.csv"]
+    properties = storage.get_blob_properties("project")
+
+    # The legacy entries have no fingerprint, they are taken as unchanged
+    assert manager.diff(files, properties) == ["project/ventas/febrero.csv"]
+
+    manager.update(["project/ventas/febrero.csv"], properties=properties)
+    assert storage.get_blob_etag("project/catalog.parquet") is not None
+    reloaded = EventController(str(tmp_path), "raw", "project", backend="local")
+    assert reloaded.diff(files, properties) == []
+    write_blob(tmp_path, "project/ventas/enero.csv", "a\n1\n5\n")
+    assert reloaded.diff(files, storage.get_blob_properties("project")) == [
+        "project/ventas/enero.csv"
+    ]
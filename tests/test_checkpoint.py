@@ -0,0 +1,142 @@
+import os
+import sqlite3
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from PyOrchDB.benchmark import generate_container, synthetic_frame
+from PyOrchDB.main import ETLWorkflow
+from PyOrchDB.utilities import SQLITE_PREFIX, DatabaseManager
+
+
+@pytest.fixture
+def container(tmp_path):
+    generate_container(str(tmp_path), "raw", "project", directories=2, months=2, rows=10)
+    os.makedirs(tmp_path / "logs")
+    return tmp_path
+
+
+def add_file(path):
+    df = synthetic_frame(np.random.default_rng(1), 10, 2)
+    df.to_csv(path / "raw" / "project" / "source0" / "source0_2023-03-01.csv", index=False)
+
+
+@pytest.fixture
+def built_directories(monkeypatch):
+    built = []
+    process_directory = ETLWorkflow._process_directory
+
+    def record_directory(self, dir, *args, **kwargs):
+        built.append(dir)
+        return process_directory(self, dir, *args, **kwargs)
+
+    monkeypatch.setattr(ETLWorkflow, "_process_directory", record_directory)
+    return built
+
+
+def workflow(path, **kwargs):
+    return ETLWorkflow(
+        str(path),
+        "raw",
+        "project",
+        db_conn_string=f"{SQLITE_PREFIX}{path / 'test.db'}",
+        verbose=False,
+        backend="local",
+        checkpoint_dir=str(path / "checkpoint"),
+        **kwargs,
+    )
+
+
+def run(workflow, stages=("build", "curate", "load", "upload"), **kwargs):
+    logs_path = os.path.join(workflow.conn_string, "logs") + "/"
+    with mock.patch("builtins.input", return_value="n"):
+        if "build" in stages:
+            workflow.build(logs_path=logs_path, **kwargs)
+        if "curate" in stages:
+            workflow.curate(cleaning=False, arrow_native=True)
+        if "load" in stages:
+            workflow.load()
+        if "upload" in stages:
+            workflow.upload(bulk=True, method="override")
+
+
+def row_count(path, table_name):
+    connection = sqlite3.connect(path / "test.db")
+    return connection.execute(f"SELECT COUNT(*) FROM [{table_name}]").fetchone()[0]
+
+
+def test_an_interrupted_run_is_resumed(container, built_directories, monkeypatch):
+    upload = DatabaseManager.upload
+    monkeypatch.setattr(DatabaseManager, "upload", mock.Mock(side_effect=RuntimeError))
+    first = workflow(container)
+    with pytest.raises(RuntimeError):
+        run(first)
+    assert built_directories == ["source0", "source1"]
+
+    monkeypatch.setattr(DatabaseManager, "upload", upload)
+    second = workflow(container)
+    run(second)
+
+    # The build, curate and load of the interrupted run are not executed again
+    assert built_directories == ["source0", "source1"]
+    assert second.table_names == first.table_names
+    assert [row_count(container, name) for name in second.table_names] == [20, 20]
+    assert second.checkpoint.last_completed() is None
+
+
+def test_a_finished_run_is_not_replayed(container, built_directories):
+    run(workflow(container))
+    assert built_directories == ["source0", "source1"]
+
+    finished = workflow(container)
+    run(finished, stages=("build",))
+    assert built_directories == ["source0", "source1"]
+    assert finished.directories == []
+
+
+def test_the_run_ends_with_the_final_stage_of_the_caller(container, built_directories):
+    run(workflow(container, checkpoint_final_stage="load"), stages=("build", "curate", "load"))
+
+    add_file(container)
+    new_files = workflow(container, checkpoint_final_stage="load")
+    run(new_files, stages=("build",))
+
+    # Only the new file is built, not the tables of the run that finished with `load`
+    assert built_directories == ["source0", "source1", "source0"]
+    assert new_files.table_sources == [["project/source0/source0_2023-03-01.csv"]]
+
+
+def test_an_interrupted_build_is_built_again_with_the_new_files(
+    container, built_directories, monkeypatch
+):
+    process_directory = ETLWorkflow._process_directory
+
+    def failing_directory(self, dir, *args, **kwargs):
+        if dir == "source1":
+            raise RuntimeError("worker lost")
+        return process_directory(self, dir, *args, **kwargs)
+
+    monkeypatch.setattr(ETLWorkflow, "_process_directory", failing_directory)
+    with pytest.raises(RuntimeError):
+        run(workflow(container), stages=("build",))
+    monkeypatch.setattr(ETLWorkflow, "_process_directory", process_directory)
+
+    add_file(container)
+    resumed = workflow(container)
+    run(resumed, stages=("build",))
+    sources = sorted({source for sources in resumed.table_sources for source in sources})
+    assert sources == [
+        "project/source0/source0_2023-01-01.csv",
+        "project/source0/source0_2023-02-01.csv",
+        "project/source0/source0_2023-03-01.csv",
+        "project/source1/source1_2023-01-01.csv",
+        "project/source1/source1_2023-02-01.csv",
+    ]
+
+    # A new run builds the files of the run it replaces again instead of restoring them
+    built_directories.clear()
+    fresh = workflow(container)
+    run(fresh, stages=("build",), resume=False)
+    assert built_directories == ["source0", "source1"]
+    assert sorted({source for sources in fresh.table_sources for source in sources}) == sources
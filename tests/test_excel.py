@@ -0,0 +1,40 @@
+import datetime
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import Workbook
+
+from PyOrchDB.utilities import read_excel_sheets
+
+
+def _workbook() -> bytes:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "ventas"
+    sheet.append(["id", "cliente", "valor", "activo", "fecha", "id", None])
+    sheet.append([1, "NA", 1.5, True, datetime.datetime(2023, 1, 1), 10])
+    sheet.append([2, "null", 2.0, None, datetime.datetime(2023, 1, 2), 11])
+    sheet.append([])
+    sheet.append([3, "N/A", None, False, None, 12])
+    sheet.append([4, "ana", 4.25, True, datetime.datetime(2023, 1, 4), 13, None])
+    empty = workbook.create_sheet("vacia")
+    empty["A1"] = None
+    numbers = workbook.create_sheet("numeros")
+    numbers.append(["a", "b"])
+    numbers.append([1, "x"])
+    numbers.append([2.5, "#N/A"])
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_openpyxl_engine_matches_read_excel():
+    content = _workbook()
+    expected = pd.read_excel(BytesIO(content), sheet_name=None, index_col=None)
+
+    for workers in (1, 2):
+        sheets = read_excel_sheets(content, engine="openpyxl", workers=workers)
+
+        assert list(sheets) == list(expected)
+        for name, df in sheets.items():
+            pd.testing.assert_frame_equal(df, expected[name])
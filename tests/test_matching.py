@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from PyOrchDB.utilities import KeywordMatcher
+
+
+def naive_first(keywords, text):
+    return next((i for i, keyword in enumerate(keywords) if keyword in text), None)
+
+
+def naive_all(keywords, text):
+    return [i for i, keyword in enumerate(keywords) if keyword in text]
+
+
+@pytest.mark.parametrize(
+    "keywords",
+    [
+        ["ventas", "ventas_old", "old"],
+        ["ventas_old", "ventas"],
+        ["aba", "bab", "ab", "b"],
+        ["he", "she", "his", "hers"],
+        ["a", "aa", "aaa"],
+        [""],
+        [],
+    ],
+)
+def test_matches_the_substring_loop(keywords):
+    matcher = KeywordMatcher(keywords)
+    texts = ["", "ventas_old/2023.parquet", "ushers", "ababab", "aaaa", "xyz"]
+    for text in texts:
+        assert matcher.first(text) == naive_first(keywords, text), text
+        assert matcher.all(text) == naive_all(keywords, text), text
+
+
+def test_matches_the_substring_loop_on_random_texts():
+    rng = random.Random(0)
+    for _ in range(200):
+        keywords = [
+            "".join(rng.choice("ab") for _ in range(rng.randint(1, 4)))
+            for _ in range(rng.randint(1, 6))
+        ]
+        matcher = KeywordMatcher(keywords)
+        for _ in range(10):
+            text = "".join(rng.choice("abc") for _ in range(rng.randint(0, 12)))
+            assert matcher.first(text) == naive_first(keywords, text), (keywords, text)
+            assert matcher.all(text) == naive_all(keywords, text), (keywords, text)
@@ -0,0 +1,64 @@
+import os
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from merge_by_lev.main import merge_by_similarity
+
+from PyOrchDB.benchmark import generate_container, synthetic_frame
+from PyOrchDB.main import ETLWorkflow
+from PyOrchDB.utilities import SchemaBuckets, learn_merge, replay_merge
+
+MERGE_PARAMS = dict(dist_min=9, match_cols=4, drop_empty=False)
+
+
+def drifted_directory():
+    rng = np.random.default_rng(0)
+    buckets = SchemaBuckets(min_columns=4)
+    for month in range(6):
+        buckets.add(synthetic_frame(rng, 10 + month, month), f"sales_{month}")
+    return buckets.pop_all()
+
+
+def test_replayed_merge_equals_the_merge(tmp_path):
+    frames, names = drifted_directory()
+    merged, merged_names, _ = merge_by_similarity(
+        [df.copy(deep=False) for df in frames], list(names), **MERGE_PARAMS
+    )
+
+    decisions = learn_merge(frames, names, merged, merged_names, **MERGE_PARAMS)
+    replayed, replayed_names = replay_merge(frames, names, decisions)
+
+    assert replayed_names == merged_names
+    for df, merged_df in zip(replayed, merged):
+        pd.testing.assert_frame_equal(df, merged_df.reset_index(drop=True))
+
+
+def test_a_merge_the_probes_do_not_reproduce_is_not_learned():
+    frames, names = drifted_directory()
+    merged, merged_names, _ = merge_by_similarity(
+        [df.copy(deep=False) for df in frames], list(names), **MERGE_PARAMS
+    )
+    # Such as a merge dropping the columns that are empty in the data
+    merged[0] = merged[0].iloc[:, 1:]
+
+    assert learn_merge(frames, names, merged, merged_names, **MERGE_PARAMS) is None
+
+
+def test_directories_merged_from_the_memo_equal_the_merge(tmp_path):
+    generate_container(str(tmp_path), "raw", "project", directories=2, months=6, rows=10)
+    os.makedirs(tmp_path / "logs")
+
+    def build(**kwargs):
+        workflow = ETLWorkflow(str(tmp_path), "raw", "project", verbose=False, backend="local")
+        workflow.build(logs_path=str(tmp_path / "logs") + "/", delete_catalog=True, **kwargs)
+        return workflow
+
+    merged = build()
+    build(column_memo=True)
+    with mock.patch("PyOrchDB.main.merge_by_similarity", side_effect=AssertionError):
+        replayed = build(column_memo=True)
+
+    assert replayed.table_names == merged.table_names
+    for df, merged_df in zip(replayed.tables, merged.tables):
+        pd.testing.assert_frame_equal(df, merged_df.reset_index(drop=True))
@@ -0,0 +1,33 @@
+import os
+
+import pandas as pd
+
+from PyOrchDB.benchmark import generate_container
+from PyOrchDB.main import ETLWorkflow
+
+
+def test_parallel_build_equals_the_serial_build(tmp_path):
+    generate_container(
+        str(tmp_path), "raw", "project", directories=3, months=3, rows=20, file_format="mixed"
+    )
+    # A workbook without header, whose frame cannot be corrected and is dropped
+    pd.DataFrame([[1, 2], [3, 4]]).to_excel(
+        tmp_path / "raw" / "project" / "source1" / "source1_2023-04-01.xlsx", index=False
+    )
+    os.makedirs(tmp_path / "logs")
+
+    def build(**kwargs):
+        workflow = ETLWorkflow(str(tmp_path), "raw", "project", verbose=False, backend="local")
+        workflow.build(logs_path=str(tmp_path / "logs") + "/", delete_catalog=True, **kwargs)
+        return workflow
+
+    serial = build()
+    parallel = build(workers=2)
+
+    assert parallel.directories == serial.directories
+    assert parallel.table_names == serial.table_names
+    assert parallel.table_data == serial.table_data
+    assert parallel.table_sources == serial.table_sources
+    assert len(parallel.tables) == len(serial.tables) > 3
+    for df, serial_df in zip(parallel.tables, serial.tables):
+        pd.testing.assert_frame_equal(df, serial_df)
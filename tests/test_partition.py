@@ -0,0 +1,120 @@
+import sqlite3
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from PyOrchDB.main import ETLWorkflow
+from PyOrchDB.utilities import (
+    NULL_PARTITION,
+    SQLITE_PREFIX,
+    attach_statistics,
+    get_storage_controller,
+    partition_blobs,
+    partition_path,
+    partition_value,
+    read_statistics,
+    write_partitioned,
+)
+
+
+def periods_table(periods, values):
+    return pa.table({"periodo": pa.array(periods, pa.date32()), "value": values})
+
+
+def test_hive_layout(tmp_path):
+    storage = get_storage_controller(str(tmp_path), "processed", "local")
+    table = periods_table(
+        [date(2023, 2, 1), date(2023, 1, 1), None, date(2023, 2, 1)], [1, 2, 3, 4]
+    )
+
+    blob_names = write_partitioned(storage, "project", table, "tab", "periodo")
+
+    assert blob_names == [
+        "project/tab/periodo=2023-01-01/tab.parquet",
+        "project/tab/periodo=2023-02-01/tab.parquet",
+        f"project/tab/periodo={NULL_PARTITION}/tab.parquet",
+    ]
+    assert sorted(partition_blobs(storage, "project", "tab")) == sorted(blob_names)
+    assert [partition_value(name, "periodo") for name in blob_names] == [
+        "2023-01-01",
+        "2023-02-01",
+        NULL_PARTITION,
+    ]
+    assert storage.read_parquet_table(blob_names[1])["value"].to_pylist() == [1, 4]
+    # The directory is read back whole, the partition column keeping its type
+    read = pq.read_table(tmp_path / "processed" / "project" / "tab", partitioning=None)
+    assert read.schema == table.schema
+    assert sorted(read["value"].to_pylist()) == [1, 2, 3, 4]
+
+
+def test_only_the_partitions_present_are_replaced(tmp_path):
+    storage = get_storage_controller(str(tmp_path), "processed", "local")
+    write_partitioned(
+        storage,
+        "project",
+        periods_table([date(2023, 1, 1), date(2023, 2, 1)], [1, 2]),
+        "tab",
+        "periodo",
+    )
+    january = partition_path("project", "tab", "periodo", "2023-01-01")
+    etag = storage.get_blob_etag(january)
+
+    write_partitioned(
+        storage,
+        "project",
+        periods_table([date(2023, 2, 1), date(2023, 3, 1)], [20, 3]),
+        "tab",
+        "periodo",
+    )
+
+    assert storage.get_blob_etag(january) == etag
+    assert len(partition_blobs(storage, "project", "tab")) == 3
+    february = partition_path("project", "tab", "periodo", "2023-02-01")
+    assert storage.read_parquet_table(february)["value"].to_pylist() == [20]
+
+
+def test_switching_layouts_keeps_a_single_copy_of_the_rows(tmp_path):
+    workflow = ETLWorkflow(
+        str(tmp_path),
+        "raw",
+        "project",
+        db_conn_string=f"{SQLITE_PREFIX}{tmp_path / 'test.db'}",
+        verbose=False,
+        backend="local",
+    )
+    workflow.loader = get_storage_controller(str(tmp_path), "processed", "local")
+    workflow.directories, workflow.table_names = ["tab"], ["tab"]
+    table = attach_statistics(periods_table([date(2023, 1, 1), date(2023, 2, 1)], [1, 2]))
+
+    workflow._write_parquet(table, "tab", None)
+    workflow._write_parquet(table, "tab", "periodo")
+    assert workflow.loader.get_blob_etag("project/tab.parquet") is None
+    workflow.upload(bulk=True, method="override")
+    connection = sqlite3.connect(tmp_path / "test.db")
+    assert connection.execute("SELECT COUNT(*) FROM tab").fetchone() == (2,)
+
+    workflow._write_parquet(table, "tab", None)
+    assert partition_blobs(workflow.loader, "project", "tab") == []
+    workflow.upload(bulk=True, method="override")
+    assert connection.execute("SELECT COUNT(*) FROM tab").fetchone() == (2,)
+
+
+def test_each_partition_carries_its_own_statistics(tmp_path):
+    storage = get_storage_controller(str(tmp_path), "processed", "local")
+    table = periods_table(
+        [date(2023, 1, 1), date(2023, 2, 1), date(2023, 1, 1)], pa.array([5, None, 7])
+    )
+    table = attach_statistics(table.append_column("name", pa.array(["a", "long name", "bc"])))
+
+    blob_names = write_partitioned(storage, "project", table, "tab", "periodo")
+
+    january, february = (
+        read_statistics(storage.read_parquet_table(name).schema) for name in blob_names
+    )
+    assert (january["value"]["min"], january["value"]["max"]) == (5, 7)
+    assert january["value"]["null_count"] == 0
+    assert january["name"]["max_length"] == 2
+    assert february["value"]["null_count"] == 1
+    assert february["name"]["max_length"] == 9
+    assert january["periodo"]["max"] == "2023-01-01"
@@ -0,0 +1,50 @@
+import pandas as pd
+
+from PyOrchDB.utilities import SchemaBuckets, schema_fingerprint
+
+
+def test_fingerprint_ignores_the_order_of_the_columns():
+    assert schema_fingerprint(["a", "b"]) == schema_fingerprint(["b", "a"])
+    assert schema_fingerprint(["a", "b"]) != schema_fingerprint(["a", "c"])
+    # Repeated names cannot be aligned by name, so their order matters
+    assert schema_fingerprint(["a", "a", "b"]) != schema_fingerprint(["a", "b", "a"])
+
+
+def test_frames_are_bucketed_by_fingerprint():
+    buckets = SchemaBuckets()
+    buckets.add(pd.DataFrame({"a": [1], "b": [2]}), "first")
+    buckets.add(pd.DataFrame({"c": [3]}), "other")
+    buckets.add(pd.DataFrame({"b": [4], "a": [5]}), "second")
+
+    assert len(buckets) == 2
+    frames, names = buckets.pop_all()
+
+    assert names == ["first", "other"]
+    pd.testing.assert_frame_equal(frames[0], pd.DataFrame({"a": [1, 5], "b": [2, 4]}))
+    pd.testing.assert_frame_equal(frames[1], pd.DataFrame({"c": [3]}))
+
+
+def test_narrow_frames_are_kept_apart():
+    buckets = SchemaBuckets(min_columns=2)
+    buckets.add(pd.DataFrame({"a": [1]}), "narrow_1")
+    buckets.add(pd.DataFrame({"a": [2]}), "narrow_2")
+    buckets.add(pd.DataFrame({"a": [3], "b": [4]}), "wide_1")
+    buckets.add(pd.DataFrame({"a": [5], "b": [6]}), "wide_2")
+
+    frames, names = buckets.pop_all()
+
+    assert names == ["narrow_1", "narrow_2", "wide_1"]
+    assert [len(frame) for frame in frames] == [1, 1, 2]
+
+
+def test_pop_all_keeps_the_order_of_the_schemas_and_empties_the_buckets():
+    buckets = SchemaBuckets()
+    for i, columns in enumerate([["z"], ["y"], ["z"], ["x"], ["y"]]):
+        buckets.add(pd.DataFrame({column: [i] for column in columns}), f"frame_{i}")
+
+    frames, names = buckets.pop_all()
+
+    assert names == ["frame_0", "frame_1", "frame_3"]
+    assert [frame.iloc[:, 0].tolist() for frame in frames] == [[0, 2], [1, 4], [3]]
+    assert len(buckets) == 0
+    assert buckets.pop_all() == ([], [])
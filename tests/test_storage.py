@@ -0,0 +1,32 @@
+import pytest
+
+from PyOrchDB.utilities import (
+    STORAGE_BACKENDS,
+    LocalStorageController,
+    StorageBackend,
+    get_storage_controller,
+)
+
+
+@pytest.mark.parametrize("backend", sorted(STORAGE_BACKENDS))
+def test_backends_implement_the_storage_interface(backend):
+    assert issubclass(STORAGE_BACKENDS[backend], StorageBackend)
+    assert not STORAGE_BACKENDS[backend].__abstractmethods__
+
+
+def test_a_backend_missing_a_method_fails_when_created(tmp_path):
+    class IncompleteController(LocalStorageController):
+        delete_blob = StorageBackend.delete_blob
+
+    with pytest.raises(TypeError, match="delete_blob"):
+        IncompleteController(str(tmp_path), "raw")
+
+
+def test_download_blob_reads_the_content_of_the_file(tmp_path):
+    storage = get_storage_controller(str(tmp_path), "raw", "local")
+    (tmp_path / "raw" / "project").mkdir()
+    (tmp_path / "raw" / "project" / "empty.csv").write_bytes(b"")
+    (tmp_path / "raw" / "project" / "data.csv").write_bytes(b"a,b\n1,2\n")
+
+    assert storage._download_blob("project/empty.csv") == b""
+    assert storage._download_blob("project/data.csv") == b"a,b\n1,2\n"
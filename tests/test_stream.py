@@ -0,0 +1,44 @@
+import gc
+import os
+import weakref
+
+import pytest
+
+from PyOrchDB.benchmark import generate_container
+from PyOrchDB.main import ETLWorkflow
+from PyOrchDB.utilities import RunProfiler
+
+
+@pytest.mark.parametrize("stream,raw_frames", [(True, 1), (False, 4)])
+def test_streaming_holds_the_raw_frames_of_one_blob(tmp_path, monkeypatch, stream, raw_frames):
+    generate_container(str(tmp_path), "raw", "project", directories=2, months=4, rows=50)
+    os.makedirs(tmp_path / "logs")
+    raw = []
+    read_directory = ETLWorkflow._read_directory
+
+    def track_raw_frames(self, *args, **kwargs):
+        for frames, names, blob_name in read_directory(self, *args, **kwargs):
+            raw.extend(weakref.ref(df) for df in frames)
+            yield frames, names, blob_name
+
+    monkeypatch.setattr(ETLWorkflow, "_read_directory", track_raw_frames)
+    counts = []
+
+    def count_raw_frames(record):
+        if record["operation"] == "fix":
+            gc.collect()
+            counts.append(sum(frame() is not None for frame in raw))
+
+    workflow = ETLWorkflow(
+        str(tmp_path),
+        "raw",
+        "project",
+        verbose=False,
+        backend="local",
+        profiler=RunProfiler([count_raw_frames]),
+    )
+    workflow.build(logs_path=str(tmp_path / "logs") + "/", stream=stream)
+
+    # The raw frames read so far that are still referenced when each one is corrected
+    assert len(counts) == 8
+    assert max(counts) == raw_frames
@@ -0,0 +1,175 @@
+import sqlite3
+from datetime import datetime
+from unittest import mock
+
+import pyarrow as pa
+import pytest
+
+from PyOrchDB.utilities import (
+    BulkLoader,
+    ConnectionPool,
+    DatabaseManager,
+    attach_statistics,
+)
+from PyOrchDB.utilities import bulk as bulk_module
+from PyOrchDB.utilities import execute_chunk, get_storage_controller, tools
+
+
+def test_upload_curated_file_with_bracketed_columns(tmp_path):
+    storage = get_storage_controller(str(tmp_path), "processed", "local")
+    table = attach_statistics(pa.table({"[name]": ["a", "b", "c"], "[value]": [1, 2, 3]}))
+    storage.write_parquet_blob("project/tab.parquet", table)
+    database = tmp_path / "test.db"
+    manager = DatabaseManager(str(tmp_path), "processed", f"sqlite:///{database}", backend="local")
+
+    uploaded = manager.upload(files=["tab"], directory="project", method="override")
+
+    assert uploaded == ["tab"]
+    connection = sqlite3.connect(database)
+    assert connection.execute("SELECT * FROM tab ORDER BY 2").fetchall() == [
+        ("a", 1),
+        ("b", 2),
+        ("c", 3),
+    ]
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_append_with_type_conflict_keeps_the_table(tmp_path, bulk):
+    storage = get_storage_controller(str(tmp_path), "processed", "local")
+    database = tmp_path / "test.db"
+    manager = DatabaseManager(str(tmp_path), "processed", f"sqlite:///{database}", backend="local")
+    storage.write_parquet_blob("project/tab.parquet", attach_statistics(pa.table({"n": [1, 2]})))
+    assert manager.upload(files=["tab"], directory="project", bulk=bulk) == ["tab"]
+
+    storage.write_parquet_blob("project/tab.parquet", attach_statistics(pa.table({"n": ["x"]})))
+    assert manager.upload(files=["tab"], directory="project", bulk=bulk) == []
+    connection = sqlite3.connect(database)
+    assert connection.execute("SELECT COUNT(*) FROM tab").fetchone() == (2,)
+
+    uploaded = manager.upload(
+        files=["tab"], directory="project", bulk=bulk, on_type_conflict="override"
+    )
+    assert uploaded == ["tab"]
+    assert connection.execute("SELECT COUNT(*) FROM tab").fetchone() == (1,)
+
+
+def test_close_releases_the_connections(tmp_path):
+    storage = get_storage_controller(str(tmp_path), "processed", "local")
+    storage.write_parquet_blob("project/tab.parquet", pa.table({"n": [1, 2]}))
+    database = tmp_path / "test.db"
+    manager = DatabaseManager(str(tmp_path), "processed", f"sqlite:///{database}", backend="local")
+
+    with manager:
+        assert manager.upload(files=["tab"], directory="project", bulk=True, workers=2)
+        assert manager.pool._opened > 0
+    assert manager.pool._opened == 0
+
+    # The pool opens new connections when the manager is reused
+    assert manager.upload(files=["tab"], directory="project", bulk=True)
+    manager.close()
+
+
+def test_incremental_upload_replaces_the_changed_slices(tmp_path, monkeypatch):
+    storage = get_storage_controller(str(tmp_path), "processed", "local")
+    database = tmp_path / "test.db"
+    manager = DatabaseManager(str(tmp_path), "processed", f"sqlite:///{database}", backend="local")
+    inserts = []
+    insert_ranges = DatabaseManager._insert_ranges
+
+    def count_inserts(self, loader, table_name, *args, **kwargs):
+        inserts.append(table_name)
+        return insert_ranges(self, loader, table_name, *args, **kwargs)
+
+    monkeypatch.setattr(DatabaseManager, "_insert_ranges", count_inserts)
+    periods = pa.array(
+        [datetime(2023, 1, 1), datetime(2023, 1, 1, 12), datetime(2023, 2, 1)], pa.timestamp("ns")
+    )
+
+    def write(values):
+        table = pa.table({"periodo": periods, "value": values})
+        storage.write_parquet_blob("project/tab.parquet", attach_statistics(table))
+
+    write([1, 2, 3])
+    assert manager.upload(files=["tab"], directory="project", incremental=True) == ["tab"]
+    assert len(inserts) == 2
+    connection = sqlite3.connect(database)
+    assert connection.execute("SELECT COUNT(*) FROM tab").fetchone() == (3,)
+
+    # Unchanged slices are not written again
+    assert manager.upload(files=["tab"], directory="project", incremental=True) == ["tab"]
+    assert len(inserts) == 2
+
+    # Both timestamps of the changed day are replaced, not only the first one
+    write([1, 20, 3])
+    assert manager.upload(files=["tab"], directory="project", incremental=True) == ["tab"]
+    assert len(inserts) == 3
+    assert connection.execute("SELECT value FROM tab ORDER BY periodo").fetchall() == [
+        (1,),
+        (20,),
+        (3,),
+    ]
+
+
+def test_partitions_are_named_after_their_file():
+    blob_names = ["project/tab.v2/periodo=2023.01/tab.parquet"]
+
+    assert DatabaseManager._match_blob("tab", blob_names) == (blob_names[0], "tab")
+
+
+def test_no_connection_is_opened_before_the_first_upload(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools.pyodbc, "connect", mock.Mock(side_effect=AssertionError))
+
+    manager = DatabaseManager(
+        str(tmp_path),
+        "processed",
+        "Driver={ODBC Driver 18 for SQL Server};Server=host;Database=db;",
+        backend="local",
+    )
+    manager.close()
+
+
+def test_connections_borrowed_during_close_are_closed_once_returned(tmp_path):
+    pool = ConnectionPool(lambda: sqlite3.connect(tmp_path / "test.db"), size=2)
+
+    with pool.connection() as borrowed:
+        with pool.connection():
+            pass
+        pool.close()
+        assert pool._opened == 1
+        borrowed.execute("SELECT 1")
+    assert pool._opened == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        borrowed.execute("SELECT 1")
+
+
+@pytest.mark.parametrize("bulk,stream", [(False, False), (True, False), (True, True)])
+def test_failed_append_resumes_after_the_committed_rows(tmp_path, monkeypatch, bulk, stream):
+    storage = get_storage_controller(str(tmp_path), "processed", "local")
+    database = tmp_path / "test.db"
+    manager = DatabaseManager(str(tmp_path), "processed", f"sqlite:///{database}", backend="local")
+    manager.bulk_loader = BulkLoader(batch_size=2, min_batch_size=2, max_batch_size=2)
+    storage.write_parquet_blob("project/tab.parquet", pa.table({"n": [100]}))
+    assert manager.upload(files=["tab"], directory="project", bulk=bulk, method="override")
+    storage.write_parquet_blob("project/tab.parquet", pa.table({"n": range(10)}), row_group_size=2)
+
+    calls = []
+
+    def failing_chunk(connection, query, rows, *args, **kwargs):
+        calls.append(len(rows))
+        if len(calls) == 3:
+            raise RuntimeError("connection lost")
+        return execute_chunk(connection, query, rows, *args, **kwargs)
+
+    module = bulk_module if bulk else tools
+    monkeypatch.setattr(module, "execute_chunk", failing_chunk)
+    upload = dict(files=["tab"], directory="project", bulk=bulk, stream=stream, retries=0)
+    upload.update(chunk_size=5, workers=2, split_rows=4)
+    assert manager.upload(**upload) == []
+    connection = sqlite3.connect(database)
+    assert 1 < connection.execute("SELECT COUNT(*) FROM tab").fetchone()[0] < 11
+
+    monkeypatch.setattr(module, "execute_chunk", execute_chunk)
+    assert manager.upload(**upload) == ["tab"]
+    rows = [n for n, in connection.execute("SELECT n FROM tab ORDER BY n")]
+    assert rows == list(range(10)) + [100]
+    assert connection.execute("SELECT COUNT(*) FROM pyorchdb_upload_progress").fetchone() == (0,)